@@ -0,0 +1,24 @@
+import bisect
+
+# Every achievement declares the counter it watches and the value that unlocks it. The rules are kept
+# in one sorted index per counter, so a counter change only looks at the thresholds it just crossed.
+
+
+def build_index(achievements):
+    # counter -> (sorted thresholds, positions in the achievements list in the same order)
+    rules = {}
+    for position, achievement in enumerate(achievements):
+        rules.setdefault(achievement["counter"], []).append((achievement["threshold"], position))
+    index = {}
+    for counter, counter_rules in rules.items():
+        counter_rules.sort()  # Equal thresholds stay in catalog order
+        index[counter] = ([threshold for threshold, position in counter_rules], [position for threshold, position in counter_rules])
+    return index
+
+
+def crossed(index, counter, previous, value):
+    # Positions of the achievements whose threshold lies above the previous value and at or below the new one
+    if value <= previous or counter not in index:
+        return []
+    thresholds, positions = index[counter]
+    return positions[bisect.bisect_right(thresholds, previous):bisect.bisect_right(thresholds, value)]
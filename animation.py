@@ -0,0 +1,164 @@
+import time
+from collections import OrderedDict
+
+import pygame
+
+import assets
+
+# Time-based animations. The simulation runs in fixed steps of STEP seconds, however fast or slow the
+# frames come: each frame runs as many steps as the time since the last one covers, and drawing blends
+# between the last two steps (see Tween.progress). So a frame that takes long doesn't slow anything
+# down, the next frame just shows where the animation is by then.
+#
+# Drawing an animation frame should be one blit: the frames get rendered up front into surface
+# sequences (see sequence), and a tween picks which one to show.
+
+STEP = 1 / 120  # Seconds per simulation step
+MAX_STEPS = 30  # Steps per frame at most; after a longer stall the animations skip ahead instead of catching up
+FADE_FRAMES = 8  # Frames in a precomputed fade
+MAX_SEQUENCES = 8  # Precomputed sequences kept before evicting the least recently used
+
+_tweens = {}  # name -> Tween
+_sequences = OrderedDict()  # key -> list of surfaces, oldest first
+_accumulator = 0.0
+_last_update = None
+_moving = False  # There were animations at the last update
+blend = 0.0  # How far this frame is from the last step towards the next, 0-1
+
+
+def linear(fraction):
+    return fraction
+
+
+def ease_out(fraction):
+    return 1 - (1 - fraction) ** 3
+
+
+def smoothstep(fraction):
+    return fraction * fraction * (3 - 2 * fraction)
+
+
+class Tween:
+    # A value going from start to end over duration seconds. loop starts it over whenever it gets there.
+    def __init__(self, duration, start=0.0, end=1.0, easing=linear, loop=False):
+        self.duration = duration
+        self.start = start
+        self.end = end
+        self.easing = easing
+        self.loop = loop
+        self.elapsed = 0.0  # Seconds at the last step
+        self.previous = 0.0  # Seconds at the step before that
+
+    def step(self, seconds):
+        self.previous = self.elapsed
+        self.elapsed += seconds
+        if self.loop and self.elapsed >= self.duration:
+            self.elapsed -= self.duration
+            self.previous -= self.duration  # Keeps the blend between the two steps going the right way
+        elif not self.loop:
+            self.elapsed = min(self.elapsed, self.duration)
+
+    def finished(self):
+        return not self.loop and self.previous >= self.duration
+
+    def progress(self):
+        # 0-1 for the frame being drawn, blended between the last two steps
+        elapsed = self.previous + (self.elapsed - self.previous) * blend
+        return (elapsed / self.duration) % 1.0 if self.loop else min(max(elapsed / self.duration, 0.0), 1.0)
+
+    def value(self):
+        return self.start + (self.end - self.start) * self.easing(self.progress())
+
+
+def start(name, duration, start=0.0, end=1.0, easing=linear, loop=False):
+    # Starts (or restarts) the animation called name
+    tween = Tween(duration, start, end, easing, loop)
+    _tweens[name] = tween
+    return tween
+
+
+def get(name):
+    # The running animation called name, or None
+    return _tweens.get(name)
+
+
+def stop(name):
+    _tweens.pop(name, None)
+
+
+def running():
+    return bool(_tweens)
+
+
+def update(now=None):
+    # Once per frame: runs the steps that are due and drops the animations that are done
+    global _accumulator, _last_update, _moving, blend
+    now = time.perf_counter() if now is None else now
+    if not _moving:
+        _accumulator = 0.0  # Nothing was moving (the loop may have slept), the time since then doesn't count
+    else:
+        _accumulator = min(_accumulator + now - _last_update, MAX_STEPS * STEP)
+    _last_update = now
+    while _accumulator >= STEP:
+        for tween in _tweens.values():
+            tween.step(STEP)
+        _accumulator -= STEP
+    blend = _accumulator / STEP
+    for name in [name for name, tween in _tweens.items() if tween.finished()]:
+        del _tweens[name]
+    _moving = bool(_tweens)
+
+
+def sequence(key, build):
+    # The precomputed frames for key, from build() the first time
+    frames = _sequences.get(key)
+    if frames is not None:
+        _sequences.move_to_end(key)
+        return frames
+    frames = build()
+    _sequences[key] = frames
+    while len(_sequences) > MAX_SEQUENCES:
+        _sequences.popitem(last=False)
+    return frames
+
+
+def frame_number(fraction, count=FADE_FRAMES):
+    # Which of count frames shows a progress of 0-1
+    return min(count - 1, int(fraction * count))
+
+
+def frame(frames, fraction):
+    # The frame of a sequence for a progress of 0-1
+    return frames[frame_number(fraction, len(frames))]
+
+
+def resident_bytes():
+    return sum(assets.surface_bytes(surface) for frames in _sequences.values() for surface in frames)
+
+
+def faded(surface, opacity):
+    # A copy of surface with its alpha scaled by opacity (0-1)
+    copy = surface.copy() if surface.get_flags() & pygame.SRCALPHA else surface.convert_alpha()
+    copy.fill((255, 255, 255, round(255 * opacity)), special_flags=pygame.BLEND_RGBA_MULT)
+    return copy
+
+
+def fade_frames(surface, count=FADE_FRAMES):
+    # From surface as it is to gone
+    return [assets.compact(faded(surface, 1 - number / (count - 1))) for number in range(count)]
+
+
+def crossfade_frames(first, second, count=FADE_FRAMES):
+    # From first to second, the two the same size
+    frames = []
+    for number in range(count):
+        fraction = number / (count - 1)
+        frame_surface = pygame.Surface(first.get_size(), pygame.SRCALPHA)
+        frame_surface.blit(faded(first, 1 - fraction), (0, 0))
+        frame_surface.blit(faded(second, fraction), (0, 0))
+        frames.append(assets.compact(frame_surface))
+    return frames
+
+
+def clear():
+    _sequences.clear()
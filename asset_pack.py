@@ -0,0 +1,170 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+
+import pygame
+
+# Prebuilt asset pack: every PNG in sprites/Sprites, scaled ahead of time to the sizes the game draws
+# it at and stored as raw 32-bit pixels, all in one file. At runtime the file is memory-mapped and
+# surfaces are made straight on top of the mapped pixels with pygame.image.frombuffer, so there is no
+# PNG decoding and no scaling left to do. Build it with `python asset_pack.py` whenever the sprites change.
+#
+# Layout: MAGIC, the length of the index (little endian uint32), the JSON index, then the pixel blocks,
+# each starting on an ALIGNMENT boundary. Pixels are BGRA, the byte order of the usual 32-bit display format,
+# except for opaque images of at most 256 colors (all of the backgrounds): those are stored as one byte
+# per pixel, with their palette in the index, so they take a quarter of the space and load without a copy.
+
+MAGIC = b"CASPACK1"
+ALIGNMENT = 64
+PIXEL_FORMAT = "BGRA"
+DISPLAY_MASKS = (0xFF0000, 0x00FF00, 0x0000FF)  # What a display surface looks like when BGRA needs no converting
+
+CHARACTER_SPRITES = ["Casper_sprite.png", "angry_casper.png", "party_casper.png", "cat_casper.png", "caspers_gf.png", "casper_gf_angry.png"]
+BACKGROUNDS = ["Galaxy_background.png", "Rainbow_background.png", "food_rain_background.png", "poop_background.png"]
+WINDOW_SIZES = [(800, 600), (1024, 768), (1280, 720), (1366, 768), (1920, 1080)]  # Common window sizes for the backgrounds
+
+# file name -> [(size, alpha)]; files not listed get packed at their own size
+SIZES = {name: [((600, 600), True), ((60, 60), True)] for name in CHARACTER_SPRITES}
+SIZES.update({name: [(size, False) for size in WINDOW_SIZES] + [((60, 60), True)] for name in BACKGROUNDS})
+SIZES["speech_bubble.png"] = [((450, 225), True)]
+SIZES["question_mark.png"] = [((60, 60), True)]
+SIZES["locked_padlock.png"] = [((30, 30), True)]
+SIZES["unlocked_padlock.png"] = [((30, 30), True)]
+
+
+def entry_key(name, alpha, size):
+    return f"{name}:{int(alpha)}:{size[0]}x{size[1]}"
+
+
+def palettize(surface):
+    # (palette, one byte per pixel) for an opaque surface with at most 256 colors, else None. Slow, only
+    # for building the pack.
+    colors = set(memoryview(pygame.image.tobytes(surface, "RGBX")).cast("I"))
+    if len(colors) > 256:
+        return None
+    palette = [(color & 0xFF, color >> 8 & 0xFF, color >> 16 & 0xFF) for color in sorted(colors)]
+    paletted = pygame.Surface(surface.get_size(), 0, 8)
+    paletted.set_palette(palette)
+    for color in palette:
+        # Every pixel of this color, mapped to its palette entry; masks do the per-pixel work in C
+        mask = pygame.mask.from_threshold(surface, color + (255,), (1, 1, 1, 255))
+        mask.to_surface(paletted, setcolor=color, unsetcolor=None)
+    return palette, pygame.image.tobytes(paletted, "P")
+
+
+def source_stamp(path):
+    # Enough to notice a sprite that changed after the pack was built
+    stat = os.stat(path)
+    return [stat.st_size, int(stat.st_mtime)]
+
+
+def build(sprite_dir, pack_path):
+    index = {}
+    blocks = []
+    offset = 0
+    for name in sorted(os.listdir(sprite_dir)):
+        if not name.lower().endswith(".png"):
+            continue
+        path = os.path.join(sprite_dir, name)
+        image = pygame.image.load(path)
+        for size, alpha in SIZES.get(name, [(image.get_size(), True)]):
+            scaled = pygame.transform.scale(image, size)
+            entry = {"source": source_stamp(path)}
+            paletted = None
+            if not alpha:
+                scaled.fill((0, 0, 0, 255), special_flags=pygame.BLEND_RGBA_MAX)  # Opaque, like convert() makes it
+                paletted = palettize(scaled)
+            if paletted is not None:
+                entry["palette"], pixels = paletted
+            else:
+                pixels = pygame.image.tobytes(scaled, PIXEL_FORMAT)
+            entry.update(offset=offset, length=len(pixels))
+            index[entry_key(name, alpha, size)] = entry
+            padding = -len(pixels) % ALIGNMENT
+            blocks.append(pixels + bytes(padding))
+            offset += len(pixels) + padding
+
+    index_bytes = json.dumps(index).encode()
+    header_length = len(MAGIC) + 4 + len(index_bytes)
+    header_padding = -header_length % ALIGNMENT
+    temp_path = pack_path + ".tmp"
+    with open(temp_path, "wb") as file:
+        file.write(MAGIC + struct.pack("<I", len(index_bytes)) + index_bytes + bytes(header_padding))
+        for block in blocks:
+            file.write(block)
+    os.replace(temp_path, pack_path)
+    return len(index), header_length + header_padding + offset
+
+
+class AssetPack:
+    def __init__(self, path, sprite_dir):
+        self.sprite_dir = sprite_dir
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not an asset pack")
+        (index_length,) = struct.unpack_from("<I", self._map, len(MAGIC))
+        index_start = len(MAGIC) + 4
+        self.index = json.loads(self._map[index_start:index_start + index_length])
+        self._data_start = index_start + index_length + (-(index_start + index_length) % ALIGNMENT)
+        self._pixels = memoryview(self._map)
+        self._fresh = {}  # file name -> whether the packed copy still matches the PNG
+
+    def surface(self, name, alpha, size):
+        # A surface over the packed pixels, or None if the pack doesn't have this one (or it's out of date)
+        entry = self.index.get(entry_key(name, alpha, size))
+        if entry is None or not self._is_fresh(name, entry):
+            return None
+        start = self._data_start + entry["offset"]
+        if "palette" in entry:
+            # Blits from 8 bits a pixel cost about the same as from the display format, so no copy
+            surface = pygame.image.frombuffer(self._pixels[start:start + entry["length"]], tuple(size), "P")
+            surface.set_palette(entry["palette"])
+            return surface
+        surface = pygame.image.frombuffer(self._pixels[start:start + entry["length"]], tuple(size), PIXEL_FORMAT)
+
+        display = pygame.display.get_surface()
+        if not alpha and display is not None:
+            # Opaque images get one copy into the display format: blitting them with per-pixel alpha
+            # every frame costs more than that copy. Still no decoding or scaling.
+            return surface.convert()
+        if display is not None and display.get_masks()[:3] != DISPLAY_MASKS:
+            return surface.convert_alpha()  # Unusual display format, blits would convert every time
+        return surface
+
+    def _is_fresh(self, name, entry):
+        fresh = self._fresh.get(name)
+        if fresh is None:
+            try:
+                fresh = source_stamp(os.path.join(self.sprite_dir, name)) == entry["source"]
+            except OSError:
+                fresh = False
+            self._fresh[name] = fresh
+        return fresh
+
+
+def open_pack(path, sprite_dir):
+    # None when there is no pack (or it can't be read); the game then decodes the PNGs like before
+    if not os.path.exists(path):
+        return None
+    try:
+        return AssetPack(path, sprite_dir)
+    except (OSError, ValueError) as error:
+        print(f"Ignoring asset pack {path}: {error}")
+        return None
+
+
+def main():
+    import assets  # Only for the folder names
+
+    parser = argparse.ArgumentParser(description="Pack Casper's sprites into one memory-mappable file")
+    parser.add_argument("--out", default=assets.PACK_PATH)
+    args = parser.parse_args()
+    count, size = build(assets.SPRITE_DIR, args.out)
+    print(f"Packed {count} images into {args.out} ({size / 1024 / 1024:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
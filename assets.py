@@ -0,0 +1,225 @@
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+import pygame
+
+import asset_pack
+
+# Folder the sprite PNGs actually live in
+SPRITE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sprites", "Sprites")
+PACK_PATH = os.path.join(os.path.dirname(SPRITE_DIR), "assets.pack")  # Built by asset_pack.py, optional
+
+BUDGET = 64 * 1024 * 1024  # Bytes of surfaces kept before the least recently used get evicted
+
+# Memory: everything cached here, plus the surfaces the game registers with track(), has to fit in
+# budget. When it doesn't, full-size images go first (they are only needed to scale from), then the
+# least recently used scaled variants. Scaled variants are compacted as they come in (see compact), except
+# the ones straight from the asset pack, which sit on the mapped file and cost no copy at all.
+budget = BUDGET
+
+_images = OrderedDict()  # (file name, alpha) -> decoded and converted full-size surface, oldest first
+_scaled = OrderedDict()  # (file name, alpha, size) -> scaled surface, oldest first
+_tracked = {}  # name -> surface the game keeps itself (baked background, achievements list)
+_cached_bytes = 0  # In _images and _scaled
+_rle_bytes = weakref.WeakKeyDictionary()  # RLE surface -> estimated size, SDL frees its plain pixels
+_masks = {}  # (file name, size) -> pygame.mask.Mask of the scaled image, for clicks (see hittest.py)
+_lock = threading.Lock()  # The preloader thread fills the caches while the game reads them
+_pack = None
+_pack_opened = False
+
+
+def asset_path(name):
+    return os.path.join(SPRITE_DIR, os.path.basename(name))
+
+
+def pack():
+    # The memory-mapped asset pack, opened on first use; None if it hasn't been built
+    global _pack, _pack_opened
+    with _lock:
+        if not _pack_opened:
+            _pack = asset_pack.open_pack(PACK_PATH, SPRITE_DIR)
+            _pack_opened = True
+        return _pack
+
+
+def surface_bytes(surface):
+    # Memory a surface takes, estimated for run-length encoded ones
+    size = _rle_bytes.get(surface)
+    return size if size is not None else surface.get_pitch() * surface.get_height()
+
+
+def compact(surface, alpha=True):
+    # Anything with transparent parts gets RLE acceleration: blits skip the clear runs, and SDL drops the
+    # plain pixels after encoding. Opaque images (the window sized backgrounds) stay as they are; they
+    # only get 8 bits a pixel when the asset pack was built with them that way (see asset_pack.py), as
+    # working out a palette here costs far more than the scaling.
+    if not alpha:
+        return surface
+    visible = pygame.mask.from_surface(surface, 0).count()
+    if visible == surface.get_width() * surface.get_height():
+        return surface  # Nothing transparent after all
+    surface.set_alpha(255, pygame.RLEACCEL)
+    _rle_bytes[surface] = visible * 4 + surface.get_height() * 8  # Runs of visible pixels plus a little per row
+    return surface
+
+
+def _add(cache, key, surface):
+    # Under the lock
+    global _cached_bytes
+    cache[key] = surface
+    _cached_bytes += surface_bytes(surface)
+    _evict()
+
+
+def _evict():
+    # Under the lock. The newest scaled variant always stays, it is about to be drawn.
+    global _cached_bytes
+    tracked = sum(surface_bytes(surface) for surface in _tracked.values())
+    while _cached_bytes + tracked > budget and (_images or len(_scaled) > 1):
+        cache = _images if _images else _scaled
+        _cached_bytes -= surface_bytes(cache.popitem(last=False)[1])
+
+
+def track(name, surface):
+    # Counts a surface the game holds on to against the budget (None when it lets go of it)
+    with _lock:
+        if surface is None:
+            _tracked.pop(name, None)
+        else:
+            _tracked[name] = surface
+            _evict()
+
+
+def resident_bytes():
+    # Bytes of surfaces by where they are kept
+    with _lock:
+        return {
+            "images": sum(surface_bytes(surface) for surface in _images.values()),
+            "scaled": sum(surface_bytes(surface) for surface in _scaled.values()),
+            "tracked": sum(surface_bytes(surface) for surface in _tracked.values()),
+            "masks": sum(mask.get_size()[0] * mask.get_size()[1] // 8 for mask in _masks.values()),  # A bit a pixel
+        }
+
+
+def load_image(name, alpha=True):
+    # Decode each PNG only once and convert it to the display's pixel format
+    key = (os.path.basename(name), alpha)
+    with _lock:
+        image = _images.get(key)
+        if image is not None:
+            _images.move_to_end(key)
+    if image is None:
+        # Decode outside the lock so the other thread isn't held up by a big PNG
+        image = pygame.image.load(asset_path(name))
+        if pygame.display.get_surface() is not None:  # convert() needs a display mode
+            image = image.convert_alpha() if alpha else image.convert()
+        with _lock:
+            if key in _images:
+                image = _images[key]  # The other thread was quicker
+            else:
+                _add(_images, key, image)
+    return image
+
+
+def get_scaled(name, size, alpha=True):
+    key = (os.path.basename(name), alpha, tuple(size))
+    with _lock:
+        surface = _scaled.get(key)
+        if surface is not None:
+            _scaled.move_to_end(key)
+            return surface
+
+    packed = pack()
+    if packed is not None:
+        surface = packed.surface(key[0], alpha, key[2])  # Already at this size, nothing to decode or scale
+    if packed is None or surface is None:
+        surface = compact(pygame.transform.scale(load_image(name, alpha), key[2]), alpha)
+    with _lock:
+        if key in _scaled:
+            surface = _scaled[key]  # The other thread was quicker
+        else:
+            _add(_scaled, key, surface)
+    return surface
+
+
+def get_scaled_nowait(name, size, alpha=True):
+    # The scaled surface if it is cached already, otherwise the most recently used other size of the
+    # same image (or None), to draw with while the preloader makes the right size
+    image_key = (os.path.basename(name), alpha)
+    key = image_key + (tuple(size),)
+    with _lock:
+        surface = _scaled.get(key)
+        if surface is not None:
+            _scaled.move_to_end(key)
+            return surface
+        for other_key in reversed(_scaled):
+            if other_key[:2] == image_key:
+                return _scaled[other_key]
+    return None
+
+
+def get_mask(name, size):
+    # Which pixels of the image scaled to size are solid. While that size is still being scaled the mask
+    # of another size is scaled to it instead, which is close enough for a click but doesn't get cached.
+    key = (os.path.basename(name), tuple(size))
+    mask = _masks.get(key)
+    if mask is not None:
+        return mask
+    surface = get_scaled_nowait(name, size) or get_scaled(name, size)
+    mask = pygame.mask.from_surface(surface)
+    if surface.get_size() != key[1]:
+        return mask.scale(key[1])
+    _masks[key] = mask
+    return mask
+
+
+def drop_size(size):
+    # Forget the variants scaled to a size we no longer use (e.g. the old window size after a resize)
+    global _cached_bytes
+    size = tuple(size)
+    with _lock:
+        for key in [key for key in _scaled if key[2] == size]:
+            _cached_bytes -= surface_bytes(_scaled.pop(key))
+    for key in [key for key in _masks if key[1] == size]:
+        del _masks[key]
+
+
+def clear():
+    global _pack, _pack_opened, _cached_bytes
+    with _lock:
+        _images.clear()
+        _scaled.clear()
+        _masks.clear()
+        _cached_bytes = 0
+        _pack, _pack_opened = None, False  # Picks up a rebuilt pack next time
+
+
+class Preloader:
+    # Loads and scales a list of (name, size, alpha) on a background thread. ready() says whether it's
+    # done; wait() blocks until it is, and returns right away if it already finished.
+    def __init__(self, jobs):
+        self.jobs = list(jobs)
+        self.error = None
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="asset-preloader", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            for name, size, alpha in self.jobs:
+                get_scaled(name, size, alpha)
+        except Exception as error:  # Handed to whoever waits, the game thread can report it
+            self.error = error
+        finally:
+            self._done.set()
+
+    def ready(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        self._done.wait(timeout)
+        if self.error is not None:
+            raise self.error
+        return self.ready()
@@ -0,0 +1,257 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")  # Headless, must be set before pygame opens a display
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+import assets
+import engine
+import journal
+import persistence
+import profiles
+import renderer
+import screens
+
+# Repeatable benchmarks for the hot paths: drawing the gameplay and achievements screens, resizing,
+# saving player data and checking achievements. Everything runs with fixed seeds on the dummy video
+# driver and the results go to a JSON file, so two runs (say, two releases) can be compared with --compare.
+
+SEED = 1234
+WINDOW_SIZE = (800, 600)
+
+BACKGROUNDS = [None] + engine.BACKGROUND_REWARDS  # Every background the game can draw, None is the default white
+SCROLL_OFFSETS = [0, -400, -800]
+SAVE_SIZES = [14, 1000, 10000]  # Achievements in the saved player data
+CATALOG_SIZES = [14, 1000, 10000]  # Achievements in the synthetic catalog
+WINDOW_SIZES = [(640, 480), (800, 600), (1280, 720), (1920, 1080)]
+
+
+def measure(function, repeats, warmup=3, setup=None):
+    # Milliseconds per call over the repeats, after a few untimed calls to fill the caches.
+    # With setup, each call gets a fresh setup() result to work on, made outside the timing.
+    for _ in range(warmup):
+        function(setup()) if setup is not None else function()
+    samples = []
+    for _ in range(repeats):
+        argument = setup() if setup is not None else None
+        started = time.perf_counter()
+        function(argument) if setup is not None else function()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "median_ms": statistics.median(samples),
+        "p95_ms": samples[min(len(samples) - 1, int(round((len(samples) - 1) * 0.95)))],
+        "min_ms": samples[0],
+        "repeats": repeats,
+    }
+
+
+class Scene:
+    # The gameplay screen at one window size, drawn by the game's own screens.py with the game's layout
+    def __init__(self, size):
+        self.size = size
+        self.layout = screens.make_layout()
+        self.backgrounds = {}  # (background, window size) -> baked surface
+        self.resize(size)
+
+    def resize(self, size):
+        assets.drop_size(self.size)  # Same as the game: backgrounds at the old size are stale
+        self.backgrounds.clear()
+        self.size = size
+        self.screen = pygame.display.set_mode(size, pygame.RESIZABLE)
+        renderer.invalidate()
+        self.rects = self.layout.rects(size)
+
+    def background(self, background):
+        # Baked once per window size, like the game's equipped_background
+        key = (background, self.size)
+        if key not in self.backgrounds:
+            reward = engine.REWARDS.get(background)
+            image = assets.get_scaled(reward["asset"], self.size, alpha=False) if reward is not None and reward["kind"] == "image" else None
+            self.backgrounds[key] = screens.bake_background(reward, self.size, image)
+        return self.backgrounds[key]
+
+    def draw_gameplay(self, background):
+        # A full redraw of the gameplay screen, like the first frame after starting a game
+        renderer.invalidate()  # Every call presents the whole window, not just the first one
+        rects = self.rects
+        screens.draw_background(self.screen, self.background(background))
+        sprite = assets.get_scaled("sprites/Casper_sprite.png", rects["casper_sprite"].size)
+        speech_bubble = assets.get_scaled("sprites/speech_bubble.png", rects["speech_bubble"].size)
+        screens.draw_gameplay_art(self.screen, rects, sprite, speech_bubble)
+        screens.draw_gameplay_ui(self.screen, rects, 3, 9, "7", True, "Correct! Casper was thinking of 7.")
+        renderer.present(self.screen)
+
+
+def bench_gameplay(repeats):
+    scene = Scene(WINDOW_SIZE)
+    results = {}
+    for background in BACKGROUNDS:
+        results[background or "none"] = measure(lambda: scene.draw_gameplay(background), repeats)
+    return results
+
+
+def bench_achievements(repeats):
+    # The achievements screen blits a window sized slice of the prerendered list, then the title and button
+    scene = Scene(WINDOW_SIZE)
+    achievements = [dict(achievement, unlocked=row % 2 == 0) for row, achievement in enumerate(engine.ACHIEVEMENTS)]
+    atlas, buttons = screens.build_achievements_atlas(achievements, scene.size, scene.rects, {engine.BACKGROUND_REWARDS[0]})
+
+    def frame(scroll_offset):
+        renderer.invalidate()  # Scrolling redraws and presents the whole window
+        screens.draw_achievements(scene.screen, scene.rects, atlas, scroll_offset)
+        renderer.present(scene.screen)
+
+    return {str(scroll_offset): measure(lambda: frame(scroll_offset), repeats) for scroll_offset in SCROLL_OFFSETS}
+
+
+def bench_resize(repeats):
+    # Handling one VIDEORESIZE: new display surface, backgrounds rescaled, then the first frame at that size
+    scene = Scene(WINDOW_SIZE)
+    results = {}
+    for size in WINDOW_SIZES:
+        def resize():
+            scene.resize(size)
+            scene.draw_gameplay("galaxy")
+            assets.drop_size(size)  # Next repeat pays for the rescale again
+        results[f"{size[0]}x{size[1]}"] = measure(resize, repeats)
+    return results
+
+
+def synthetic_player_data(achievement_count, rng):
+    player_data = engine.new_player_data()
+    player_data["achievements"] = {f"Achievement {number}": rng.random() < 0.5 for number in range(achievement_count)}
+    return player_data
+
+
+def bench_save(repeats, directory):
+    # What one save costs: handing it to the background writer (the game's json store), the write the
+    # writer then does, a save into the sqlite profile store and one event appended to the journal store
+    rng = random.Random(SEED)
+    path = os.path.join(directory, "player_datas.json")
+    persistence.SAVE_PATH = path  # Never touch the real save
+    store = profiles.ProfileStore(os.path.join(directory, "players.db"))
+    journal_store = journal.JournalStore(directory, compact_after=10 ** 9)  # Compaction is off the hot path
+    journal_store.load()
+    results = {}
+    for size in SAVE_SIZES:
+        player_data = synthetic_player_data(size, rng)
+
+        def sqlite_save():
+            player_data["total_correct_guesses"] += 1  # Something has to change or nothing gets written
+            store.save("Benchmark", player_data)
+
+        results[str(size)] = {
+            "queue": measure(lambda: persistence.save(player_data), repeats),
+            "write_atomic": measure(lambda: persistence.write_atomic(path, player_data), max(1, repeats // 10)),
+            "sqlite": measure(sqlite_save, repeats),
+            "journal": measure(lambda: journal_store.append("guess", (True, 5, 5)), repeats),  # Same cost at any size
+        }
+    persistence.flush()
+    store.close()
+    journal_store.close()
+    return results
+
+
+def synthetic_catalog(size, rng):
+    # Achievements spread over the game's counters with thresholds up to 1000
+    return [{
+        "name": f"Achievement {number}",
+        "description": "",
+        "reward": rng.choice(engine.BACKGROUND_REWARDS),
+        "counter": rng.choice(engine.COUNTERS),
+        "threshold": rng.randint(1, 1000),
+        "unlocked": False,
+    } for number in range(size)]
+
+
+def bench_check_achievements(repeats, guesses=1000):
+    # One sample is a fresh player making a fixed sequence of guesses, so every run unlocks the same things
+    rng = random.Random(SEED)
+    results = {}
+    for size in CATALOG_SIZES:
+        catalog = synthetic_catalog(size, rng)
+        outcomes = [rng.random() < 0.3 for _ in range(guesses)]
+
+        def new_player():
+            return engine.CasperGame(achievements=catalog, rng=random.Random(SEED))
+
+        def play(game):
+            for correct in outcomes:
+                game.update_score(correct)
+
+        timing = measure(play, max(1, repeats // 10), warmup=1, setup=new_player)  # Only the guesses are timed
+        timing["per_guess_us"] = timing["median_ms"] * 1000 / guesses
+        results[str(size)] = timing
+    return results
+
+
+def run(repeats):
+    pygame.display.init()
+    pygame.font.init()
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "sdl": ".".join(str(part) for part in pygame.get_sdl_version()),
+            "video_driver": pygame.display.get_driver(),
+            "seed": SEED,
+            "repeats": repeats,
+        },
+        "gameplay_frame": bench_gameplay(repeats),
+        "achievements_frame": bench_achievements(repeats),
+        "resize": bench_resize(max(1, repeats // 10)),
+        "check_achievements": bench_check_achievements(repeats),
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        results["save_player_data"] = bench_save(repeats, directory)
+    pygame.quit()
+    return results
+
+
+def flatten(results, prefix=""):
+    # "group/case/..." -> median ms, for printing and comparing
+    flat = {}
+    for key, value in results.items():
+        if key == "meta":
+            continue
+        if "median_ms" in value:
+            flat[prefix + key] = value["median_ms"]
+        else:
+            flat.update(flatten(value, prefix + key + "/"))
+    return flat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Casper's rendering, persistence and achievement paths")
+    parser.add_argument("--out", default="benchmark_results.json", help="where to write the results")
+    parser.add_argument("--repeats", type=int, default=100, help="timed calls per case (slow cases use a tenth)")
+    parser.add_argument("--compare", metavar="OLD_RESULTS", help="print how these results compare to an earlier results file")
+    args = parser.parse_args()
+
+    results = run(args.repeats)
+    with open(args.out, "w") as file:
+        json.dump(results, file, indent=2)
+
+    old = {}
+    if args.compare:
+        with open(args.compare) as file:
+            old = flatten(json.load(file))
+    for name, median in flatten(results).items():
+        line = f"{name:<50} {median:10.3f} ms"
+        if name in old and old[name]:
+            line += f"   {median / old[name]:6.2f}x vs old"
+        print(line)
+    print(f"Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,84 @@
-import pygame
-import json
+import argparse
+import os
 import random
+import time
+
+startup_started = time.perf_counter()  # Before the heavy imports, for the time to first frame
 
-pygame.init()
+import pygame
+
+import animation
+import assets
+import client
+import engine
+import events
+import fonts
+import hittest
+import journal
+import pacing
+import persistence
+import profiler
+import profiles
+import renderer
+import replay
+import screens
+import stats
+
+parser = argparse.ArgumentParser(description="Casper The CPU")
+parser.add_argument("--store", choices=["json", "sqlite", "journal"], default="json",
+                    help="keep player data in player_datas.json, in the shared profile database or in an append-only event journal")
+parser.add_argument("--profile", default=profiles.DEFAULT_PROFILE, help="player profile to play as with --store sqlite or --server")
+parser.add_argument("--server", metavar="HOST:PORT", help="play on a game server (see server.py) instead of saving locally")
+parser.add_argument("--profiler", action="store_true", help="show the frame time overlay from the start (F3 toggles it)")
+parser.add_argument("--trace", metavar="PATH", help="record every frame's phase timings and write them to PATH (.csv or .json) on exit")
+parser.add_argument("--pacing", choices=["idle", "fixed"], default="idle",
+                    help="idle: sleep until input when nothing changes on screen, fixed: always run at the frame cap")
+parser.add_argument("--fps-cap", type=int, default=pacing.FRAME_CAP, help="frames per second while something is happening")
+parser.add_argument("--busy-loop", action="store_true", help="use the more accurate, CPU hungry clock.tick_busy_loop")
+parser.add_argument("--vsync", action="store_true", help="ask for vsync (only drivers with a hardware renderer honor it)")
+parser.add_argument("--backend", choices=["surface", "texture"], default="surface",
+                    help="surface: software blits onto the window, texture: SDL renderer with the sprites and backgrounds as textures")
+parser.add_argument("--software-renderer", action="store_true", help="with --backend texture, use SDL's software renderer even if there is a GPU")
+parser.add_argument("--surface-budget", type=int, default=assets.BUDGET // (1024 * 1024), metavar="MB",
+                    help="megabytes of cached images the game keeps before evicting the least recently used")
+parser.add_argument("--record", metavar="PATH", help="record the session (rng seed, starting player data and input) to PATH")
+parser.add_argument("--replay", metavar="PATH", help="play back a session recorded with --record, without saving, and report its frame times")
+parser.add_argument("--replay-speed", choices=["fast", "realtime"], default="fast",
+                    help="fast: every frame back to back on the dummy video driver, realtime: in a window at the recorded pace")
+args = parser.parse_args()
+if args.server and (args.record or args.replay):
+    parser.error("--record and --replay need a local game, Casper's numbers come from the server otherwise")
+if args.replay:
+    try:
+        replay_header = replay.start_replay(args.replay, realtime=args.replay_speed == "realtime")
+    except (OSError, ValueError) as error:
+        parser.error(f"can't replay {args.replay}: {error}")
+    args.pacing = "fixed"  # Recorded events don't wake an idle wait
+    if args.replay_speed == "fast":
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        args.fps_cap = 0  # No cap, clock.tick(0) doesn't wait
+assets.budget = args.surface_budget * 1024 * 1024
+pacing.mode = args.pacing
+pacing.frame_cap = args.fps_cap
+pacing.busy_loop = args.busy_loop
+profiler.overlay_enabled = args.profiler
+profiler.tracing = args.trace is not None or args.replay is not None  # A replay reports on every frame
+
+# Only what the game uses; pygame.init() would also bring up the mixer and joysticks.
+# The timer comes up with the clock's first tick.
+pygame.display.init()
+pygame.font.init()
 
 # Window setup
 window_width = 800
 window_height = 600
-screen = pygame.display.set_mode((window_width, window_height), pygame.RESIZABLE)
-pygame.display.set_caption("Casper The CPU")
+screen = renderer.open_window((window_width, window_height), "Casper The CPU", vsync=args.vsync,
+                              texture=args.backend == "texture", software=args.software_renderer)
+if renderer.textures():
+    # The game window isn't the display module's, so resizing and closing it come as window events
+    events.allow_only(events.ALLOWED_EVENTS + [pygame.WINDOWSIZECHANGED, pygame.WINDOWCLOSE])
+else:
+    events.allow_only()
 
 
 background_color = (255, 255, 255)
@@ -18,17 +88,17 @@ gray = (200, 200, 200)
 dark_gray = (150, 150, 150)
 text_color = (0, 0, 0)
 
-feedback_rect = pygame.Rect(0, window_height - 30, window_width, 30)  # Define the area for feedback text
-score_rect = pygame.Rect(0, 0, 200, 50)  # Define the area for score text
-high_score_rect = pygame.Rect(0, 50, 200, 50)  # Define the area for high score text
+feedback_rect = pygame.Rect(0, 0, 0, 0)  # Define the area for feedback text
+score_rect = pygame.Rect(0, 0, 0, 0)  # Define the area for score text
+high_score_rect = pygame.Rect(0, 0, 0, 0)  # Define the area for high score text
 
-font = pygame.font.Font(None, 60)  # Title font
-button_font = pygame.font.Font(None, 40)  # Button font
-submit_button_font = pygame.font.Font(None, 30)  # Smaller font for submit button
+font = fonts.get_font(60)  # Title font
+button_font = fonts.get_font(40)  # Button font
+submit_button_font = fonts.get_font(30)  # Smaller font for submit button
 
 # Title text (moved higher)
-title_text = font.render("Casper The CPU", True, (0, 0, 0))
-title_rect = title_text.get_rect(center=(window_width // 2, window_height // 4))  # Adjusted position
+title_text = fonts.render(font, "Casper The CPU", (0, 0, 0))
+title_rect = title_text.get_rect()
 
 # Button dimensions
 button_width, button_height = 250, 60
@@ -38,127 +108,22 @@ button_color = (200, 200, 200)
 # Buttons (centered)
 start_button_rect = pygame.Rect(0, 0, button_width, button_height)
 achievements_button_rect = pygame.Rect(0, 0, button_width, button_height)
+statistics_button_rect = pygame.Rect(0, 0, button_width, button_height)
 settings_button_rect = pygame.Rect(0, 0, button_width, button_height)  # New Settings button
 exit_button_rect = pygame.Rect(0, 0, button_width, button_height)
 
-# Button positions
-start_button_rect.centerx = achievements_button_rect.centerx = settings_button_rect.centerx = exit_button_rect.centerx = window_width // 2
-start_button_rect.top = title_rect.bottom + 50  # Increased spacing
-achievements_button_rect.top = start_button_rect.bottom + button_spacing
-settings_button_rect.top = achievements_button_rect.bottom + button_spacing  # Positioning Settings button
-exit_button_rect.top = settings_button_rect.bottom + button_spacing
-
 current_screen = "menu"
 # Initialization
 show_confirmation_popup = False
-caspers_sprite_taps = 0
-
-# Achievements
-achievements = [
-    {
-        "name": "First Day on the Job",
-        "description": "Awarded for making the first correct guess",
-        "reward": "light_pink",
-        "condition": lambda data: data["total_correct_guesses"] >= 1,  # Check total correct guesses
-        "unlocked": False
-    },
-    {
-        "name": "Third Time's the Charm!",
-        "description": "Awarded for making 3 correct consecutive guesses",
-        "reward": "light_blue",
-        "condition": lambda data: data["correct_consecutive_guesses"] >= 3,
-        "unlocked": False
-    },
-    {
-        "name": "The Big 5",
-        "description": "Awarded for making 5 correct consecutive guesses",
-        "reward": "yellow",
-        "condition": lambda data: data["correct_consecutive_guesses"] >= 5,
-        "unlocked": False
-    },
-    {
-        "name": "Lucky Number",
-        "description": "Awarded for making 7 correct consecutive guesses",
-        "reward": "green",
-        "condition": lambda data: data["correct_consecutive_guesses"] >= 7,
-        "unlocked": False
-    },
-    {
-        "name": "The Impossible",
-        "description": "Awarded for making 10 correct consecutive guesses",
-        "reward": "galaxy",
-        "condition": lambda data: data["correct_consecutive_guesses"] >= 10,
-        "unlocked": False
-    },
-    {
-        "name": "The Start",
-        "description": "Awarded for 5 total correct guesses",
-        "reward": "black",
-        "condition": lambda data: data["total_correct_guesses"] >= 5,
-        "unlocked": False
-    },
-    {
-        "name": "Hobbyist",
-        "description": "Awarded for 25 total correct guesses",
-        "reward": "rainbow",
-        "condition": lambda data: data["total_correct_guesses"] >= 25,
-        "unlocked": False
-    },
-    {
-        "name": "Expert Guesser",
-        "description": "Awarded for 50 total correct guesses",
-        "reward": "food_rain",
-        "condition": lambda data: data["total_correct_guesses"] >= 50,
-        "unlocked": False
-    },
-    {
-        "name": "Bad Start",
-        "description": "Awarded for 5 total incorrect guesses",
-        "reward": "brown",
-        "condition": lambda data: data["incorrect_guesses"] >= 5,
-        "unlocked": False
-    },
-    {
-        "name": "Going Lower",
-        "description": "Awarded for 25 total incorrect guesses",
-        "reward": "dark_green",
-        "condition": lambda data: data["incorrect_guesses"] >= 25,
-        "unlocked": False
-    },
-    {
-        "name": "Bottom of the Barrel",
-        "description": "Awarded for 50 total incorrect guesses",
-        "reward": "poop",
-        "condition": lambda data: data["incorrect_guesses"] >= 50,
-        "unlocked": False
-    },
-    {
-        "name": "Avid Collector",
-        "description": "Awarded for Collecting all backgrounds",
-        "reward": "party_hat",
-        "condition": lambda data: data.get("all_backgrounds_collected", False),
-        "unlocked": False
-    },
-    {
-        "name": "Who's a good boy?",
-        "description": "Awarded for tapping on Casper's sprite 10 times",
-        "reward": "cat_ears",
-        "condition": lambda data: data.get("caspers_sprite_taps", 0) >= 10,
-        "unlocked": False
-    },
-    {
-        "name": "Master Guesser",
-        "description": "Awarded for completing all other achievements",
-        "reward": "caspers_gf",
-        "condition": lambda data: all(ach["unlocked"] for ach in achievements[:-1]),  # All other achievements must be unlocked
-        "unlocked": False
-    }
-]
 
 def load_and_scale_background(image_path, window_width, window_height):
-    background_image = pygame.image.load(image_path)
-    background_image = pygame.transform.scale(background_image, (window_width, window_height))
-    return background_image
+    # Backgrounds are opaque, so keep them in the display format for fast blits.
+    # Right after a resize the old size fills in until the preloader has the new one.
+    size = (window_width, window_height)
+    return assets.get_scaled_nowait(image_path, size, alpha=False) or assets.get_scaled(image_path, size, alpha=False)
+
+def sprite_surface(image_path, size):
+    return assets.get_scaled_nowait(image_path, size) or assets.get_scaled(image_path, size)
 
 def transition_to_menu():
     screen.fill(white)  # Clear the entire screen
@@ -169,160 +134,154 @@ def transition_to_menu():
     feedback_text = ""
 
     
-def render_feedback_text(feedback_text):
-    # Clear the feedback text area
-    screen.fill(white, feedback_rect)
-
-    # Render and draw the new feedback text
-    feedback_surface = button_font.render(feedback_text, True, black)
-    screen.blit(feedback_surface, feedback_rect)
-    pygame.display.flip()  # Refresh the display
-
-def transition_to_gameplay():
-    # Clear the entire screen
-    screen.fill(white)
-
-    # Apply equipped background
-    background_image = None
-    if "background" in player_data["equipped"]:
-        background = player_data["equipped"]["background"]
-        if background == "galaxy":
-            background_image = load_and_scale_background("sprites/Galaxy_background.png", window_width, window_height)
-        elif background == "rainbow":
-            background_image = load_and_scale_background("sprites/Rainbow_background.png", window_width, window_height)
-        elif background == "food_rain":
-            background_image = load_and_scale_background("sprites/food_rain_background.png", window_width, window_height)
-        elif background == "poop":
-            background_image = load_and_scale_background("sprites/poop_background.png", window_width, window_height)
-        
-        if background_image:
-            screen.blit(background_image, (0, 0))
-        else:
-            if background == "light_pink":
-                screen.fill((255, 192, 203))  # Light pink
-            elif background == "light_blue":
-                screen.fill((173, 216, 230))  # Light blue
-            elif background == "yellow":
-                screen.fill((255, 255, 0))  # Yellow
-            elif background == "green":
-                screen.fill((0, 255, 0))  # Green
-            elif background == "black":
-                screen.fill((0, 0, 0))  # Black
-            elif background == "brown":
-                screen.fill((139, 69, 19))  # Brown
-            elif background == "dark_green":
-                screen.fill((0, 100, 0))  # Dark Green
-    else:
-        screen.fill(white)  # Default to white background
-
-    # Additional transition logic...
-    # Reset relevant game variables, prepare UI elements, etc.
+def transition_to_gameplay(scroll=0):
+    # Draw the equipped background over the entire screen; scroll is how far a scrolling one has fallen
+    screens.draw_background(screen, equipped_background(), scroll)
 
 def clear_background():
     screen.fill(white) # currently not in use
     
-def check_achievements():
-    global achievements
-    for achievement in achievements:
-        if not achievement["unlocked"] and achievement["condition"](player_data):
-            achievement["unlocked"] = True
-            player_data["achievements"][achievement["name"]] = True
-
-            # Update equipped dictionary based on the reward type
-            player_data["equipped"] = player_data.get("equipped", {})
-            if achievement["reward"] in ["light_pink", "light_blue", "yellow", "green", "black", "galaxy", "rainbow", "food_rain", "brown", "dark_green", "poop"]:
-                player_data["equipped"]["background"] = achievement["reward"]
-            elif achievement["reward"] in ["party_hat", "cat_ears", "caspers_gf"]:
-                player_data["equipped"]["sprite"] = achievement["reward"]
-            
-            print(f"Achievement Unlocked: {achievement['name']}")
-
-    # Save player data after checking achievements
-    save_player_data()
-
-def reset_player_data():
-    global player_data, high_score, correct_consecutive_guesses, total_correct_guesses, incorrect_guesses, caspers_sprite_taps
-    high_score = 0
-    correct_consecutive_guesses = 0
-    total_correct_guesses = 0
-    incorrect_guesses = 0
-    caspers_sprite_taps = 0
-    player_data = {
-        "high_score": high_score,
-        "correct_consecutive_guesses": correct_consecutive_guesses,
-        "total_correct_guesses": total_correct_guesses,
-        "incorrect_guesses": incorrect_guesses,
-        "caspers_sprite_taps": caspers_sprite_taps,
-        "achievements": {achievement["name"]: False for achievement in achievements},
-        "equipped": {}  # Ensure equipped key is initialized
-    }
-    
-    save_player_data()
-    
 # Gameplay GUI elements
 guess_input = ""
 input_active = False
 feedback_text = ""
-score = 0
-high_score = 0
-correct_consecutive_guesses = 0
-total_correct_guesses = 0
-total_incorrect_guesses = 0
-
-def generate_new_casper_number():
-    return random.randint(1, 10)
 
-casper_number = generate_new_casper_number()
-
-
-player_data = {}
-try:
-    with open("player_datas.json", "r") as file:
-        file_content = file.read().strip()
-        if file_content:
-            player_data = json.loads(file_content)
-        else:
-            player_data = {}
-        high_score = player_data.get("high_score", 0)
-        correct_consecutive_guesses = player_data.get("correct_consecutive_guesses", 0)
-        total_correct_guesses = player_data.get("total_correct_guesses", 0)
-        incorrect_guesses = player_data.get("incorrect_guesses", 0)  # Load incorrect guesses
-        caspers_sprite_taps = player_data.get("caspers_sprite_taps", 0)  # Load sprite taps
-        player_data["equipped"] = player_data.get("equipped", {})  # Ensure equipped key is present
-        # Initialize achievements key if not present
-        if "achievements" not in player_data:
-            player_data["achievements"] = {achievement["name"]: False for achievement in achievements}
-        print("Loaded Player Data: ", player_data)
-except (FileNotFoundError, json.JSONDecodeError):
-    high_score = 0
-    correct_consecutive_guesses = 0
-    total_correct_guesses = 0
-    incorrect_guesses = 0
-    caspers_sprite_taps = 0  # Initialize sprite taps
-    player_data = {
-        "equipped": {},  # Initialize equipped rewards
-        "achievements": {achievement["name"]: False for achievement in achievements}
-    }
-    
-
-# Load achievements status
-for achievement in achievements:
-    achievement_name = achievement["name"]
-    achievement["unlocked"] = player_data["achievements"].get(achievement_name, False)
-
-# Load Casper's sprites
-neutral_sprite = pygame.image.load("sprites/Casper_sprite.png")
-angry_sprite = pygame.image.load("sprites/angry_casper.png")
-neutral_sprite = pygame.transform.scale(neutral_sprite, (600, 600))  # Resizing sprites
-angry_sprite = pygame.transform.scale(angry_sprite, (600, 600))
-
-# Load the speech bubble sprite
-speech_bubble_sprite = pygame.image.load("sprites/speech_bubble.png")
-speech_bubble_sprite = pygame.transform.scale(speech_bubble_sprite, (450, 225))  # Resize to make it bigger
-
-current_sprite = neutral_sprite  # Set the initial sprite
-current_sprite_rect = current_sprite.get_rect(center=(window_width // 4, window_height // 2))
-speech_bubble_rect = speech_bubble_sprite.get_rect(center=(current_sprite_rect.right + 100, current_sprite_rect.top + 50))
+# Animations (see animation.py), in seconds
+SPRITE_FADE = 0.25  # Casper changing face
+SCORE_POPUP = 0.8  # "+1" rising from the score
+TOAST = 2.5  # An unlocked achievement's banner, sliding in and out at the top
+TOAST_SLIDE = 0.3
+toast_queue = []  # Names of unlocked achievements whose banner hasn't been shown yet
+toast_name = None  # Whose banner is up
+previous_sprite = None  # What Casper is fading from
+
+def announce_unlock(achievement):
+    print(f"Achievement Unlocked: {achievement['name']}")
+    toast_queue.append(achievement["name"])
+
+if args.server:
+    # The server has the player data and does the saving, see the game setup below
+    player_data = None
+    save_player_data = lambda data: None
+elif args.replay:
+    # Same start as the recorded session, and nothing gets saved
+    player_data = replay_header["player_data"]
+    save_player_data = lambda data: None
+elif args.store == "sqlite":
+    # Shared cabinets: one profile per player, the old JSON save gets imported the first time
+    profile_store = profiles.ProfileStore(profiles.DB_PATH, legacy_json=persistence.SAVE_PATH)
+    player_data = profile_store.load(args.profile)
+    # Saved by the background writer like the JSON file, so a guess never waits on a commit
+    save_player_data = lambda data: persistence.save(data, lambda snapshot: profile_store.save(args.profile, snapshot))
+elif args.store == "journal":
+    # Every event goes into the journal as it happens, so there is nothing left to save as a whole
+    journal_store = journal.JournalStore(legacy_json=persistence.SAVE_PATH)
+    player_data = journal_store.load()
+    save_player_data = lambda data: None
+else:
+    player_data = engine.load_player_data(persistence.SAVE_PATH)
+    save_player_data = persistence.save
+
+def save_and_time(data):
+    profiler.start("save")
+    save_player_data(data)
+    profiler.stop("save")
+
+def record_and_time(kind, value):
+    profiler.start("save")
+    journal_store.append(kind, value)
+    profiler.stop("save")
+
+def flush_player_data():
+    # Write out anything the background writer still holds
+    profiler.start("save")
+    persistence.flush()
+    profiler.stop("save")
+
+# All the game rules and player state live in the engine, the window only draws them
+if args.server:
+    try:
+        game = client.RemoteGame(args.server, args.profile, on_unlock=announce_unlock)
+    except (OSError, RuntimeError) as error:
+        parser.error(f"can't play on {args.server}: {error}")
+else:
+    # Seeded so a recording can bring back the same Casper numbers
+    seed = replay_header["seed"] if args.replay else random.randrange(2 ** 32)
+    game = engine.CasperGame(player_data, rng=random.Random(seed), save=save_and_time, on_unlock=announce_unlock,
+                             on_event=record_and_time if args.store == "journal" and not args.replay else None)
+    if args.record:
+        replay.start_recording(args.record, seed, game.player_data)
+if args.store == "journal" and not args.server and not args.replay:
+    journal_store.attach(game)
+print("Loaded Player Data: ", game.player_data)
+
+def equipped_reward(slot):
+    # The reward registry entry (see engine.REWARDS) of what is equipped in slot, or None
+    return engine.REWARDS.get(game.player_data["equipped"].get(slot))
+
+def equipped_background_image():
+    # File name of the equipped background if it is an image, else None
+    reward = equipped_reward("background")
+    return reward["asset"] if reward is not None and reward["kind"] == "image" else None
+
+# Casper's sprites and the speech bubble get loaded in the background while the menu is up
+preload_jobs = [
+    ("sprites/Casper_sprite.png", screens.CASPER_SPRITE_SIZE, True),
+    ("sprites/angry_casper.png", screens.CASPER_SPRITE_SIZE, True),
+    ("sprites/speech_bubble.png", screens.SPEECH_BUBBLE_SIZE, True),
+]
+if equipped_reward("sprite") is not None:
+    preload_jobs.append((equipped_reward("sprite")["asset"], screens.CASPER_SPRITE_SIZE, True))
+if equipped_background_image() is not None:
+    preload_jobs.append((equipped_background_image(), (window_width, window_height), False))
+# Then everything the achievements list shows
+preload_jobs += [(name, screens.PADLOCK_SIZE, True) for name in ["sprites/locked_padlock.png", "sprites/unlocked_padlock.png"]]
+for reward in engine.REWARDS.values():
+    preload_jobs += [(reward[asset], screens.REWARD_SPRITE_SIZE, True) for asset in ["asset", "locked_asset"] if asset in reward]
+preloader = assets.Preloader(preload_jobs)
+background_loader = None  # Scales a newly equipped background to the window
+
+# Sprites are kept by file name and scaled to their rect's size when drawn
+neutral_sprite = "sprites/Casper_sprite.png"
+angry_sprite = "sprites/angry_casper.png"
+speech_bubble_sprite = "sprites/speech_bubble.png"
+current_sprite = neutral_sprite
+current_sprite_rect = pygame.Rect(0, 0, 0, 0)
+speech_bubble_rect = pygame.Rect(0, 0, 0, 0)
+
+
+# The equipped background baked into one window sized surface, so the gameplay frame draws it with a
+# single blit whether it is a color or an image (see screens.bake_background)
+background_surface = None
+background_surface_key = None  # (equipped background, window size) it was baked for
+
+def equipped_background():
+    global background_surface, background_surface_key
+    key = (game.player_data["equipped"].get("background"), window_width, window_height)
+    if key == background_surface_key:
+        return background_surface
+
+    reward = equipped_reward("background")
+    image = None
+    if reward is not None and reward["kind"] == "image":
+        image = load_and_scale_background(reward["asset"], window_width, window_height)  # Already window sized and converted
+        if image.get_size() != (window_width, window_height):
+            return image  # The old size stands in while a resize rescales it, don't keep it
+    surface = screens.bake_background(reward, (window_width, window_height), image)
+    background_surface, background_surface_key = surface, key
+    # Counts against the surface budget, unless it is the scaled image itself (the cache counts that one)
+    assets.track("background", None if reward is not None and reward["kind"] == "image" and "scroll" not in reward else surface)
+    return surface
+
+
+def finish_loading():
+    # Screens that need the sprites call this first; it only blocks if the preloader is still going
+    if not preloader.ready():
+        loading_text = fonts.render(submit_button_font, "Loading...", text_color)
+        screen.fill(background_color, feedback_rect)
+        screen.blit(loading_text, (10, feedback_rect.y))
+        renderer.show(screen)
+        preloader.wait()
 
 # Input and Submit button
 submit_button_width = 200
@@ -332,41 +291,106 @@ input_box = pygame.Rect(0, 0, 200, 50)  # Resizing input box to be the same size
 
 # Main Menu button (shared)
 main_menu_button_rect = pygame.Rect(0, 0, 200, 50)
-main_menu_button_rect.x = window_width - 220
-main_menu_button_rect.y = 50  # Positioning near the top right, horizontally aligned with input and submit box
-
-# Update the player's score and achievements
-def update_score(correct_guess):
-    global score, high_score, correct_consecutive_guesses, total_correct_guesses, incorrect_guesses
-    if correct_guess:
-        score += 1
-        correct_consecutive_guesses += 1
-        total_correct_guesses += 1
-        if score > high_score:
-            high_score = score
-    else:
-        score = 0
-        correct_consecutive_guesses = 0
-        incorrect_guesses += 1  # Increment incorrect guesses count
-
-    # Check achievements after score update
-    check_achievements()
-
-
-# Update player data file
-def save_player_data():
-    global player_data  # Ensure we're modifying the global player_data dictionary
-    player_data["high_score"] = high_score
-    player_data["correct_consecutive_guesses"] = correct_consecutive_guesses
-    player_data["total_correct_guesses"] = total_correct_guesses
-    player_data["incorrect_guesses"] = incorrect_guesses  # Save incorrect guesses
-    player_data["caspers_sprite_taps"] = caspers_sprite_taps  # Save sprite taps
-    player_data["achievements"] = {achievement["name"]: achievement["unlocked"] for achievement in achievements}
-    player_data["equipped"] = player_data.get("equipped", {})  # Ensure equipped key is saved
-    with open("player_datas.json", "w") as file:
-        json.dump(player_data, file)
+
+# Settings screen and its reset confirmation popup
+reset_button_rect = pygame.Rect(0, 0, 0, 0)
+confirmation_rect = pygame.Rect(0, 0, 0, 0)
+confirm_button_rect = pygame.Rect(0, 0, 0, 0)
+cancel_button_rect = pygame.Rect(0, 0, 0, 0)
+
+main_layout = screens.make_layout()  # Where everything goes, for any window size
+layout_rects = {
+    "title": title_rect, "start_button": start_button_rect, "achievements_button": achievements_button_rect,
+    "statistics_button": statistics_button_rect, "settings_button": settings_button_rect, "exit_button": exit_button_rect, "score": score_rect,
+    "high_score": high_score_rect, "feedback": feedback_rect, "casper_sprite": current_sprite_rect,
+    "speech_bubble": speech_bubble_rect, "input_box": input_box, "submit_button": submit_button_rect,
+    "main_menu_button": main_menu_button_rect, "reset_button": reset_button_rect, "confirmation": confirmation_rect,
+    "confirm_button": confirm_button_rect, "cancel_button": cancel_button_rect,
+}
+main_layout.apply((window_width, window_height), layout_rects)
+
+# What clicks can land on, per screen (see hittest.py); "confirmation" is the settings screen's popup
+hit_targets = {name: hittest.HitGrid() for name in ["menu", "gameplay", "achievements", "statistics", "settings", "confirmation"]}
+
+def register_hit_targets():
+    # Once per layout, bottom first. Casper and the speech bubble only count where they aren't see-through.
+    for grid in hit_targets.values():
+        grid.clear()
+    for name in ["start_button", "achievements_button", "statistics_button", "settings_button", "exit_button"]:
+        hit_targets["menu"].add(name, layout_rects[name])
+    hit_targets["gameplay"].add("casper_sprite", current_sprite_rect, mask=lambda: assets.get_mask(current_sprite, current_sprite_rect.size))
+    hit_targets["gameplay"].add("speech_bubble", speech_bubble_rect, mask=lambda: assets.get_mask(speech_bubble_sprite, speech_bubble_rect.size))
+    for name in ["input_box", "submit_button", "main_menu_button"]:
+        hit_targets["gameplay"].add(name, layout_rects[name])
+    for screen_name in ["achievements", "statistics"]:
+        hit_targets[screen_name].add("main_menu_button", main_menu_button_rect)
+    hit_targets["settings"].add("reset_button", reset_button_rect)
+    hit_targets["settings"].add("main_menu_button", main_menu_button_rect)
+    hit_targets["confirmation"].add("confirm_button", confirm_button_rect)
+    hit_targets["confirmation"].add("cancel_button", cancel_button_rect)
+
+def clicked(screen_name, pos):
+    # Name of the topmost target under pos on a screen, or None
+    target = hit_targets[screen_name].hit(pos)
+    return target[0] if target is not None else None
+
+register_hit_targets()
 
         
+# Achievements list atlas: every row is rendered once and only redrawn when an unlock or the equipped rewards change
+achievements_surface = None
+achievements_surface_key = None
+equip_button_index = hittest.HitGrid()  # Equip buttons in atlas coordinates, with (achievement name, reward)
+equip_buttons_by_reward = {}  # reward -> its equip button rects, for redrawing just those
+
+
+def achievements_state_key():
+    return (
+        window_width,
+        window_height,
+        tuple(achievement["unlocked"] for achievement in game.achievements),
+        game.player_data["equipped"].get("background"),
+        game.player_data["equipped"].get("sprite"),
+    )
+
+
+def redraw_equip_buttons(rewards):
+    # After equipping or unequipping only these rewards' buttons change, the rest of the list stays as it is
+    global achievements_surface_key
+    for reward in rewards:
+        for rect in equip_buttons_by_reward.get(reward, []):
+            screens.draw_equip_button(achievements_surface, rect, reward in game.player_data["equipped"].values())
+    achievements_surface_key = achievements_state_key()
+
+
+def build_achievements_surface():
+    global achievements_surface, achievements_surface_key, equip_buttons_by_reward
+    finish_loading()
+    profiler.start("achievements_list")
+    achievements_surface_key = achievements_state_key()
+    achievements_surface, equip_buttons = screens.build_achievements_atlas(game.achievements, (window_width, window_height),
+                                                                           main_layout.rects((window_width, window_height)),
+                                                                           set(game.player_data["equipped"].values()))
+
+    # Equip buttons in atlas coordinates, registered again along with the rows
+    equip_button_index.clear()
+    equip_buttons_by_reward = {}
+    for equip_button_rect, name, reward in equip_buttons:
+        equip_button_index.add("equip_button", equip_button_rect, data=(name, reward))  # Store equip button rect, achievement name, and reward
+        equip_buttons_by_reward.setdefault(reward, []).append(equip_button_rect)
+    assets.track("achievements_list", achievements_surface)  # Counts against the surface budget like the cached images
+    profiler.stop("achievements_list")
+
+
+def surface_usage():
+    # Bytes of pixels held by each cache, for the overlay and the report on exit
+    usage = assets.resident_bytes()
+    usage["animations"] = animation.resident_bytes()
+    usage["text"] = fonts.resident_bytes()
+    usage["textures"] = renderer.resident_bytes()
+    return usage
+
+
 cursor = pygame.Rect(input_box.x + 10, input_box.y + 10, 2, button_font.get_height())
 cursor_visible = True
 cursor_timer = pygame.time.get_ticks()
@@ -375,611 +399,598 @@ clock = pygame.time.Clock()
 running = True
 scroll_offset = 0  # Variable to keep track of scroll offset
 
-while running:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
+RESIZE_SETTLE = 150  # Milliseconds without another resize event before the layout follows the window
+pending_window_size = None
+resize_due = 0
+resize_loader = None  # Rescales sized assets after a resize
+stale_sizes = []
+
+def handle_resize(size):
+    # Dragging the window edge sends a burst of these; only the size it settles on gets laid out
+    global pending_window_size, resize_due
+    pending_window_size = size
+    resize_due = pygame.time.get_ticks() + RESIZE_SETTLE
+
+
+def apply_resize():
+    global window_width, window_height, screen, pending_window_size, resize_loader, stale_sizes
+    old_sizes = [(window_width, window_height), current_sprite_rect.size, speech_bubble_rect.size]
+    window_width, window_height = pending_window_size
+    pending_window_size = None
+    replay.resize_applied()
+    screen = renderer.set_mode((window_width, window_height), vsync=args.vsync)  # Also redraws everything
+    main_layout.apply((window_width, window_height), layout_rects)
+    register_hit_targets()
+
+    # Rescale whatever is sized by the window on the preloader thread; until it's done the old sizes get drawn.
+    # Textures get scaled as they are drawn, so the texture backend has nothing to rescale.
+    jobs = []
+    if not renderer.textures():
+        jobs = [(name, current_sprite_rect.size, True) for name in {neutral_sprite, angry_sprite, current_sprite}]
+        jobs.append((speech_bubble_sprite, speech_bubble_rect.size, True))
+        if equipped_background_image() is not None:
+            jobs.append((equipped_background_image(), (window_width, window_height), False))
+    resize_loader = assets.Preloader(jobs)
+    new_sizes = [(window_width, window_height), current_sprite_rect.size, speech_bubble_rect.size]
+    stale_sizes = [size for size in old_sizes if size not in new_sizes]
+
+
+def finish_resize():
+    # The rescaled assets are in: forget the old sizes and redraw with the new ones
+    global resize_loader, stale_sizes
+    resize_loader = None
+    for size in stale_sizes:
+        assets.drop_size(size)
+    stale_sizes = []
+    renderer.invalidate()
+
+
+def handle_global_event(event):
+    # Events that mean the same on every screen; returns True if the event was used up here
+    global running
+    if event.type == pygame.QUIT:
+        running = False
+    elif event.type == pygame.VIDEORESIZE:
+        handle_resize((event.w, event.h))
+    elif event.type == pygame.WINDOWSIZECHANGED and renderer.textures():
+        if (event.x, event.y) != (pending_window_size or (window_width, window_height)):  # Not just our own set_mode
+            handle_resize((event.x, event.y))
+    elif event.type == pygame.WINDOWCLOSE:
+        running = False  # With the texture backend there is a second, hidden window, so SDL doesn't quit by itself
+    elif event.type == replay.RESIZE_APPLIED:
+        if pending_window_size is not None:
+            apply_resize()  # Where the recorded session did, see replay.py
+    elif event.type == pygame.VIDEOEXPOSE:
+        renderer.invalidate()  # Part of the window was uncovered, redraw all of it
+    elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+        profiler.overlay_enabled = not profiler.overlay_enabled  # Toggle the frame time overlay
+    else:
+        return False
+    return True
+
+
+def start_game():
+    global current_screen, current_sprite, feedback_text
+    finish_loading()
+    current_screen = "gameplay"
+    transition_to_gameplay()
+    game.new_game()  # New number and score at the start of each game
+    current_sprite = neutral_sprite  # Reset to neutral sprite at the start of the game
+    animation.stop("sprite")
+
+    # Apply equipped sprite (transition_to_gameplay already drew the equipped background)
+    print("Applying equipped background:", game.player_data["equipped"].get("background"))  # Debug print statement
+    sprite = equipped_reward("sprite")
+    current_sprite = sprite["asset"] if sprite is not None else neutral_sprite  # Default to neutral sprite
+
+    feedback_text = ""
+
+
+def handle_menu_event(event):
+    global current_screen, running
+    if event.type == pygame.MOUSEBUTTONDOWN:
+        target = clicked("menu", event.pos)
+        if target == "start_button":
+            start_game()
+        elif target == "achievements_button":
+            current_screen = "achievements"
+        elif target == "statistics_button":
+            current_screen = "statistics"
+        elif target == "settings_button":
+            current_screen = "settings"
+        elif target == "exit_button":
             running = False
-        elif event.type == pygame.VIDEORESIZE:
-            window_width, window_height = event.w, event.h
-            screen = pygame.display.set_mode((window_width, window_height), pygame.RESIZABLE)
-
-            # Update positions on resize
-            title_rect.center = (window_width // 2, window_height // 4)
-            start_button_rect.centerx = achievements_button_rect.centerx = settings_button_rect.centerx = exit_button_rect.centerx = window_width // 2
-            start_button_rect.top = title_rect.bottom + 50
-            achievements_button_rect.top = start_button_rect.bottom + button_spacing
-            settings_button_rect.top = achievements_button_rect.bottom + button_spacing  # Adjusted position
-            exit_button_rect.top = settings_button_rect.bottom + button_spacing
-            submit_button_rect.x = window_width - 280  # Moved slightly to the left
-            submit_button_rect.y = window_height // 2 + 30
-            input_box.x = window_width - 280  # Moved slightly to the left
-            input_box.y = window_height // 2 - 30
-            current_sprite_rect.center = (window_width // 4, window_height // 2)
-            speech_bubble_rect.center = (current_sprite_rect.right + 100, current_sprite_rect.top + 50)
-            main_menu_button_rect.x = window_width - 220
-            main_menu_button_rect.y = 50
-
-        elif event.type == pygame.MOUSEBUTTONDOWN:
-            if current_screen == "menu":
-                if start_button_rect.collidepoint(event.pos):
-                    current_screen = "gameplay"
-                    transition_to_gameplay()
-                    casper_number = generate_new_casper_number()  # Generate new number at the start of each game
-                    current_sprite = neutral_sprite  # Reset to neutral sprite at the start of the game
-                    score = 0  # Reset score at the start of each game
-                    if start_button_rect.collidepoint(event.pos):
-                        current_screen = "gameplay"
-                        casper_number = generate_new_casper_number()  # Generate new number at the start of each game
-                        current_sprite = neutral_sprite  # Reset to neutral sprite at the start of the game
-                        score = 0  # Reset score at the start of each game
-                        
-                        # Initialize equipped key if not present
-                        player_data["equipped"] = player_data.get("equipped", {})
-
-                        # Apply equipped background
-                        print("Applying equipped background:", player_data["equipped"].get("background"))  # Debug print statement
-                        if "background" in player_data["equipped"]:
-                                if player_data["equipped"]["background"] == "light_pink":
-                                    screen.fill((255, 192, 203))  # Light pink
-                                    print("Background set to light pink")  # Debug print statement
-                                elif player_data["equipped"]["background"] == "light_blue":
-                                    screen.fill((173, 216, 230))  # Light blue
-                                    print("Background set to light blue")  # Debug print statement
-                                elif player_data["equipped"]["background"] == "yellow":
-                                    screen.fill((255, 255, 0))  # Yellow
-                                    print("Background set to yellow")  # Debug print statement
-                                elif player_data["equipped"]["background"] == "green":
-                                    screen.fill((0, 255, 0))  # Green
-                                    print("Background set to green")  # Debug print statement
-                                elif player_data["equipped"]["background"] == "black":
-                                    screen.fill((0, 0, 0))  # Black
-                                    print("Background set to black")  # Debug print statement
-                                elif player_data["equipped"]["background"] == "galaxy":
-                                    background_image = pygame.image.load("sprites/Galaxy_background.png")
-                                    screen.blit(pygame.transform.scale(background_image, (window_width, window_height)), (0, 0))
-                                    print("Background set to galaxy")  # Debug print statement
-                                elif player_data["equipped"]["background"] == "rainbow":
-                                    background_image = pygame.image.load("sprites/Rainbow_background.png")
-                                    screen.blit(pygame.transform.scale(background_image, (window_width, window_height)), (0, 0))
-                                    print("Background set to rainbow")  # Debug print statement
-                                elif player_data["equipped"]["background"] == "food_rain":
-                                    background_image = pygame.image.load("sprites/food_rain_background.png")
-                                    screen.blit(pygame.transform.scale(background_image, (window_width, window_height)), (0, 0))
-                                    print("Background set to food rain")  # Debug print statement
-                                elif player_data["equipped"]["background"] == "brown":
-                                    screen.fill((139, 69, 19))  # Brown
-                                    print("Background set to brown")  # Debug print statement
-                                elif player_data["equipped"]["background"] == "dark_green":
-                                    screen.fill((0, 100, 0))  # Dark Green
-                                    print("Background set to dark green")  # Debug print statement
-                                elif player_data["equipped"]["background"] == "poop":
-                                    background_image = pygame.image.load("sprites/poop_background.png")
-                                    screen.blit(pygame.transform.scale(background_image, (window_width, window_height)), (0, 0))
-                                    print("Background set to poop")  # Debug print statement
-                                else:
-                                    screen.fill(white)  # Default to white background
-                                    print("Background set to default white")  # Debug print statement
-                        else:
-                            screen.fill(white)  # Default to white background
-                            print("Background set to default white - no background equipped")  # Debug print statement
-                        # Apply equipped sprite
-                        default_sprite_size = (600, 600)
-                        if "sprite" in player_data["equipped"]:
-                            if player_data["equipped"]["sprite"] == "party_hat":
-                                current_sprite = pygame.image.load("sprites/party_casper.png")
-                                current_sprite = pygame.transform.scale(current_sprite, default_sprite_size)  # Resize sprite
-                            elif player_data["equipped"]["sprite"] == "cat_ears":
-                                current_sprite = pygame.image.load("sprites/cat_casper.png")
-                                current_sprite = pygame.transform.scale(current_sprite, default_sprite_size)  # Resize sprite
-                            elif player_data["equipped"]["sprite"] == "caspers_gf":
-                                current_sprite = pygame.image.load("sprites/caspers_gf.png")
-                                current_sprite = pygame.transform.scale(current_sprite, default_sprite_size)  # Resize sprite
-                            else:
-                                current_sprite = pygame.transform.scale(neutral_sprite, default_sprite_size)  # Ensure default sprite is resized as well
-                        else:
-                            current_sprite = pygame.transform.scale(neutral_sprite, default_sprite_size)  # Default to neutral sprite
-
-                        # Your existing gameplay logic...
-                        screen.blit(current_sprite, current_sprite_rect)  # Draw the current sprite
-                        screen.blit(speech_bubble_sprite, speech_bubble_rect)  # Draw the speech bubble
-                        pygame.draw.rect(screen, dark_gray if input_active else gray, input_box)
-                        guess_text = button_font.render(guess_input, True, text_color)
-                        screen.blit(guess_text, (input_box.x + 10, input_box.y + 10))
-
-                        # Draw the text inside the speech bubble
-                        bubble_font = pygame.font.Font(None, 28)  # Adjust font size for speech bubble text
-                        bubble_text = bubble_font.render("Guess the number I'm thinking of from 1-10!", True, black)
-                        bubble_text_rect = bubble_text.get_rect(center=(speech_bubble_rect.centerx, speech_bubble_rect.centery - 40))  # Move text further up
-                        screen.blit(bubble_text, bubble_text_rect)
-
-                        if input_active:
-                            current_time = pygame.time.get_ticks()
-                            if current_time - cursor_timer >= 500:  # Blink every 500 milliseconds
-                                cursor_visible = not cursor_visible
-                                cursor_timer = current_time
-
-                            if cursor_visible:
-                                cursor.topleft = (input_box.x + 10 + button_font.size(guess_input)[0], input_box.y + 10)
-                                pygame.draw.rect(screen, text_color, cursor)
-
-                        feedback_surface = button_font.render(feedback_text, True, black)
-                        feedback_rect = feedback_surface.get_rect(center=(window_width // 2, window_height - 50))  # Moved to bottom
-                        screen.blit(feedback_surface, feedback_rect)
-                        feedback_text = ""
-
-                        score_surface = button_font.render("Score: " + str(score), True, black)
-                        screen.blit(score_surface, (10, 10))
-
-                        high_score_surface = button_font.render("High Score: " + str(high_score), True, black)
-                        screen.blit(high_score_surface, (10, 50))
-
-                        pygame.draw.rect(screen, gray, submit_button_rect)
-                        submit_text = submit_button_font.render("Submit", True, text_color)
-                        screen.blit(submit_text, submit_text.get_rect(center=submit_button_rect.center))
-
-                        # Draw Main Menu button
-                        pygame.draw.rect(screen, gray, main_menu_button_rect)
-                        main_menu_text = submit_button_font.render("Main Menu", True, text_color)
-                        screen.blit(main_menu_text, main_menu_text.get_rect(center=main_menu_button_rect.center))
-
-
-                elif achievements_button_rect.collidepoint(event.pos):
-                    current_screen = "achievements"
-                elif settings_button_rect.collidepoint(event.pos):
-                    current_screen = "settings"
-                elif exit_button_rect.collidepoint(event.pos):
-                    running = False
-            
-            if current_screen == "gameplay":
-                    if input_box.collidepoint(event.pos):
-                        input_active = not input_active
-                    else:
-                        input_active = False
-
-                    if submit_button_rect.collidepoint(event.pos):
-                        try:
-                            guess = int(guess_input)
-                            if guess == casper_number:
-                                feedback_text = f"Correct, you guessed the number Casper was thinking of: {casper_number}"
-                                current_sprite = neutral_sprite  # Revert to neutral sprite
-                                update_score(True)  # Update the score for a correct guess
-                                
-                            else:
-                                feedback_text = f"Incorrect, you didn't guess the number Casper was thinking of. Try again!"
-                                current_sprite = angry_sprite  # Switch to angry sprite
-                                update_score(False)  # Update the score for an incorrect guess
-                                
-                            casper_number = generate_new_casper_number()  # Generate new number after each guess
-                        except ValueError:
-                            feedback_text = "Please enter a valid number."
-                        guess_input = ""
-                    
-                    if current_sprite_rect.collidepoint(event.pos):
-                        caspers_sprite_taps += 1  # Increment sprite taps count
-                        player_data["caspers_sprite_taps"] = caspers_sprite_taps  # Update player data for sprite taps
-                        check_achievements()  # Check achievements after updating sprite taps
-                        save_player_data()  # Save player data after each tap
-
-                    if main_menu_button_rect.collidepoint(event.pos):
-                        current_screen = "menu"
-                        transition_to_menu()
-                        save_player_data()  # Save player data when returning to the menu
-        
-            elif current_screen == "achievements":
-                if main_menu_button_rect.collidepoint(event.pos):
-                    current_screen = "menu"
-    
-        
-        if event.type == pygame.KEYDOWN:
-            if current_screen == "gameplay" and input_active:
-                if event.key == pygame.K_RETURN:
-                    input_string = guess_input.strip()  # Trim any whitespace
-                    if input_string == "pollenbee":
-                        print("Cheat code detected! Unlocking all achievements.")
-                        for achievement in achievements:
-                            achievement["unlocked"] = True
-                            player_data["achievements"][achievement["name"]] = True
-
-                        # Save the updated player_data to the .json file
-                        with open("player_datas.json", "w") as file:
-                            json.dump(player_data, file)
-                        
-                        # Optionally reset the input_string and guess_input to prevent repeated use
-                        input_string = ""
-                        guess_input = ""
-                    else:
-                        try:
-                            guess = int(guess_input)
-                            if guess == casper_number:
-                                feedback_text = f"Correct, you guessed the number Casper was thinking of: {casper_number}"
-                                current_sprite = neutral_sprite  # Revert to neutral sprite
-                                update_score(True)  # Update the score for a correct guess
-                            else:
-                                feedback_text = f"Incorrect, you didn't guess the number Casper was thinking of. Try again! Your guess was: {guess}"
-                                current_sprite = angry_sprite  # Switch to angry sprite
-                                update_score(False)  # Update the score for an incorrect guess
-                            casper_number = generate_new_casper_number()  # Generate new number after each guess
-                            render_feedback_text(feedback_text)
-
-                            # Clear the feedback text area
-                            screen.fill(white, feedback_rect)
-
-                            # Render and draw the new feedback text
-                            feedback_surface = button_font.render(feedback_text, True, black)
-                            screen.blit(feedback_surface, feedback_rect)
-                            pygame.display.flip()  # Refresh the display
-                        except ValueError:
-                            feedback_text = "Please enter a valid number."
-                            render_feedback_text(feedback_text)
-
-                            # Clear the feedback text area
-                            screen.fill(white, feedback_rect)
-
-                            # Render and draw the new feedback text
-                            feedback_surface = button_font.render(feedback_text, True, black)
-                            screen.blit(feedback_surface, feedback_rect)
-                            pygame.display.flip()  # Refresh the display
-
-                        guess_input = ""
-                elif event.key == pygame.K_BACKSPACE:
-                    guess_input = guess_input[:-1]
-                else:
-                    guess_input += event.unicode
 
-            elif current_screen == "achievements":
-                if event.key == pygame.K_UP:
-                    scroll_offset = min(scroll_offset + 20, 0)  # Scroll up
-                elif event.key == pygame.K_DOWN:
-                    scroll_offset -= 20  # Scroll down
 
-    if current_screen == "menu":
-        screen.fill(background_color)
-        screen.blit(title_text, title_rect)
-
-        pygame.draw.rect(screen, gray, start_button_rect)
-        pygame.draw.rect(screen, gray, achievements_button_rect)
-        pygame.draw.rect(screen, gray, settings_button_rect)  # Draw Settings button
-        pygame.draw.rect(screen, gray, exit_button_rect)
-
-        start_text = button_font.render("Start Game", True, text_color)
-        achievements_text = button_font.render("Achievements", True, text_color)
-        settings_text = button_font.render("Settings", True, text_color)  # Render Settings text
-        exit_text = button_font.render("Exit", True, text_color)
-
-        screen.blit(start_text, start_text.get_rect(center=start_button_rect.center))
-        screen.blit(achievements_text, achievements_text.get_rect(center=achievements_button_rect.center))
-        screen.blit(settings_text, settings_text.get_rect(center=settings_button_rect.center))  # Position Settings text
-        screen.blit(exit_text, exit_text.get_rect(center=exit_button_rect.center))
-    
-    elif current_screen == "gameplay":
-        transition_to_gameplay()
-        # Clear specific areas before drawing new text
-        feedback_rect = pygame.Rect(0, window_height - 30, window_width, 30)
-        screen.fill(background_color, feedback_rect)
-        screen.fill(background_color, score_rect)
-        screen.fill(background_color, high_score_rect)
-
-        # Apply equipped background
-        background_image = None
-        if "background" in player_data["equipped"]:
-            if player_data["equipped"]["background"] == "galaxy":
-                background_image = load_and_scale_background("sprites/Galaxy_background.png", window_width, window_height)
-            elif player_data["equipped"]["background"] == "rainbow":
-                background_image = load_and_scale_background("sprites/Rainbow_background.png", window_width, window_height)
-            elif player_data["equipped"]["background"] == "food_rain":
-                background_image = load_and_scale_background("sprites/food_rain_background.png", window_width, window_height)
-            elif player_data["equipped"]["background"] == "poop":
-                background_image = load_and_scale_background("sprites/poop_background.png", window_width, window_height)
-
-            if background_image:
-                screen.blit(background_image, (0, 0))
+def react(sprite):
+    # Casper changes face with a short crossfade from the one he had
+    global current_sprite, previous_sprite
+    if sprite != current_sprite:
+        previous_sprite = current_sprite
+        animation.start("sprite", SPRITE_FADE)
+    current_sprite = sprite
+
+
+def handle_gameplay_event(event):
+    global current_screen, feedback_text, guess_input, input_active
+    if event.type == pygame.MOUSEBUTTONDOWN:
+        target = clicked("gameplay", event.pos)  # Only one thing gets the click, the one on top
+        if target == "input_box":
+            input_active = not input_active
+        else:
+            input_active = False
+
+        if target == "submit_button":
+            try:
+                guess = int(guess_input)
+                correct, casper_number = game.play(guess)  # Scores the guess and picks Casper's next number
+                if correct:
+                    feedback_text = f"Correct, you guessed the number Casper was thinking of: {casper_number}"
+                    react(neutral_sprite)  # Revert to neutral sprite
+                    animation.start("score_popup", SCORE_POPUP, easing=animation.ease_out)
+                else:
+                    feedback_text = f"Incorrect, you didn't guess the number Casper was thinking of. Try again!"
+                    react(angry_sprite)  # Switch to angry sprite
+            except ValueError:
+                feedback_text = "Please enter a valid number."
+            guess_input = ""
+
+        if target == "casper_sprite":
+            game.tap()  # Counts the tap and checks achievements (this also saves)
+
+        if target == "main_menu_button":
+            current_screen = "menu"
+            transition_to_menu()
+            game.save()  # Save player data when returning to the menu
+            flush_player_data()
+
+    elif event.type == pygame.KEYDOWN and input_active:
+        if event.key == pygame.K_RETURN:
+            input_string = guess_input.strip()  # Trim any whitespace
+            if input_string == "pollenbee":
+                print("Cheat code detected! Unlocking all achievements.")
+                game.unlock_all()  # Also saves the updated player data
+
+                # Optionally reset the input_string and guess_input to prevent repeated use
+                input_string = ""
+                guess_input = ""
             else:
-                if background_image == "light_pink":
-                    screen.fill((255, 192, 203))  # Light pink
-                elif background_image == "light_blue":
-                    screen.fill((173, 216, 230))  # Light blue
-                elif background_image == "yellow":
-                    screen.fill((255, 255, 0))  # Yellow
-                elif background_image == "green":
-                    screen.fill((0, 255, 0))  # Green
-                elif background_image == "black":
-                    screen.fill((0, 0, 0))  # Black
-                elif background_image == "brown":
-                    screen.fill((139, 69, 19))  # Brown
-                elif background_image == "dark_green":
-                    screen.fill((0, 100, 0))  # Dark Green)
+                try:
+                    guess = int(guess_input)
+                    correct, casper_number = game.play(guess)  # Scores the guess and picks Casper's next number
+                    if correct:
+                        feedback_text = f"Correct, you guessed the number Casper was thinking of: {casper_number}"
+                        react(neutral_sprite)  # Revert to neutral sprite
+                        animation.start("score_popup", SCORE_POPUP, easing=animation.ease_out)
+                    else:
+                        feedback_text = f"Incorrect, you didn't guess the number Casper was thinking of. Try again! Your guess was: {guess}"
+                        react(angry_sprite)  # Switch to angry sprite
+                except ValueError:
+                    feedback_text = "Please enter a valid number."
+
+                guess_input = ""
+        elif event.key == pygame.K_BACKSPACE:
+            guess_input = guess_input[:-1]
         else:
-            screen.fill(white)  # Default to white background
+            guess_input += event.unicode
+
+
+def handle_achievements_event(event):
+    global current_screen, scroll_offset, background_loader
+    if achievements_state_key() != achievements_surface_key:
+        build_achievements_surface()  # The screen only just opened and hasn't drawn the list yet
+    if event.type == pygame.MOUSEBUTTONDOWN:
+        # Handle scrolling
+        if event.button == 4:  # Scroll up
+            scroll_offset = min(scroll_offset + 20, 0)
+        elif event.button == 5:  # Scroll down
+            scroll_offset = max(scroll_offset - 20, min(window_height - achievements_surface.get_height(), 0))
+
+        # Handle button clicks
+        if clicked("achievements", event.pos) == "main_menu_button":
+            current_screen = "menu"
+            game.save()  # Save player data when returning to the menu
+            flush_player_data()
+            return
+
+        atlas_pos = (event.pos[0], event.pos[1] - scroll_offset)  # Click position on the scrolled surface
+        target = equip_button_index.hit(atlas_pos)
+        if target is not None:
+            achievement_name, reward = target[1]
+            print(f"Clicked on {achievement_name}, reward: {reward}")  # Debug print statement
+            # Check if the achievement is unlocked before equipping/unequipping
+            if game.player_data["achievements"].get(achievement_name, False):
+                equipped_before = set(game.player_data["equipped"].values())
+                equipped = game.toggle_equipped(reward)  # Also saves the updated equipped state
+                print(f"{'Equipping' if equipped else 'Unequipping'} {reward}")  # Debug print statement
+                redraw_equip_buttons(equipped_before ^ set(game.player_data["equipped"].values()))
+                if equipped and equipped_background_image() is not None:
+                    # Scale it to the window now, so starting a game doesn't have to
+                    background_loader = assets.Preloader([(equipped_background_image(), (window_width, window_height), False)])
+
+    elif event.type == pygame.MOUSEMOTION:
+        # Handle scrolling with mouse motion
+        if event.buttons[1]:  # Right mouse button held down
+            scroll_offset += event.rel[1]
+            scroll_offset = max(min(scroll_offset, 0), min(window_height - achievements_surface.get_height(), 0))
+
+    elif event.type == pygame.KEYDOWN:
+        if event.key == pygame.K_UP:
+            scroll_offset = min(scroll_offset + 20, 0)  # Scroll up
+        elif event.key == pygame.K_DOWN:
+            scroll_offset -= 20  # Scroll down
+
+
+def handle_settings_event(event):
+    global current_screen, show_confirmation_popup
+    if event.type != pygame.MOUSEBUTTONDOWN:
+        return
+
+    # Confirmation popup; while it is up it is the only thing that takes clicks
+    if show_confirmation_popup:
+        target = clicked("confirmation", event.pos)
+        if target == "confirm_button":
+            # Reset player data
+            game.reset()
+            show_confirmation_popup = False
+            print("Player data has been reset.")
+        elif target == "cancel_button":
+            show_confirmation_popup = False
+        return
+
+    target = clicked("settings", event.pos)
+    if target == "reset_button":
+        show_confirmation_popup = True
+    elif target == "main_menu_button":
+        current_screen = "menu"
+
+
+def handle_statistics_event(event):
+    global current_screen
+    if event.type == pygame.MOUSEBUTTONDOWN and clicked("statistics", event.pos) == "main_menu_button":
+        current_screen = "menu"
+
+
+def draw_bar_chart(rect, title, labels, values):
+    # Bars scaled to the biggest value, with the title above and the labels below
+    chart_font = fonts.get_font(20)
+    screen.blit(fonts.render(submit_button_font, title, text_color), rect.topleft)
+    bars_top = rect.y + 30
+    bars_height = rect.height - 30 - chart_font.get_height()
+    bar_width = rect.width // len(values)
+    tallest = max(values) or 1
+    for position, (label, value) in enumerate(zip(labels, values)):
+        bar_height = bars_height * value // tallest
+        pygame.draw.rect(screen, dark_gray, (rect.x + position * bar_width + 1, bars_top + bars_height - bar_height, bar_width - 2, bar_height))
+        label_text = fonts.render(chart_font, label, text_color)
+        screen.blit(label_text, label_text.get_rect(midtop=(rect.x + position * bar_width + bar_width // 2, bars_top + bars_height)))
+
+
+def percent(fraction):
+    return "-" if fraction is None else f"{fraction * 100:.0f}%"
+
+
+def sprite_fade_frames(size):
+    # Casper's crossfade from previous_sprite to current_sprite, rendered once per pair and size
+    return animation.sequence(("sprite", previous_sprite, current_sprite, size), lambda: animation.crossfade_frames(
+        assets.get_scaled(previous_sprite, size), assets.get_scaled(current_sprite, size)))
+
+
+def score_popup_frames():
+    return animation.sequence("score_popup", lambda: animation.fade_frames(fonts.render(button_font, "+1", (0, 160, 0))))
+
+
+def toast_banner(name):
+    def build():
+        text = fonts.render(submit_button_font, f"Achievement unlocked: {name}", white)
+        banner = pygame.Surface((text.get_width() + 40, text.get_height() + 20)).convert()
+        banner.fill(dark_gray)
+        pygame.draw.rect(banner, black, banner.get_rect(), 2)
+        banner.blit(text, (20, 10))
+        return [banner]
+    return animation.sequence(("toast", name), build)[0]
+
+
+def toast_top(toast, height):
+    # Slides down from above the window, stays, and slides back up
+    elapsed = toast.progress() * TOAST
+    shown = animation.ease_out(min(1.0, elapsed / TOAST_SLIDE, (TOAST - elapsed) / TOAST_SLIDE))
+    return round(-height + (height + 10) * shown)
+
+
+def next_timer():
+    # Tick count at which something changes on screen without any input, or None
+    timers = []
+    if pending_window_size is not None:
+        timers.append(resize_due)
+    if resize_loader is not None:
+        timers.append(pygame.time.get_ticks() + 15)  # Check back soon for the rescaled assets
+    if current_screen == "gameplay" and input_active:
+        timers.append(cursor_timer + 500)  # Cursor blink
+    if current_screen == "statistics":
+        timers.append(pygame.time.get_ticks() + int((60 - time.time() % 60) * 1000))  # The time windows move on
+    if profiler.overlay_enabled:
+        timers.append(pygame.time.get_ticks() + int(profiler.OVERLAY_REFRESH * 1000))
+    if animation.running() or toast_queue:
+        timers.append(pygame.time.get_ticks())  # Next frame right away
+    return min(timers) if timers else None
+
+
+# Each screen's events go to its own handler; the screen can change halfway through a frame's events
+screen_handlers = {
+    "menu": handle_menu_event,
+    "gameplay": handle_gameplay_event,
+    "achievements": handle_achievements_event,
+    "statistics": handle_statistics_event,
+    "settings": handle_settings_event,
+}
 
-        # Clear specific areas before drawing new text
-        feedback_rect = pygame.Rect(0, window_height - 30, window_width, 30)
-        screen.fill(background_color, feedback_rect)
-        screen.fill(background_color, score_rect)
-        screen.fill(background_color, high_score_rect)
-
-        # Draw updated texts and other elements
-        screen.blit(current_sprite, current_sprite_rect)  # Draw the current sprite
-        screen.blit(speech_bubble_sprite, speech_bubble_rect)  # Draw the speech bubble
-        pygame.draw.rect(screen, dark_gray if input_active else gray, input_box)
-        guess_text = button_font.render(guess_input, True, text_color)
-        screen.blit(guess_text, (input_box.x + 10, input_box.y + 10))
-
-        # Draw the text inside the speech bubble
-        bubble_font = pygame.font.Font(None, 28)  # Adjust font size for speech bubble text
-        bubble_text = bubble_font.render("Guess the number I'm thinking of from 1-10!", True, black)
-        bubble_text_rect = bubble_text.get_rect(center=(speech_bubble_rect.centerx, speech_bubble_rect.centery - 40))  # Move text further up
-        screen.blit(bubble_text, bubble_text_rect)
 
+while running:
+    if pacing.idle():
+        events.wait(pacing.wait_timeout(next_timer()))  # Nothing going on, sleep until there is
+
+    profiler.begin_frame()
+    profiler.start("events")
+    frame_events = events.pump()
+    for event in frame_events:
+        if not handle_global_event(event):
+            screen_handlers[current_screen](event)
+    if pending_window_size is not None and pygame.time.get_ticks() >= resize_due and not replay.replaying():
+        apply_resize()
+    if resize_loader is not None and resize_loader.ready():
+        finish_resize()
+    if replay.finished():
+        running = False  # This frame still shows the last of it
+    profiler.stop("events")
+
+    animation.update()
+    if animation.get("toast") is None:
+        toast_name = toast_queue.pop(0) if toast_queue else None
+        if toast_name is not None:
+            animation.start("toast", TOAST)
+    scroll_reward = equipped_reward("background") if current_screen == "gameplay" else None
+    if scroll_reward is not None and "scroll" in scroll_reward:
+        if animation.get("background") is None:
+            animation.start("background", scroll_reward["scroll"], loop=True)
+    else:
+        animation.stop("background")
+
+    renderer.begin_frame(current_screen)
+    if profiler.overlay_enabled:
+        overlay_lines = profiler.overlay_lines(current_screen, clock.get_fps())
+        usage = surface_usage()
+        cached = sum(usage[name] for name in ["images", "scaled", "tracked"])  # What the budget covers
+        overlay_lines = overlay_lines + [("cached MB", f"{cached / 1024 / 1024:.1f}", "of", str(assets.budget // (1024 * 1024))),
+                                         ("other surfaces MB", f"{(sum(usage.values()) - cached) / 1024 / 1024:.1f}", "", "")]
+        overlay_rect = pygame.Rect(0, 0, 360, 20 * len(overlay_lines) + 10)
+        overlay_rect.bottomleft = (0, window_height - 30)  # Just above the feedback line
+        renderer.widget("profiler_overlay", overlay_rect, overlay_lines)
+    toast = animation.get("toast")
+    if toast is not None:
+        toast_surface = toast_banner(toast_name)
+        toast_rect = toast_surface.get_rect(midtop=(window_width // 2, toast_top(toast, toast_surface.get_height())))
+        renderer.widget("toast", toast_rect, toast_rect.top)
+
+    if current_screen == "menu":
+        renderer.widget("title", title_rect)
+        renderer.widget("start_button", start_button_rect)
+        renderer.widget("achievements_button", achievements_button_rect)
+        renderer.widget("statistics_button", statistics_button_rect)
+        renderer.widget("settings_button", settings_button_rect)
+        renderer.widget("exit_button", exit_button_rect)
+
+        if renderer.begin_draw(screen):
+            screen.fill(background_color)
+            screen.blit(title_text, title_rect)
+
+            pygame.draw.rect(screen, gray, start_button_rect)
+            pygame.draw.rect(screen, gray, achievements_button_rect)
+            pygame.draw.rect(screen, gray, statistics_button_rect)
+            pygame.draw.rect(screen, gray, settings_button_rect)  # Draw Settings button
+            pygame.draw.rect(screen, gray, exit_button_rect)
+
+            start_text = fonts.render(button_font, "Start Game", text_color)
+            achievements_text = fonts.render(button_font, "Achievements", text_color)
+            statistics_text = fonts.render(button_font, "Statistics", text_color)
+            settings_text = fonts.render(button_font, "Settings", text_color)  # Render Settings text
+            exit_text = fonts.render(button_font, "Exit", text_color)
+
+            screen.blit(start_text, start_text.get_rect(center=start_button_rect.center))
+            screen.blit(achievements_text, achievements_text.get_rect(center=achievements_button_rect.center))
+            screen.blit(statistics_text, statistics_text.get_rect(center=statistics_button_rect.center))
+            screen.blit(settings_text, settings_text.get_rect(center=settings_button_rect.center))  # Position Settings text
+            screen.blit(exit_text, exit_text.get_rect(center=exit_button_rect.center))
+    
+    elif current_screen == "gameplay":
         if input_active:
             current_time = pygame.time.get_ticks()
             if current_time - cursor_timer >= 500:  # Blink every 500 milliseconds
                 cursor_visible = not cursor_visible
                 cursor_timer = current_time
+        cursor.topleft = (input_box.x + 10 + button_font.size(guess_input)[0], input_box.y + 10)
+
+        background_tween = animation.get("background")
+        background_scroll = round(background_tween.progress() * window_height) if background_tween is not None else 0
+        sprite_tween = animation.get("sprite")
+        sprite_frame = animation.frame_number(sprite_tween.progress()) if sprite_tween is not None else None
+        score_popup = animation.get("score_popup")
+        if score_popup is not None:
+            popup_left = 10 + fonts.render(button_font, "Score: " + str(game.score), black).get_width() + 10
+            popup_rect = score_popup_frames()[0].get_rect(topleft=(popup_left, round(35 - 25 * score_popup.value())))
+            renderer.widget("score_popup", popup_rect, animation.frame_number(score_popup.progress()))
+
+        renderer.widget("background", screen.get_rect(), (game.player_data["equipped"].get("background"), background_scroll))
+        renderer.widget("sprite", current_sprite_rect, (current_sprite, sprite_frame))
+        renderer.widget("speech_bubble", speech_bubble_rect)
+        renderer.widget("input_box", input_box, (guess_input, input_active))
+        renderer.widget("cursor", cursor, input_active and cursor_visible)
+        renderer.widget("feedback", feedback_rect, feedback_text)
+        renderer.widget("score", ((10, 10), fonts.render(button_font, "Score: " + str(game.score), black).get_size()), game.score)
+        renderer.widget("high_score", ((10, 50), fonts.render(button_font, "High Score: " + str(game.high_score), black).get_size()), game.high_score)
+        renderer.widget("submit_button", submit_button_rect)
+        renderer.widget("main_menu_button", main_menu_button_rect)
+
+        if renderer.begin_draw(screen) and renderer.textures():
+            # Background and sprites go under the screen surface as texture layers, the surface only gets the rest
+            profiler.start("sprites")
+            screen.fill((0, 0, 0, 0))
+            background = equipped_reward("background")
+            if background is not None and background["kind"] == "image":
+                # A scrolling one is drawn twice, the second copy coming in from the top as the first falls out
+                for top in [background_scroll - window_height, background_scroll] if background_scroll else [0]:
+                    renderer.layer(screen.get_rect().move(0, top), image=background["asset"], alpha=False)
+            else:
+                renderer.layer(screen.get_rect(), color=background["color"] if background is not None else white)
+            for rect in [feedback_rect, score_rect, high_score_rect]:
+                renderer.layer(rect, color=background_color)
+            if sprite_frame is not None:
+                fade = sprite_frame / (animation.FADE_FRAMES - 1)  # In the same steps as the surface backend
+                renderer.layer(current_sprite_rect, image=previous_sprite, opacity=1 - fade)
+                renderer.layer(current_sprite_rect, image=current_sprite, opacity=fade)
+            else:
+                renderer.layer(current_sprite_rect, image=current_sprite)
+            renderer.layer(speech_bubble_rect, image=speech_bubble_sprite)
+            profiler.stop("sprites")
+        elif renderer.drawing():
+            profiler.start("background")
+            transition_to_gameplay(background_scroll)
+            profiler.stop("background")
+            profiler.start("sprites")
+            if sprite_frame is not None:
+                sprite = sprite_fade_frames(current_sprite_rect.size)[sprite_frame]  # Changing face
+            else:
+                sprite = sprite_surface(current_sprite, current_sprite_rect.size)
+            screens.draw_gameplay_art(screen, layout_rects, sprite, sprite_surface(speech_bubble_sprite, speech_bubble_rect.size))
+            profiler.stop("sprites")
 
-            if cursor_visible:
-                cursor.topleft = (input_box.x + 10 + button_font.size(guess_input)[0], input_box.y + 10)
-                pygame.draw.rect(screen, text_color, cursor)
-        
-        feedback_surface = button_font.render(feedback_text, True, black)
-        feedback_rect = feedback_surface.get_rect(center=(window_width // 2, window_height - 15))  # Moved to bottom
-        screen.blit(feedback_surface, feedback_rect)
-        
-
-        score_surface = button_font.render("Score: " + str(score), True, black)
-        screen.blit(score_surface, (10, 10))
-
-        high_score_surface = button_font.render("High Score: " + str(high_score), True, black)
-        screen.blit(high_score_surface, (10, 50))
-
-        pygame.draw.rect(screen, gray, submit_button_rect)
-        submit_text = submit_button_font.render("Submit", True, text_color)
-        screen.blit(submit_text, submit_text.get_rect(center=submit_button_rect.center))
-
-        # Draw Main Menu button
-        pygame.draw.rect(screen, gray, main_menu_button_rect)
-        main_menu_text = submit_button_font.render("Main Menu", True, text_color)
-        screen.blit(main_menu_text, main_menu_text.get_rect(center=main_menu_button_rect.center))
+        if renderer.drawing():
+            screens.draw_gameplay_ui(screen, layout_rects, game.score, game.high_score, guess_input, input_active, feedback_text,
+                                     cursor if input_active and cursor_visible else None)
+            if score_popup is not None:
+                screen.blit(animation.frame(score_popup_frames(), score_popup.progress()), popup_rect)
 
     elif current_screen == "achievements":
-        screen.fill(white)
-
-        # Achievements title
-        achievements_title = font.render("Achievements", True, black)
-        screen.blit(achievements_title, (window_width // 2 - achievements_title.get_width() // 2, 10))
-
-        # Scrollable surface for achievements
-        achievements_surface = pygame.Surface((window_width, window_height * 2))  # Make surface taller for scrolling
-        achievements_surface.fill(white)
-
-        equip_button_rects = []  # Store equip button rectangles for event handling
-
-        # Sample rows for each achievement
-        row_y = 100 + scroll_offset  # Apply scroll offset
-        for achievement in achievements:
-            # Padlock sprite (made smaller and moved to the left)
-            padlock_sprite = pygame.image.load("sprites/locked_padlock.png" if not achievement["unlocked"] else "sprites/unlocked_padlock.png")
-            padlock_sprite = pygame.transform.scale(padlock_sprite, (30, 30))  # Resize padlock sprite
-            padlock_rect = padlock_sprite.get_rect(topleft=(20, row_y + 15))
-            achievements_surface.blit(padlock_sprite, padlock_rect)
-
-            # Achievement box (made longer to fit all text)
-            achievement_box = pygame.Rect(60, row_y, 600, 60)
-            pygame.draw.rect(achievements_surface, dark_gray if not achievement["unlocked"] else gray, achievement_box)
-            achievement_name = button_font.render(achievement["name"], True, text_color)
-            achievement_desc = submit_button_font.render(achievement["description"], True, text_color)
-            achievements_surface.blit(achievement_name, (achievement_box.x + 10, achievement_box.y + 5))
-            achievements_surface.blit(achievement_desc, (achievement_box.x + 10, achievement_box.y + 30))
-
-             # Equip/Unequip button
-            equip_button_rect = pygame.Rect(700, row_y, 100, 60)
-            # Updated logic to check the equipped state
-            equip_button_text = "Equip"
-            if (player_data["equipped"].get("background") == achievement["reward"] or 
-                player_data["equipped"].get("sprite") == achievement["reward"]):
-                equip_button_text = "Unequip"
-                
-            pygame.draw.rect(achievements_surface, gray, equip_button_rect)
-            equip_text = button_font.render(equip_button_text, True, text_color)
-            achievements_surface.blit(equip_text, equip_text.get_rect(center=equip_button_rect.center))
-            equip_button_rects.append((equip_button_rect, achievement["name"], achievement["reward"]))  # Store equip button rect, achievement name, and reward
- 
-
-            # Reward sprite (color rectangle, moved to the right)
-            if achievement["reward"] == "light_pink":
-                reward_color = (255, 192, 203)  # Light pink
-                reward_rect = pygame.Rect(820, row_y, 60, 60)
-                pygame.draw.rect(achievements_surface, reward_color, reward_rect)
-            elif achievement["reward"] == "light_blue":
-                reward_color = (173, 216, 230)  # Light blue
-                reward_rect = pygame.Rect(820, row_y, 60, 60)
-                pygame.draw.rect(achievements_surface, reward_color, reward_rect)
-            elif achievement["reward"] == "yellow":
-                reward_color = (255, 255, 0)  # Yellow
-                reward_rect = pygame.Rect(820, row_y, 60, 60)
-                pygame.draw.rect(achievements_surface, reward_color, reward_rect)
-            elif achievement["reward"] == "green":
-                reward_color = (0, 255, 0)  # Green
-                reward_rect = pygame.Rect(820, row_y, 60, 60)
-                pygame.draw.rect(achievements_surface, reward_color, reward_rect)
-            elif achievement["reward"] == "black":
-                reward_color = (0, 0, 0)  # Black
-                reward_rect = pygame.Rect(820, row_y, 60, 60)
-                pygame.draw.rect(achievements_surface, reward_color, reward_rect)
-            elif achievement["reward"] == "galaxy":
-                reward_sprite = pygame.image.load("sprites/Galaxy_background.png")
-                reward_sprite = pygame.transform.scale(reward_sprite, (60, 60))  # Resize galaxy sprite
-                achievements_surface.blit(reward_sprite, (820, row_y))
-            elif achievement["reward"] == "rainbow":
-                reward_sprite = pygame.image.load("sprites/Rainbow_background.png")
-                reward_sprite = pygame.transform.scale(reward_sprite, (60, 60))  # Resize rainbow sprite
-                achievements_surface.blit(reward_sprite, (820, row_y))
-            elif achievement["reward"] == "food_rain":
-                reward_sprite = pygame.image.load("sprites/food_rain_background.png")
-                reward_sprite = pygame.transform.scale(reward_sprite, (60, 60))  # Resize food rain sprite
-                achievements_surface.blit(reward_sprite, (820, row_y))
-            elif achievement["reward"] == "brown":
-                reward_color = (139, 69, 19)  # Brown
-                reward_rect = pygame.Rect(820, row_y, 60, 60)
-                pygame.draw.rect(achievements_surface, reward_color, reward_rect)
-            elif achievement["reward"] == "dark_green":
-                reward_color = (0, 100, 0)  # Dark Green
-                reward_rect = pygame.Rect(820, row_y, 60, 60)
-                pygame.draw.rect(achievements_surface, reward_color, reward_rect)
-            elif achievement["reward"] == "poop":
-                reward_sprite = pygame.image.load("sprites/poop_background.png")
-                reward_sprite = pygame.transform.scale(reward_sprite, (60, 60))  # Resize poop sprite
-                achievements_surface.blit(reward_sprite, (820, row_y))
-            elif achievement["reward"] == "party_hat":
-                reward_sprite = pygame.image.load("sprites/party_casper.png")
-                reward_sprite = pygame.transform.scale(reward_sprite, (60, 60))  # Resize party hat sprite
-                achievements_surface.blit(reward_sprite, (820, row_y))
-            elif achievement["reward"] == "cat_ears":
-                reward_sprite = pygame.image.load("sprites/cat_casper.png")
-                reward_sprite = pygame.transform.scale(reward_sprite, (60, 60))  # Resize cat ears sprite
-                achievements_surface.blit(reward_sprite, (820, row_y))
-            elif achievement["reward"] == "caspers_gf":
-                reward_sprite = pygame.image.load("sprites/question_mark.png" if not achievement["unlocked"] else "sprites/caspers_gf.png")
-                reward_sprite = pygame.transform.scale(reward_sprite, (60, 60))  # Resize sprite
-                achievements_surface.blit(reward_sprite, (820, row_y))
-
-            row_y += 80  # Move to the next row for each achievement
-
-        # Blit achievements surface onto screen
-        screen.blit(achievements_surface, (0, 0))
-
-        # Draw Main Menu button in achievements screen
-        pygame.draw.rect(screen, gray, main_menu_button_rect)
-        main_menu_text = submit_button_font.render("Main Menu", True, text_color)
-        screen.blit(main_menu_text, main_menu_text.get_rect(center=main_menu_button_rect.center))
-
-        # Event handling for achievements screen
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                # Handle scrolling
-                if event.button == 4:  # Scroll up
-                    scroll_offset = min(scroll_offset + 20, 0)
-                elif event.button == 5:  # Scroll down
-                    scroll_offset = max(scroll_offset - 20, window_height - achievements_surface.get_height())
-
-                # Handle button clicks
-                if main_menu_button_rect.collidepoint(event.pos):
-                    current_screen = "menu"
-                    save_player_data()  # Save player data when returning to the menu
-
-                
-                if "equipped" not in player_data:
-                    player_data["equipped"] = {}  # Initialize if missing
-
-                for rect, achievement_name, reward in equip_button_rects:
-                    if rect.collidepoint(event.pos):
-                        print(f"Clicked on {achievement_name}, reward: {reward}")  # Debug print statement
-                        # Check if the achievement is unlocked before equipping/unequipping
-                        if player_data["achievements"].get(achievement_name, False):
-                            if reward in ["light_pink", "light_blue", "yellow", "green", "black", "galaxy", "rainbow", "food_rain", "brown", "dark_green", "poop"]:
-                                if player_data["equipped"].get("background") == reward:
-                                    print(f"Unequipping background: {reward}")  # Debug print statement
-                                    del player_data["equipped"]["background"]  # Unequip the background
-                                else:
-                                    print(f"Equipping background: {reward}")  # Debug print statement
-                                    player_data["equipped"]["background"] = reward  # Equip the background
-                            elif reward in ["party_hat", "cat_ears", "caspers_gf"]:
-                                if player_data["equipped"].get("sprite") == reward:
-                                    print(f"Unequipping sprite: {reward}")  # Debug print statement
-                                    del player_data["equipped"]["sprite"]  # Unequip the sprite
-                                else:
-                                    print(f"Equipping sprite: {reward}")  # Debug print statement
-                                    player_data["equipped"]["sprite"] = reward  # Equip the sprite
-
-                            save_player_data()  # Save the updated equipped state
-                            break
-
-            elif event.type == pygame.MOUSEMOTION:
-                # Handle scrolling with mouse motion
-                if event.buttons[1]:  # Right mouse button held down
-                    scroll_offset += event.rel[1]
-                    scroll_offset = max(min(scroll_offset, 0), window_height - achievements_surface.get_height())
-               
+        # Rebuild the rows only if an unlock or the equipped rewards changed
+        if achievements_state_key() != achievements_surface_key:
+            build_achievements_surface()
+
+        renderer.widget("achievements_list", screen.get_rect(), (scroll_offset, achievements_surface_key))
+        renderer.widget("main_menu_button", main_menu_button_rect)
+
+        if renderer.begin_draw(screen):
+            screens.draw_achievements(screen, layout_rects, achievements_surface, scroll_offset)
+
+
+    elif current_screen == "statistics":
+        # Everything shown is kept up to date guess by guess (see stats.py), nothing is counted up here
+        guess_stats = game.stats
+        renderer.widget("statistics", screen.get_rect(), (guess_stats.total, int(time.time() // 60)))
+        renderer.widget("main_menu_button", main_menu_button_rect)
+
+        if renderer.begin_draw(screen):
+            screen.fill(white)
+            statistics_title = fonts.render(font, "Statistics", black)
+            screen.blit(statistics_title, (window_width // 2 - statistics_title.get_width() // 2, 10))
+
+            columns = main_layout.rects((window_width, window_height))
+            number_labels = ["?"] + [str(number) for number in stats.NUMBERS]
+            draw_bar_chart(columns["guess_chart"], "Your guesses", number_labels, guess_stats.guess_counts)
+            draw_bar_chart(columns["casper_chart"], "Casper's numbers", number_labels, guess_stats.casper_counts)
+            streak_labels = [str(length) if length % 5 == 0 else "" for length in range(1, stats.MAX_STREAK)] + [f"{stats.MAX_STREAK}+"]
+            draw_bar_chart(columns["streak_chart"], "Streak lengths", streak_labels, guess_stats.streak_histogram())
+
+            stats_lines = [
+                f"Guesses: {guess_stats.total}   Correct: {guess_stats.correct}   Accuracy: {percent(guess_stats.accuracy())}",
+                "Accuracy   " + "   ".join(f"last {minutes} min: {percent(guess_stats.accuracy(minutes))}" for minutes in stats.ACCURACY_WINDOWS),
+                f"Guesses per minute (last 10 min): {guess_stats.guesses_per_minute(10):.1f}",
+            ]
+            text_rect = columns["stats_text"]
+            for line_number, line in enumerate(stats_lines):
+                screen.blit(fonts.render(submit_button_font, line, text_color), (text_rect.x, text_rect.y + line_number * 40))
+
+            pygame.draw.rect(screen, gray, main_menu_button_rect)
+            main_menu_text = fonts.render(submit_button_font, "Main Menu", text_color)
+            screen.blit(main_menu_text, main_menu_text.get_rect(center=main_menu_button_rect.center))
+
     elif current_screen == "settings":
-        screen.fill(white)
-
-        # Settings title
-        settings_title = font.render("Settings", True, black)
-        screen.blit(settings_title, (window_width // 2 - settings_title.get_width() // 2, 10))
-
-        # Draw Reset Player Data button
-        reset_button_rect = pygame.Rect(window_width // 2 - 150, window_height // 2 - 30, 300, 60)  # Adjusted size
-        pygame.draw.rect(screen, gray, reset_button_rect)
-        reset_text = button_font.render("Reset Player Data", True, text_color)
-        screen.blit(reset_text, reset_text.get_rect(center=reset_button_rect.center))
-
-        # Draw Main Menu button in settings screen
-        pygame.draw.rect(screen, gray, main_menu_button_rect)
-        main_menu_text = submit_button_font.render("Main Menu", True, text_color)
-        screen.blit(main_menu_text, main_menu_text.get_rect(center=main_menu_button_rect.center))
-
-        # Handle button click event
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            if reset_button_rect.collidepoint(event.pos):
-                show_confirmation_popup = True
-            elif main_menu_button_rect.collidepoint(event.pos):
-                current_screen = "menu"
-
-        # Confirmation popup
-        if show_confirmation_popup:
-            confirmation_rect = pygame.Rect(window_width // 2 - 200, window_height // 2 - 100, 400, 200)  # Define confirmation_rect
-            screen.fill(white, confirmation_rect)  # Clear confirmation popup area
-
-            pygame.draw.rect(screen, white, confirmation_rect)
-            pygame.draw.rect(screen, black, confirmation_rect, 2)
-
-            confirmation_text = font.render("Confirm Reset", True, black)
-            screen.blit(confirmation_text, confirmation_text.get_rect(center=(confirmation_rect.centerx, confirmation_rect.top + 40)))
-
-            confirm_button_rect = pygame.Rect(confirmation_rect.left + 40, confirmation_rect.bottom - 70, 100, 50)
-            cancel_button_rect = pygame.Rect(confirmation_rect.right - 140, confirmation_rect.bottom - 70, 100, 50)
-
-            pygame.draw.rect(screen, gray, confirm_button_rect)
-            pygame.draw.rect(screen, gray, cancel_button_rect)
-
-            confirm_text = pygame.font.Font(None, 25).render("Confirm", True, text_color)  # Smaller font size for confirm button
-            cancel_text = pygame.font.Font(None, 25).render("Cancel", True, text_color)  # Matching font size for cancel button
-
-            screen.blit(confirm_text, confirm_text.get_rect(center=confirm_button_rect.center))
-            screen.blit(cancel_text, cancel_text.get_rect(center=cancel_button_rect.center))
-
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if confirm_button_rect.collidepoint(event.pos):
-                    # Reset player data
-                    player_data = {
-                        "high_score": 0,
-                        "correct_consecutive_guesses": 0,
-                        "total_correct_guesses": 0,
-                        "incorrect_guesses": 0,
-                        "caspers_sprite_taps": 0,  # Include sprite taps
-                        "equipped": {},  # Initialize equipped key
-                        "achievements": {achievement["name"]: False for achievement in achievements}
-                    }
-                    with open("player_datas.json", "w") as file:
-                        json.dump(player_data, file)
-                    high_score = 0
-                    correct_consecutive_guesses = 0
-                    total_correct_guesses = 0
-                    incorrect_guesses = 0
-                    caspers_sprite_taps = 0  # Reset sprite taps
-                    for achievement in achievements:
-                        achievement["unlocked"] = False
-                    show_confirmation_popup = False
-                    print("Player data has been reset.")
-
-    pygame.display.flip()
-    clock.tick(60)
+        renderer.widget("title", fonts.render(font, "Settings", black).get_rect(midtop=(window_width // 2, 10)))
+        renderer.widget("reset_button", reset_button_rect)
+        renderer.widget("main_menu_button", main_menu_button_rect)
+        renderer.widget("confirmation_popup", confirmation_rect, show_confirmation_popup)
+
+        if renderer.begin_draw(screen):
+            screen.fill(white)
+
+            # Settings title
+            settings_title = fonts.render(font, "Settings", black)
+            screen.blit(settings_title, (window_width // 2 - settings_title.get_width() // 2, 10))
+
+            # Draw Reset Player Data button
+            pygame.draw.rect(screen, gray, reset_button_rect)
+            reset_text = fonts.render(button_font, "Reset Player Data", text_color)
+            screen.blit(reset_text, reset_text.get_rect(center=reset_button_rect.center))
+
+            # Draw Main Menu button in settings screen
+            pygame.draw.rect(screen, gray, main_menu_button_rect)
+            main_menu_text = fonts.render(submit_button_font, "Main Menu", text_color)
+            screen.blit(main_menu_text, main_menu_text.get_rect(center=main_menu_button_rect.center))
+
+            # Confirmation popup
+            if show_confirmation_popup:
+                screen.fill(white, confirmation_rect)  # Clear confirmation popup area
+
+                pygame.draw.rect(screen, white, confirmation_rect)
+                pygame.draw.rect(screen, black, confirmation_rect, 2)
+
+                confirmation_text = fonts.render(font, "Confirm Reset", black)
+                screen.blit(confirmation_text, confirmation_text.get_rect(center=(confirmation_rect.centerx, confirmation_rect.top + 40)))
+
+                pygame.draw.rect(screen, gray, confirm_button_rect)
+                pygame.draw.rect(screen, gray, cancel_button_rect)
+
+                confirm_text = fonts.render(fonts.get_font(25), "Confirm", text_color)  # Smaller font size for confirm button
+                cancel_text = fonts.render(fonts.get_font(25), "Cancel", text_color)  # Matching font size for cancel button
+
+                screen.blit(confirm_text, confirm_text.get_rect(center=confirm_button_rect.center))
+                screen.blit(cancel_text, cancel_text.get_rect(center=cancel_button_rect.center))
+
+    # The banner and the overlay go on top of whatever the screen drew this frame
+    if toast is not None and renderer.drawing():
+        screen.blit(toast_surface, toast_rect)
+    if profiler.overlay_enabled and renderer.drawing():
+        overlay_font = fonts.get_font(20)
+        screen.fill(black, overlay_rect)
+        for line_number, line in enumerate(overlay_lines):
+            for column_x, cell in zip((5, 170, 235, 300), line):  # Fixed columns, the default font isn't monospaced
+                screen.blit(fonts.render(overlay_font, cell, white), (overlay_rect.x + column_x, overlay_rect.y + 5 + 20 * line_number))
+
+    frame_drew = renderer.drawing()
+    profiler.start("present")
+    renderer.present(screen)
+    profiler.stop("present")
+    events.frame_presented()
+    if startup_started is not None:
+        print(f"First frame after {(time.perf_counter() - startup_started) * 1000:.0f} ms")
+        startup_started = None
+    profiler.end_frame(current_screen)
+    pacing.end_frame(clock, active=bool(frame_events) or frame_drew)
     
 # Save player data to file
-player_data["high_score"] = high_score
-player_data["achievements"] = {achievement["name"]: achievement["unlocked"] for achievement in achievements}
-with open("player_datas.json", "w") as file:
-    json.dump(player_data, file)
+game.save()
+flush_player_data()  # Don't leave anything for the background writer on the way out
+if args.server:
+    game.close()
+elif args.store == "journal" and not args.replay:
+    journal_store.close()
+elif args.store == "sqlite" and not args.replay:
+    profile_store.close()
+replay.close()
+if args.replay:
+    replay.print_report()
+if args.trace:
+    profiler.export_trace(args.trace)
+if args.profiler:
+    print("Resident surfaces: " + ", ".join(f"{name} {size / 1024 / 1024:.1f} MB" for name, size in surface_usage().items()))
 
 pygame.quit()
@@ -0,0 +1,75 @@
+import json
+import socket
+
+import engine
+import server
+
+# Playing against a game server (server.py) instead of a local save. The server keeps the real game
+# and does the saving; RemoteGame sends it each action and then applies the server's answer to its
+# own copy of the game with the same rules, so the window can read scores, counters, achievements and
+# equipped rewards off it like off a local CasperGame.
+
+
+def parse_address(address):
+    # "host:port", "host" or ":port"
+    host, _, port = address.rpartition(":") if ":" in address else (address, "", "")
+    return host or server.HOST, int(port) if port else server.PORT
+
+
+class RemoteGame(engine.CasperGame):
+    def __init__(self, address, profile, on_unlock=None, timeout=10):
+        self.connection = socket.create_connection(parse_address(address), timeout=timeout)
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)  # One small request at a time, don't hold them back
+        self.stream = self.connection.makefile("rwb")
+        try:
+            reply = self.request("hello", profile=profile)
+        except BaseException:
+            self.connection.close()
+            raise
+        super().__init__(reply["player_data"], on_unlock=on_unlock)
+        self.score = reply["score"]
+
+    def request(self, op, **fields):
+        fields["op"] = op
+        self.stream.write(json.dumps(fields).encode() + b"\n")
+        self.stream.flush()
+        line = self.stream.readline()
+        if not line:
+            raise ConnectionError("the server closed the connection")
+        reply = json.loads(line)
+        if not reply["ok"]:
+            raise RuntimeError(reply["error"])
+        return reply
+
+    def play(self, guess):
+        # Casper's number only exists on the server
+        reply = self.request("guess", number=guess)
+        self.update_score(reply["correct"], guess, reply["casper_number"])
+        return reply["correct"], reply["casper_number"]
+
+    def new_game(self):
+        self.request("new_game")
+        super().new_game()
+
+    def tap(self):
+        self.request("tap")
+        return super().tap()
+
+    def toggle_equipped(self, reward):
+        self.request("equip", reward=reward)
+        return super().toggle_equipped(reward)
+
+    def unlock_all(self):
+        self.request("unlock_all")
+        super().unlock_all()
+
+    def reset(self):
+        self.request("reset")
+        super().reset()
+
+    def close(self):
+        try:
+            self.request("bye")
+        except (OSError, ValueError, RuntimeError):
+            pass  # Gone already; the server saves a session when it ends either way
+        self.connection.close()
@@ -0,0 +1,364 @@
+import json
+import random
+
+import achievement_rules
+import stats
+
+# Every reward in one place: the equipped slot it goes in and what it looks like. Colors are RGB,
+# assets are file names in sprites/Sprites; locked_asset is shown in the achievements list until it's unlocked.
+# An image background with scroll keeps falling through the window, taking that many seconds per pass.
+REWARDS = {
+    "light_pink": {"slot": "background", "kind": "color", "color": (255, 192, 203)},
+    "light_blue": {"slot": "background", "kind": "color", "color": (173, 216, 230)},
+    "yellow": {"slot": "background", "kind": "color", "color": (255, 255, 0)},
+    "green": {"slot": "background", "kind": "color", "color": (0, 255, 0)},
+    "black": {"slot": "background", "kind": "color", "color": (0, 0, 0)},
+    "galaxy": {"slot": "background", "kind": "image", "asset": "Galaxy_background.png"},
+    "rainbow": {"slot": "background", "kind": "image", "asset": "Rainbow_background.png"},
+    "food_rain": {"slot": "background", "kind": "image", "asset": "food_rain_background.png", "scroll": 8.0},
+    "brown": {"slot": "background", "kind": "color", "color": (139, 69, 19)},
+    "dark_green": {"slot": "background", "kind": "color", "color": (0, 100, 0)},
+    "poop": {"slot": "background", "kind": "image", "asset": "poop_background.png"},
+    "party_hat": {"slot": "sprite", "kind": "image", "asset": "party_casper.png"},
+    "cat_ears": {"slot": "sprite", "kind": "image", "asset": "cat_casper.png"},
+    "caspers_gf": {"slot": "sprite", "kind": "image", "asset": "caspers_gf.png", "locked_asset": "question_mark.png"},
+}
+
+BACKGROUND_REWARDS = [name for name, reward in REWARDS.items() if reward["slot"] == "background"]
+SPRITE_REWARDS = [name for name, reward in REWARDS.items() if reward["slot"] == "sprite"]
+
+ACHIEVEMENTS = [
+    {
+        "name": "First Day on the Job",
+        "description": "Awarded for making the first correct guess",
+        "reward": "light_pink",
+        "counter": "total_correct_guesses",
+        "threshold": 1,  # Check total correct guesses
+        "unlocked": False
+    },
+    {
+        "name": "Third Time's the Charm!",
+        "description": "Awarded for making 3 correct consecutive guesses",
+        "reward": "light_blue",
+        "counter": "correct_consecutive_guesses",
+        "threshold": 3,
+        "unlocked": False
+    },
+    {
+        "name": "The Big 5",
+        "description": "Awarded for making 5 correct consecutive guesses",
+        "reward": "yellow",
+        "counter": "correct_consecutive_guesses",
+        "threshold": 5,
+        "unlocked": False
+    },
+    {
+        "name": "Lucky Number",
+        "description": "Awarded for making 7 correct consecutive guesses",
+        "reward": "green",
+        "counter": "correct_consecutive_guesses",
+        "threshold": 7,
+        "unlocked": False
+    },
+    {
+        "name": "The Impossible",
+        "description": "Awarded for making 10 correct consecutive guesses",
+        "reward": "galaxy",
+        "counter": "correct_consecutive_guesses",
+        "threshold": 10,
+        "unlocked": False
+    },
+    {
+        "name": "The Start",
+        "description": "Awarded for 5 total correct guesses",
+        "reward": "black",
+        "counter": "total_correct_guesses",
+        "threshold": 5,
+        "unlocked": False
+    },
+    {
+        "name": "Hobbyist",
+        "description": "Awarded for 25 total correct guesses",
+        "reward": "rainbow",
+        "counter": "total_correct_guesses",
+        "threshold": 25,
+        "unlocked": False
+    },
+    {
+        "name": "Expert Guesser",
+        "description": "Awarded for 50 total correct guesses",
+        "reward": "food_rain",
+        "counter": "total_correct_guesses",
+        "threshold": 50,
+        "unlocked": False
+    },
+    {
+        "name": "Bad Start",
+        "description": "Awarded for 5 total incorrect guesses",
+        "reward": "brown",
+        "counter": "incorrect_guesses",
+        "threshold": 5,
+        "unlocked": False
+    },
+    {
+        "name": "Going Lower",
+        "description": "Awarded for 25 total incorrect guesses",
+        "reward": "dark_green",
+        "counter": "incorrect_guesses",
+        "threshold": 25,
+        "unlocked": False
+    },
+    {
+        "name": "Bottom of the Barrel",
+        "description": "Awarded for 50 total incorrect guesses",
+        "reward": "poop",
+        "counter": "incorrect_guesses",
+        "threshold": 50,
+        "unlocked": False
+    },
+    {
+        "name": "Avid Collector",
+        "description": "Awarded for Collecting all backgrounds",
+        "reward": "party_hat",
+        "counter": "backgrounds_collected",
+        "threshold": len(BACKGROUND_REWARDS),  # Every background reward
+        "unlocked": False
+    },
+    {
+        "name": "Who's a good boy?",
+        "description": "Awarded for tapping on Casper's sprite 10 times",
+        "reward": "cat_ears",
+        "counter": "caspers_sprite_taps",
+        "threshold": 10,
+        "unlocked": False
+    },
+    {
+        "name": "Master Guesser",
+        "description": "Awarded for completing all other achievements",
+        "reward": "caspers_gf",
+        "counter": "achievements_unlocked",
+        "threshold": None,  # All other achievements must be unlocked, filled in below
+        "unlocked": False
+    }
+]
+
+for achievement in ACHIEVEMENTS:
+    if achievement["counter"] == "achievements_unlocked":
+        achievement["threshold"] = len(ACHIEVEMENTS) - 1
+
+ACHIEVEMENT_INDEX = achievement_rules.build_index(ACHIEVEMENTS)
+
+# What CasperGame reports to on_event, in the order the journal numbers them
+EVENTS = ["guess", "tap", "equip", "reset", "new_game", "unlock_all"]
+
+# Counters the player data keeps and the achievement rules watch
+COUNTERS = ["total_correct_guesses", "correct_consecutive_guesses", "incorrect_guesses", "caspers_sprite_taps"]
+
+
+def is_background(reward):
+    return REWARDS.get(reward, {}).get("slot") == "background"
+
+
+def new_player_data():
+    return {
+        "high_score": 0,
+        "correct_consecutive_guesses": 0,
+        "total_correct_guesses": 0,
+        "incorrect_guesses": 0,
+        "caspers_sprite_taps": 0,
+        "equipped": {},  # Initialize equipped rewards
+        "achievements": {achievement["name"]: False for achievement in ACHIEVEMENTS}
+    }
+
+
+def load_player_data(path):
+    try:
+        with open(path, "r") as file:
+            file_content = file.read().strip()
+        return json.loads(file_content) if file_content else {}
+    except (FileNotFoundError, json.JSONDecodeError):
+        return new_player_data()
+
+
+class CasperGame:
+    # One player's game (score, counters, achievements and equipped rewards) without any pygame.
+    # save gets called with the player data whenever it changed, on_unlock with each newly unlocked achievement.
+    # achievements swaps in another catalog (same shape as ACHIEVEMENTS), e.g. a big synthetic one for benchmarks.
+    # on_event gets called with (kind, value) for everything the player does (see EVENTS), after it was applied,
+    # so the same calls on apply() rebuild the state (the journal store does that).
+
+    def __init__(self, player_data=None, rng=None, save=None, on_unlock=None, achievements=None, on_event=None):
+        self.rng = rng or random.Random()
+        self.save_callback = save
+        self.on_unlock = on_unlock
+        self.on_event = on_event
+        if achievements is None:
+            achievements, self.achievement_index = ACHIEVEMENTS, ACHIEVEMENT_INDEX
+        else:
+            self.achievement_index = achievement_rules.build_index(achievements)
+        self.achievements = [dict(achievement) for achievement in achievements]
+        self.load(player_data if player_data is not None else new_player_data())
+        self.score = 0
+        self.casper_number = self.generate_new_casper_number()
+
+    def load(self, player_data):
+        self.player_data = player_data
+        self.high_score = player_data.get("high_score", 0)
+        self.correct_consecutive_guesses = player_data.get("correct_consecutive_guesses", 0)
+        self.total_correct_guesses = player_data.get("total_correct_guesses", 0)
+        self.incorrect_guesses = player_data.get("incorrect_guesses", 0)
+        self.caspers_sprite_taps = player_data.get("caspers_sprite_taps", 0)
+        player_data["equipped"] = player_data.get("equipped", {})  # Ensure equipped key is present
+        # One entry per achievement in the catalog; from here on only unlocks change it, one entry at a time
+        saved = player_data.get("achievements", {})
+        player_data["achievements"] = {achievement["name"]: saved.get(achievement["name"], False) for achievement in self.achievements}
+        for achievement in self.achievements:
+            achievement["unlocked"] = player_data["achievements"][achievement["name"]]
+        # Running counts for the achievements that count other achievements, kept up by unlock_achievement
+        self.achievements_unlocked = sum(1 for achievement in self.achievements if achievement["unlocked"])
+        self.backgrounds_collected = sum(1 for achievement in self.achievements if achievement["unlocked"] and is_background(achievement["reward"]))
+        self.stats = stats.GuessStats(player_data.get("stats"))  # For the Statistics screen
+        self.checked_counters = {}  # counter -> value the achievement rules were last checked against
+
+    def generate_new_casper_number(self):
+        return self.rng.randint(1, 10)
+
+    def new_game(self):
+        self.score = 0
+        self.casper_number = self.generate_new_casper_number()
+        self.record("new_game")
+
+    def play(self, guess):
+        # Returns whether the guess was right and the number Casper was thinking of, then picks a new one
+        number = self.casper_number
+        correct = guess == number
+        self.update_score(correct, guess, number)
+        self.casper_number = self.generate_new_casper_number()
+        return correct, number
+
+    def update_score(self, correct_guess, guess=None, casper_number=None, now=None):
+        # guess and casper_number only feed the statistics; now is when it happened (a replayed event's time)
+        self.stats.record(correct_guess, guess, casper_number, now)
+        if correct_guess:
+            self.score += 1
+            self.correct_consecutive_guesses += 1
+            self.total_correct_guesses += 1
+            if self.score > self.high_score:
+                self.high_score = self.score
+        else:
+            self.score = 0
+            self.correct_consecutive_guesses = 0
+            self.incorrect_guesses += 1
+
+        # Check achievements after score update
+        newly_unlocked = self.check_achievements()
+        self.record("guess", (correct_guess, guess, casper_number))
+        return newly_unlocked
+
+    def tap(self):
+        self.caspers_sprite_taps += 1
+        newly_unlocked = self.check_achievements()
+        self.record("tap")
+        return newly_unlocked
+
+    def unlock_achievement(self, achievement):
+        achievement["unlocked"] = True
+        self.player_data["achievements"][achievement["name"]] = True
+        self.achievements_unlocked += 1
+        if is_background(achievement["reward"]):
+            self.backgrounds_collected += 1
+
+        # Equip the reward in its slot
+        reward = REWARDS.get(achievement["reward"])
+        if reward is not None:
+            self.player_data["equipped"][reward["slot"]] = achievement["reward"]
+
+        if self.on_unlock is not None:
+            self.on_unlock(achievement)
+
+    def check_achievements(self):
+        # Only the rules whose thresholds the counters just crossed get looked at
+        newly_unlocked = []
+        changed_counters = [(counter, getattr(self, counter)) for counter in COUNTERS]
+        while changed_counters:
+            counter, value = changed_counters.pop()
+            previous = self.checked_counters.get(counter, 0)
+            self.checked_counters[counter] = value
+            unlocked_before = len(newly_unlocked)
+            for position in achievement_rules.crossed(self.achievement_index, counter, previous, value):
+                achievement = self.achievements[position]
+                if not achievement["unlocked"]:
+                    self.unlock_achievement(achievement)
+                    newly_unlocked.append(achievement)
+
+            if len(newly_unlocked) > unlocked_before:
+                # Unlocks can complete the achievements that count other achievements
+                changed_counters.append(("backgrounds_collected", self.backgrounds_collected))
+                changed_counters.append(("achievements_unlocked", self.achievements_unlocked))
+
+        # Save player data after checking achievements
+        self.save()
+        return newly_unlocked
+
+    def unlock_all(self):
+        for achievement in self.achievements:
+            achievement["unlocked"] = True
+            self.player_data["achievements"][achievement["name"]] = True
+        self.achievements_unlocked = len(self.achievements)
+        self.backgrounds_collected = sum(1 for achievement in self.achievements if is_background(achievement["reward"]))
+        self.save()
+        self.record("unlock_all")
+
+    def toggle_equipped(self, reward):
+        # Equip the reward in its slot, or take it off if it is already equipped
+        if reward not in REWARDS:
+            return None
+        slot = REWARDS[reward]["slot"]
+        if self.player_data["equipped"].get(slot) == reward:
+            del self.player_data["equipped"][slot]
+            equipped = False
+        else:
+            self.player_data["equipped"][slot] = reward
+            equipped = True
+        self.save()
+        self.record("equip", reward)
+        return equipped
+
+    def reset(self):
+        self.load(new_player_data())  # Also locks every achievement again
+        self.score = 0
+        self.save()
+        self.record("reset")
+
+    def record(self, kind, value=None):
+        if self.on_event is not None:
+            self.on_event(kind, value)
+
+    def apply(self, kind, value=None, now=None):
+        # Do a recorded event again, e.g. when replaying a journal
+        if kind == "guess":
+            correct, guess, casper_number = value
+            self.update_score(correct, guess, casper_number, now)
+        elif kind == "tap":
+            self.tap()
+        elif kind == "equip":
+            self.toggle_equipped(value)
+        elif kind == "reset":
+            self.reset()
+        elif kind == "new_game":
+            self.new_game()
+        elif kind == "unlock_all":
+            self.unlock_all()
+        else:
+            raise ValueError(f"Unknown event: {kind}")
+
+    def save(self):
+        player_data = self.player_data
+        player_data["high_score"] = self.high_score
+        player_data["correct_consecutive_guesses"] = self.correct_consecutive_guesses
+        player_data["total_correct_guesses"] = self.total_correct_guesses
+        player_data["incorrect_guesses"] = self.incorrect_guesses
+        player_data["caspers_sprite_taps"] = self.caspers_sprite_taps
+        player_data["stats"] = self.stats.state()
+        if self.save_callback is not None:
+            self.save_callback(player_data)
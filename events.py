@@ -0,0 +1,55 @@
+import time
+
+import pygame
+
+import profiler
+import replay
+
+# The event queue is pumped exactly once per frame, here, and casper.py routes each event to the
+# handler of the screen that is current at that moment. Pumping twice in a frame loses whatever the
+# first pump took, so nothing else should call pygame.event.get().
+
+ALLOWED_EVENTS = [pygame.QUIT, pygame.VIDEORESIZE, pygame.VIDEOEXPOSE, pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN, pygame.MOUSEMOTION]
+INPUT_EVENTS = {pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN}  # What the input latency is measured for
+
+_last_pump = None
+_previous_pump = None
+_input_pending = False  # This frame's pump had input that the frame still has to show
+_woken_by = []  # The event that ended an idle wait, handed out by the next pump
+
+
+def allow_only(event_types=ALLOWED_EVENTS):
+    # Everything else never reaches the queue, so it can't fill up with events nobody reads
+    pygame.event.set_blocked(None)
+    pygame.event.set_allowed(event_types)
+
+
+def wait(timeout):
+    # Block until an event arrives or timeout milliseconds have passed
+    global _last_pump
+    event = pygame.event.wait(timeout)
+    if event.type != pygame.NOEVENT:
+        _woken_by.append(event)
+    _last_pump = time.perf_counter()  # Anything that woke us arrived just now, the sleep isn't latency
+
+
+def pump():
+    global _last_pump, _previous_pump, _input_pending
+    _previous_pump, _last_pump = _last_pump, time.perf_counter()
+    pending = _woken_by + pygame.event.get()
+    _woken_by.clear()
+    if replay.replaying():
+        pending = replay.feed(pending)  # The recorded input instead of the real one
+    elif replay.recording():
+        replay.capture(pending)
+    _input_pending = any(event.type in INPUT_EVENTS for event in pending)
+    return pending
+
+
+def frame_presented():
+    # SDL events carry no timestamp we can read, so the latency is taken from the previous pump: the
+    # longest an input could have waited in the queue plus the time until its frame was on screen
+    global _input_pending
+    if _input_pending and _previous_pump is not None:
+        profiler.record("input_latency", time.perf_counter() - _previous_pump)
+    _input_pending = False
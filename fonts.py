@@ -0,0 +1,45 @@
+from collections import OrderedDict
+
+import pygame
+
+import assets
+import profiler
+
+MAX_RENDERED_TEXTS = 256  # How many rendered strings we keep before evicting the least recently used
+
+_fonts = {}  # (face, size) -> pygame.font.Font
+_rendered = OrderedDict()  # (font, text, color, antialias) -> rendered surface, oldest first
+
+
+def get_font(size, face=None):
+    # Each (face, size) pair is only ever constructed once
+    key = (face, size)
+    font = _fonts.get(key)
+    if font is None:
+        font = pygame.font.Font(face, size)
+        _fonts[key] = font
+    return font
+
+
+def render(font, text, color, antialias=True):
+    key = (font, text, tuple(color), antialias)
+    surface = _rendered.get(key)
+    if surface is not None:
+        _rendered.move_to_end(key)
+        return surface
+
+    profiler.start("text")  # Only misses cost anything worth timing
+    surface = font.render(text, antialias, color)
+    profiler.stop("text")
+    _rendered[key] = surface
+    while len(_rendered) > MAX_RENDERED_TEXTS:
+        _rendered.popitem(last=False)  # Evict the least recently used string
+    return surface
+
+
+def resident_bytes():
+    return sum(assets.surface_bytes(surface) for surface in _rendered.values())
+
+
+def clear():
+    _rendered.clear()
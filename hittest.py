@@ -0,0 +1,48 @@
+import pygame
+
+# Click targets. Each screen registers its clickable rects once per layout (and the achievements list
+# once per atlas build) in a HitGrid, which files them under the grid cells they cover, so finding
+# what a click hit only looks at the few targets in its cell however many there are.
+#
+# Targets registered later are on top. A target can have a mask (a pygame.mask.Mask, or a function
+# returning one, for a sprite that changes) and then only counts where the mask is set, so clicks on
+# the transparent parts of a sprite go to whatever is under it.
+
+CELL = 64  # Pixels per grid cell side
+
+
+class HitGrid:
+    def __init__(self, cell=CELL):
+        self.cell = cell
+        self._targets = []  # (name, rect, mask, data), bottom first
+        self._cells = {}  # (column, row) -> indexes into _targets
+
+    def clear(self):
+        self._targets.clear()
+        self._cells.clear()
+
+    def add(self, name, rect, mask=None, data=None):
+        rect = pygame.Rect(rect)
+        if rect.width <= 0 or rect.height <= 0:
+            return
+        index = len(self._targets)
+        self._targets.append((name, rect, mask, data))
+        for column in range(rect.left // self.cell, (rect.right - 1) // self.cell + 1):
+            for row in range(rect.top // self.cell, (rect.bottom - 1) // self.cell + 1):
+                self._cells.setdefault((column, row), []).append(index)
+
+    def hit(self, pos):
+        # (name, data) of the topmost target at pos, or None
+        x, y = pos
+        for index in reversed(self._cells.get((x // self.cell, y // self.cell), ())):
+            name, rect, mask, data = self._targets[index]
+            if not rect.collidepoint(x, y):
+                continue
+            if mask is not None:
+                mask = mask() if callable(mask) else mask
+                if mask is not None:
+                    width, height = mask.get_size()
+                    if not mask.get_at(((x - rect.x) * width // rect.width, (y - rect.y) * height // rect.height)):
+                        continue  # A see-through part
+            return name, data
+        return None
@@ -0,0 +1,212 @@
+import argparse
+import copy
+import json
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+
+import engine
+import persistence
+import stats
+
+# Event-sourced player store. Every guess, tap, equip, reset and new game is appended to a journal
+# as one fixed-size record, so a save costs the same 16 bytes however big the player data gets.
+# The state is rebuilt on startup from the last snapshot plus the journal written after it.
+#
+# Journals are numbered by generation. Once the current one holds COMPACT_AFTER records the store
+# switches to the next generation and a background thread writes a snapshot of the state at the
+# switch; from then on startup only replays the newer journal. Older journals are kept as the play
+# history (see history()), they are only 16 bytes per event.
+#
+# A record is: time (float seconds), event number (engine.EVENTS), value, and a CRC32 of those. A guess's
+# value packs whether it was right with the guessed number and Casper's (4 bits each: 0 unknown, 1-10,
+# OTHER_NUMBER for anything outside 1-10).
+# A crash can at worst leave a torn last record, which fails its CRC and gets cut off.
+
+SNAPSHOT_PATH = "player_snapshot.json"
+JOURNAL_NAME = "player_journal.{}.bin"
+JOURNAL_PATTERN = re.compile(r"player_journal\.(\d+)\.bin$")
+COMPACT_AFTER = 4096  # Records in the current journal before it gets folded into a snapshot
+
+PAYLOAD = struct.Struct("<dHH")  # time, event, value
+CHECKSUM = struct.Struct("<I")  # crc32 of the payload
+RECORD_SIZE = PAYLOAD.size + CHECKSUM.size
+OTHER_NUMBER = 11
+REWARD_NAMES = list(engine.REWARDS)  # Equip records store the reward's position in here
+
+
+def encode_number(number):
+    if number is None:
+        return 0
+    return stats.number_slot(number) or OTHER_NUMBER
+
+
+def decode_number(code):
+    if code == 0:
+        return None
+    return 0 if code == OTHER_NUMBER else code  # 0 counts as "other" in the statistics
+
+
+def encode(kind, value, timestamp):
+    if kind == "guess":
+        correct, guess, casper_number = value
+        number = int(bool(correct)) | encode_number(guess) << 1 | encode_number(casper_number) << 5
+    elif kind == "equip":
+        number = REWARD_NAMES.index(value)
+    else:
+        number = 0
+    payload = PAYLOAD.pack(timestamp, engine.EVENTS.index(kind), number)
+    return payload + CHECKSUM.pack(zlib.crc32(payload))
+
+
+def decode(record):
+    payload = record[:PAYLOAD.size]
+    if CHECKSUM.unpack(record[PAYLOAD.size:])[0] != zlib.crc32(payload):
+        return None
+    timestamp, event, number = PAYLOAD.unpack(payload)
+    if event >= len(engine.EVENTS):
+        return None
+    kind = engine.EVENTS[event]
+    if kind == "guess":
+        value = (bool(number & 1), decode_number((number >> 1) & 0xF), decode_number((number >> 5) & 0xF))
+    elif kind == "equip":
+        value = REWARD_NAMES[number] if number < len(REWARD_NAMES) else None
+    else:
+        value = None
+    return timestamp, kind, value
+
+
+class JournalStore:
+    def __init__(self, directory=".", compact_after=COMPACT_AFTER, legacy_json=None):
+        self.directory = directory
+        self.snapshot_path = os.path.join(directory, SNAPSHOT_PATH)
+        self.compact_after = compact_after
+        self.legacy_json = legacy_json  # Where the starting state comes from before there is any snapshot
+        self.game = None
+        self.generation = 0
+        self.records = 0  # Records in the current journal
+        self._file = None
+        self._loaded_score = 0
+        self._compactor = None
+
+    def journal_path(self, generation):
+        return os.path.join(self.directory, JOURNAL_NAME.format(generation))
+
+    def generations(self):
+        found = []
+        for name in os.listdir(self.directory):
+            match = JOURNAL_PATTERN.match(name)
+            if match:
+                found.append(int(match.group(1)))
+        return sorted(found)
+
+    def load(self):
+        # Returns the player data as of the last event; attach() the game made from it afterwards
+        snapshot = None
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path) as file:
+                snapshot = json.load(file)  # Written with write_atomic, so never half a file
+        if snapshot is not None:
+            base, player_data, score = snapshot["generation"], snapshot["player_data"], snapshot["score"]
+        elif self.legacy_json is not None and os.path.exists(self.legacy_json):
+            base, player_data, score = 0, engine.load_player_data(self.legacy_json), 0
+        else:
+            base, player_data, score = 0, engine.new_player_data(), 0
+
+        # Replay everything after the snapshot on a game with no callbacks, so nothing gets recorded again
+        game = engine.CasperGame(player_data)
+        game.score = score
+        newer = [generation for generation in self.generations() if generation >= base]
+        for generation in newer:
+            for timestamp, kind, value in self._read(generation, repair=True):
+                game.apply(kind, value, timestamp)
+        game.save()  # Copies the counters into the player data
+        self._loaded_score = game.score
+        self._open(newer[-1] if newer else base)
+        return game.player_data
+
+    def attach(self, game):
+        # The game whose events get appended (pass append as its on_event) and whose state gets snapshotted
+        self.game = game
+        game.score = self._loaded_score
+
+    def append(self, kind, value=None):
+        self._file.write(encode(kind, value, time.time()))
+        self._file.flush()  # In the OS's hands now; a crash of the game can't lose it
+        self.records += 1
+        if self.records >= self.compact_after and self.game is not None and not self.compacting():
+            self.compact()
+
+    def compacting(self):
+        return self._compactor is not None and self._compactor.is_alive()
+
+    def compact(self):
+        # Later events go to a new journal; the snapshot of the state at this point is written in the background
+        snapshot = {"generation": self.generation + 1, "score": self.game.score, "player_data": copy.deepcopy(self.game.player_data)}
+        self._open(self.generation + 1)
+        self._compactor = threading.Thread(target=persistence.write_atomic, args=(self.snapshot_path, snapshot), name="journal-compactor", daemon=True)
+        self._compactor.start()
+
+    def close(self):
+        if self._compactor is not None:
+            self._compactor.join()
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+    def history(self):
+        # Every event ever recorded as (time, kind, value), oldest first, across all generations
+        for generation in self.generations():
+            yield from self._read(generation)
+
+    def _open(self, generation):
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())  # The old journal has to be complete before anything relies on the snapshot
+            self._file.close()
+        path = self.journal_path(generation)
+        self._file = open(path, "ab")
+        self.generation = generation
+        self.records = os.path.getsize(path) // RECORD_SIZE
+
+    def _read(self, generation, repair=False):
+        path = self.journal_path(generation)
+        with open(path, "rb") as file:
+            data = file.read()
+        events = []
+        good = 0
+        for start in range(0, len(data) - RECORD_SIZE + 1, RECORD_SIZE):
+            event = decode(data[start:start + RECORD_SIZE])
+            if event is None:
+                break
+            events.append(event)
+            good = start + RECORD_SIZE
+        if repair and good < len(data):
+            # A torn or damaged tail from a crash: drop it so new records line up again
+            print(f"Dropping {len(data) - good} damaged bytes from the end of {path}")
+            with open(path, "r+b") as file:
+                file.truncate(good)
+        return events
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show what is in Casper's player journal")
+    parser.add_argument("--dir", default=".", help="folder with the snapshot and journals")
+    args = parser.parse_args()
+
+    store = JournalStore(args.dir)
+    counts = {}
+    for timestamp, kind, value in store.history():
+        counts[kind] = counts.get(kind, 0) + 1
+    print(f"Generations: {store.generations()}")
+    for kind, count in counts.items():
+        print(f"{kind:<12} {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+from collections import OrderedDict
+
+import pygame
+
+# Anchor based layout. Every widget says how big it is and which of its points goes where: on a spot
+# of the window (given as fractions of the window size) or on a point of a widget placed before it.
+# The rects only depend on the window size, so they are worked out once per size and cached.
+#
+# A widget is a dict:
+#   name    what the rect is looked up by
+#   size    (width, height); each is pixels, a float fraction of the window, or negative pixels for
+#           "the window minus this much"
+#   point   the rect attribute that gets placed, e.g. "center", "topleft", "midtop"
+#   at      (x fraction, y fraction) of the window, or (widget name, point) of another widget
+#   offset  pixels added after placing (optional)
+#   shrink  scale the size down on windows shorter than BASE_HEIGHT (optional)
+
+BASE_HEIGHT = 600  # Window height the layouts are designed for
+MAX_CACHED_SIZES = 8
+
+
+class Layout:
+    def __init__(self, widgets):
+        self.widgets = widgets
+        self._cache = OrderedDict()  # window size -> {name: rect}, oldest first
+
+    def rects(self, window_size):
+        window_size = tuple(window_size)
+        rects = self._cache.get(window_size)
+        if rects is not None:
+            self._cache.move_to_end(window_size)
+            return rects
+
+        rects = {}
+        for widget in self.widgets:
+            rects[widget["name"]] = self._place(widget, window_size, rects)
+        self._cache[window_size] = rects
+        while len(self._cache) > MAX_CACHED_SIZES:
+            self._cache.popitem(last=False)
+        return rects
+
+    def apply(self, window_size, targets):
+        # Move the given rects (name -> pygame.Rect) in place, so code holding on to them sees the change
+        rects = self.rects(window_size)
+        for name, rect in targets.items():
+            rect.update(rects[name])
+
+    @staticmethod
+    def _place(widget, window_size, placed):
+        width, height = (Layout._length(length, window_length) for length, window_length in zip(widget["size"], window_size))
+        if widget.get("shrink") and window_size[1] < BASE_HEIGHT:
+            scale = window_size[1] / BASE_HEIGHT
+            width, height = int(width * scale), int(height * scale)
+        rect = pygame.Rect(0, 0, width, height)
+
+        target, where = widget["at"]
+        if isinstance(target, str):
+            anchor = getattr(placed[target], where)
+        else:
+            anchor = (int(window_size[0] * target), int(window_size[1] * where))
+        offset_x, offset_y = widget.get("offset", (0, 0))
+        setattr(rect, widget["point"], (anchor[0] + offset_x, anchor[1] + offset_y))
+        return rect
+
+    @staticmethod
+    def _length(length, window_length):
+        if isinstance(length, float):
+            return int(window_length * length)
+        if length < 0:
+            return window_length + length
+        return length
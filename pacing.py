@@ -0,0 +1,34 @@
+import pygame
+
+# Frame pacing. While something is happening the loop runs at the frame cap; once a frame goes by with
+# no input and nothing redrawn, the next frame blocks in pygame.event.wait() until an event arrives or
+# the next timer (like the cursor blink) is due, so an idle window costs next to nothing.
+
+FRAME_CAP = 60
+MAX_IDLE_WAIT = 1000  # Milliseconds; wake up at least this often even with nothing scheduled
+
+mode = "idle"  # "idle" or "fixed" (always run at the cap, like before)
+frame_cap = FRAME_CAP
+busy_loop = False  # tick_busy_loop is more accurate but spins the CPU while it waits
+
+_quiet = False  # Last frame had no input and drew nothing
+
+
+def idle():
+    return mode == "idle" and _quiet
+
+
+def end_frame(clock, active):
+    # active: the frame handled input or redrew something. Returns the milliseconds since the last tick.
+    global _quiet
+    _quiet = not active
+    if busy_loop:
+        return clock.tick_busy_loop(frame_cap)
+    return clock.tick(frame_cap)
+
+
+def wait_timeout(next_timer=None):
+    # How long an idle frame may block, in milliseconds; next_timer is when something is due, if anything
+    if next_timer is None:
+        return MAX_IDLE_WAIT
+    return max(1, min(MAX_IDLE_WAIT, next_timer - pygame.time.get_ticks()))
@@ -0,0 +1,59 @@
+import copy
+import json
+import os
+import threading
+import time
+
+SAVE_PATH = "player_datas.json"
+SAVE_INTERVAL = 0.5  # Seconds to wait so a burst of updates ends up as a single write
+
+_pending = None  # (latest snapshot, how to write it) that still has to be written
+_pending_lock = threading.Lock()
+_write_lock = threading.Lock()  # Only one writer touches the file at a time
+_wake = threading.Event()
+_thread = None
+
+
+def write_atomic(path, data):
+    # Write to a temp file and swap it in, so a crash never leaves a half written save
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as file:
+        json.dump(data, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+
+def save(data, write=None):
+    # Queue a copy of the data for the background writer and return right away. The writer calls
+    # write(data), or writes the JSON save file if there is none (the sqlite profile store passes its own).
+    global _pending, _thread
+    with _pending_lock:
+        _pending = (copy.deepcopy(data), write)
+    if _thread is None or not _thread.is_alive():
+        _thread = threading.Thread(target=_writer, name="save-writer", daemon=True)
+        _thread.start()
+    _wake.set()
+
+
+def flush():
+    # Write whatever is still pending right now, on the calling thread
+    global _pending
+    with _write_lock:
+        with _pending_lock:
+            pending, _pending = _pending, None
+        if pending is None:
+            return
+        data, write = pending
+        if write is not None:
+            write(data)
+        else:
+            write_atomic(SAVE_PATH, data)
+
+
+def _writer():
+    while True:
+        _wake.wait()
+        time.sleep(SAVE_INTERVAL)  # Let more updates pile up before writing
+        _wake.clear()
+        flush()
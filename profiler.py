@@ -0,0 +1,123 @@
+import collections
+import csv
+import json
+import time
+
+# Per-frame timing of the main loop. Each frame is split into named phases (start/stop pairs around
+# the interesting code); phases may nest, e.g. text rendering also counts inside the achievements
+# list build. Rolling percentiles are kept per screen, and every frame can be kept for a trace export.
+
+PHASES = ["events", "background", "sprites", "text", "achievements_list", "save", "present"]
+LATENCIES = ["input_latency"]  # Recorded only on some frames, and only those frames count for them
+ROLLING_FRAMES = 300  # Frames per screen the percentiles are computed over
+OVERLAY_REFRESH = 0.5  # Seconds between overlay text updates, so the overlay itself doesn't dirty every frame
+
+overlay_enabled = False
+tracing = False
+
+_frame_start = 0.0
+_phase_starts = {}  # phase -> perf_counter at start
+_phase_times = {}  # phase -> seconds spent in it this frame
+_history = {}  # screen -> deque of {"frame": seconds, phase: seconds...}
+_trace = []  # Every frame while tracing
+_overlay_lines = []
+_overlay_screen = None
+_overlay_updated = 0.0
+
+
+def begin_frame():
+    global _frame_start
+    _phase_times.clear()
+    _frame_start = time.perf_counter()
+
+
+def start(phase):
+    _phase_starts[phase] = time.perf_counter()
+
+
+def stop(phase):
+    started = _phase_starts.pop(phase, None)
+    if started is not None:
+        _phase_times[phase] = _phase_times.get(phase, 0.0) + time.perf_counter() - started
+
+
+def record(name, seconds):
+    # A measurement taken outside of start/stop, for this frame
+    _phase_times[name] = seconds
+
+
+def end_frame(screen_name):
+    frame = dict(_phase_times)
+    frame["frame"] = time.perf_counter() - _frame_start
+    history = _history.get(screen_name)
+    if history is None:
+        history = _history[screen_name] = collections.deque(maxlen=ROLLING_FRAMES)
+    history.append(frame)
+    if tracing:
+        _trace.append((screen_name, _frame_start, frame))
+
+
+def percentiles(screen_name, phase="frame"):
+    # (p50, p95, p99) in seconds over the recent frames of a screen
+    if phase in LATENCIES:
+        samples = sorted(frame[phase] for frame in _history.get(screen_name, ()) if phase in frame)
+    else:
+        samples = sorted(frame.get(phase, 0.0) for frame in _history.get(screen_name, ()))
+    if not samples:
+        return (0.0, 0.0, 0.0)
+    last = len(samples) - 1
+    return tuple(samples[min(last, int(round(last * fraction)))] for fraction in (0.50, 0.95, 0.99))
+
+
+def overlay_lines(screen_name, fps):
+    # Rows of cells for the overlay; only recomputed every OVERLAY_REFRESH seconds or when the screen changes
+    global _overlay_lines, _overlay_screen, _overlay_updated
+    now = time.perf_counter()
+    if now - _overlay_updated >= OVERLAY_REFRESH or screen_name != _overlay_screen:
+        _overlay_updated = now
+        _overlay_screen = screen_name
+        lines = [(f"{screen_name} {fps:.0f} FPS", "p50", "p95", "p99")]
+        for phase in ["frame"] + PHASES + LATENCIES:
+            lines.append((phase,) + tuple(f"{value * 1000:.2f}" for value in percentiles(screen_name, phase)))
+        _overlay_lines = lines
+    return _overlay_lines
+
+
+def trace_summary():
+    # screen -> frames, mean, p50, p95, p99 and max frame time in seconds over the whole trace
+    frame_times = {}
+    for screen_name, started, frame in _trace:
+        frame_times.setdefault(screen_name, []).append(frame["frame"])
+    summary = {}
+    for screen_name, times in frame_times.items():
+        times.sort()
+        last = len(times) - 1
+        summary[screen_name] = {"frames": len(times), "mean": sum(times) / len(times), "max": times[-1],
+                                **{name: times[min(last, int(round(last * fraction)))] for name, fraction in [("p50", 0.50), ("p95", 0.95), ("p99", 0.99)]}}
+    return summary
+
+
+def _milliseconds(frame, column):
+    # None for a latency the frame didn't record
+    if column in LATENCIES and column not in frame:
+        return None
+    return frame.get(column, 0.0) * 1000
+
+
+def export_trace(path):
+    # CSV if the path ends in .csv, JSON otherwise
+    columns = ["frame"] + PHASES + LATENCIES
+    if path.endswith(".csv"):
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["screen", "time"] + [column + "_ms" for column in columns])
+            for screen_name, started, frame in _trace:
+                writer.writerow([screen_name, f"{started:.6f}"] + ["" if _milliseconds(frame, column) is None else f"{_milliseconds(frame, column):.3f}" for column in columns])
+    else:
+        summary = {}
+        for screen_name in _history:
+            summary[screen_name] = {column: [value * 1000 for value in percentiles(screen_name, column)] for column in columns}
+        frames = [{"screen": screen_name, "time": started, **{column + "_ms": _milliseconds(frame, column) for column in columns}}
+                  for screen_name, started, frame in _trace]
+        with open(path, "w") as file:
+            json.dump({"percentiles_ms": summary, "frames": frames}, file)
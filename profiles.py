@@ -0,0 +1,212 @@
+import argparse
+import json
+import os
+import sqlite3
+
+import engine
+
+# Shared-cabinet player store: one row per player, one row per unlocked achievement and one row per
+# statistics number (see stats.py). Saves only write the columns and rows that changed instead of
+# rewriting a whole document, and high scores are indexed so the leaderboard is a single index scan no
+# matter how many profiles there are.
+
+DB_PATH = "players.db"
+DEFAULT_PROFILE = "Player 1"  # Name the old player_datas.json gets imported under
+SCHEMA_VERSION = 3  # PRAGMA user_version; 2 added the stats column, 3 moved the stats into their own table
+
+COUNTER_COLUMNS = ["high_score", "correct_consecutive_guesses", "total_correct_guesses", "incorrect_guesses", "caspers_sprite_taps"]
+EQUIPPED_COLUMNS = {"background": "equipped_background", "sprite": "equipped_sprite"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    high_score INTEGER NOT NULL DEFAULT 0,
+    correct_consecutive_guesses INTEGER NOT NULL DEFAULT 0,
+    total_correct_guesses INTEGER NOT NULL DEFAULT 0,
+    incorrect_guesses INTEGER NOT NULL DEFAULT 0,
+    caspers_sprite_taps INTEGER NOT NULL DEFAULT 0,
+    equipped_background TEXT,
+    equipped_sprite TEXT
+);
+CREATE INDEX IF NOT EXISTS players_by_high_score ON players (high_score DESC, id);
+CREATE TABLE IF NOT EXISTS unlocks (
+    player_id INTEGER NOT NULL REFERENCES players (id) ON DELETE CASCADE,
+    achievement TEXT NOT NULL,
+    PRIMARY KEY (player_id, achievement)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS stats (
+    player_id INTEGER NOT NULL REFERENCES players (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    position INTEGER NOT NULL,  -- Index into a list, -1 for a single number
+    value INTEGER NOT NULL,
+    PRIMARY KEY (player_id, name, position)
+) WITHOUT ROWID;
+"""
+
+
+def stats_cells(stats):
+    # The statistics state as (name, position) -> number, the rows of the stats table
+    cells = {}
+    for name, value in stats.items():
+        if isinstance(value, list):
+            cells.update(((name, position), item) for position, item in enumerate(value))
+        else:
+            cells[(name, -1)] = value
+    return cells
+
+
+def stats_from_rows(rows):
+    # Back from (name, position, value) rows to the statistics state
+    stats = {}
+    for name, position, value in sorted(rows):
+        if position < 0:
+            stats[name] = value
+        else:
+            stats.setdefault(name, []).append(value)
+    return stats
+
+
+class ProfileStore:
+    def __init__(self, path=DB_PATH, legacy_json=None):
+        # One thread at a time, but not always the one that opened it: the game loads on its main thread
+        # and saves from persistence's background writer
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode = WAL")  # Commits append to the log instead of rewriting pages
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.executescript(SCHEMA)
+        self._ids = {}  # profile name -> player id
+        self._saved = {}  # player id -> what the database holds for that player right now
+
+        # Import the single-player JSON save the first time the store is opened
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version == 0:
+            if legacy_json is not None and os.path.exists(legacy_json):
+                self.migrate_json(legacy_json, DEFAULT_PROFILE)
+        elif version == 2:
+            self.migrate_stats_column()
+        if version < SCHEMA_VERSION:
+            self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def player_id(self, name):
+        player_id = self._ids.get(name)
+        if player_id is None:
+            self.connection.execute("INSERT OR IGNORE INTO players (name) VALUES (?)", (name,))
+            self.connection.commit()
+            player_id = self.connection.execute("SELECT id FROM players WHERE name = ?", (name,)).fetchone()[0]
+            self._ids[name] = player_id
+        return player_id
+
+    def names(self):
+        return [row[0] for row in self.connection.execute("SELECT name FROM players ORDER BY id")]
+
+    def load(self, name):
+        # Returns the profile in the same player_data shape the JSON save uses
+        player_id = self.player_id(name)
+        row = self.connection.execute(
+            f"SELECT {', '.join(COUNTER_COLUMNS)}, equipped_background, equipped_sprite FROM players WHERE id = ?",
+            (player_id,)).fetchone()
+        unlocked = {achievement for (achievement,) in self.connection.execute(
+            "SELECT achievement FROM unlocks WHERE player_id = ?", (player_id,))}
+
+        player_data = dict(zip(COUNTER_COLUMNS, row))
+        player_data["equipped"] = {slot: value for slot, value in zip(EQUIPPED_COLUMNS, row[len(COUNTER_COLUMNS):]) if value is not None}
+        stats_rows = self.connection.execute("SELECT name, position, value FROM stats WHERE player_id = ?", (player_id,)).fetchall()
+        if stats_rows:
+            player_data["stats"] = stats_from_rows(stats_rows)
+        player_data["achievements"] = {achievement["name"]: achievement["name"] in unlocked for achievement in engine.ACHIEVEMENTS}
+        self._saved[player_id] = self._snapshot(player_data)
+        return player_data
+
+    def save(self, name, player_data):
+        # Writes only what changed since the last load or save of this profile
+        if self._write(name, player_data):
+            self.connection.commit()
+
+    def save_many(self, profiles):
+        # Several profiles (name -> player_data) in a single transaction, e.g. a batch from the game server
+        changed = [self._write(name, player_data) for name, player_data in profiles.items()]
+        if any(changed):
+            self.connection.commit()
+
+    def _write(self, name, player_data):
+        # Returns whether anything had to be written; the caller commits
+        player_id = self.player_id(name)
+        if player_id not in self._saved:
+            self.load(name)
+        saved = self._saved[player_id]
+        current = self._snapshot(player_data)
+
+        changed = {column: current[column] for column in list(COUNTER_COLUMNS) + list(EQUIPPED_COLUMNS.values())
+                   if current[column] != saved[column]}
+        if changed:
+            assignments = ", ".join(f"{column} = ?" for column in changed)
+            self.connection.execute(f"UPDATE players SET {assignments} WHERE id = ?", (*changed.values(), player_id))
+
+        newly_unlocked = current["unlocked"] - saved["unlocked"]
+        relocked = saved["unlocked"] - current["unlocked"]  # Only happens on a reset
+        if newly_unlocked:
+            self.connection.executemany("INSERT OR IGNORE INTO unlocks (player_id, achievement) VALUES (?, ?)",
+                                        [(player_id, achievement) for achievement in newly_unlocked])
+        if relocked:
+            self.connection.executemany("DELETE FROM unlocks WHERE player_id = ? AND achievement = ?",
+                                        [(player_id, achievement) for achievement in relocked])
+
+        # A guess only changes a handful of the statistics numbers
+        changed_stats = [(player_id, name, position, value) for (name, position), value in current["stats"].items()
+                         if saved["stats"].get((name, position)) != value]
+        if changed_stats:
+            self.connection.executemany("INSERT OR REPLACE INTO stats (player_id, name, position, value) VALUES (?, ?, ?, ?)",
+                                        changed_stats)
+
+        self._saved[player_id] = current
+        return bool(changed or newly_unlocked or relocked or changed_stats)
+
+    def leaderboard(self, limit=10):
+        # Top players by high score, read straight off the high score index
+        return self.connection.execute(
+            "SELECT name, high_score FROM players ORDER BY high_score DESC, id LIMIT ?", (limit,)).fetchall()
+
+    def migrate_stats_column(self):
+        # Version 2 kept each player's statistics as one JSON document in players.stats. The column stays
+        # behind, emptied (dropping a column needs SQLite 3.35).
+        rows = self.connection.execute("SELECT id, stats FROM players WHERE stats IS NOT NULL").fetchall()
+        for player_id, stats_json in rows:
+            self.connection.executemany("INSERT OR REPLACE INTO stats (player_id, name, position, value) VALUES (?, ?, ?, ?)",
+                                        [(player_id, name, position, value) for (name, position), value in stats_cells(json.loads(stats_json)).items()])
+        self.connection.execute("UPDATE players SET stats = NULL")
+
+    def migrate_json(self, path, name):
+        player_data = engine.load_player_data(path)
+        self.save(name, player_data)
+
+    @staticmethod
+    def _snapshot(player_data):
+        snapshot = {column: player_data.get(column, 0) for column in COUNTER_COLUMNS}
+        equipped = player_data.get("equipped", {})
+        for slot, column in EQUIPPED_COLUMNS.items():
+            snapshot[column] = equipped.get(slot)
+        snapshot["stats"] = stats_cells(player_data.get("stats", {}))
+        snapshot["unlocked"] = {name for name, unlocked in player_data.get("achievements", {}).items() if unlocked}
+        return snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Casper player profiles")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--top", type=int, default=10, help="how many players to show on the leaderboard")
+    args = parser.parse_args()
+
+    store = ProfileStore(args.db)
+    for place, (name, high_score) in enumerate(store.leaderboard(args.top), start=1):
+        print(f"{place:>3}. {name:<20} {high_score}")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
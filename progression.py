@@ -0,0 +1,204 @@
+import argparse
+import time
+
+import numpy as np
+
+import engine
+
+# Monte Carlo analysis of how many guesses each achievement takes, for tuning the thresholds. It
+# plays millions of players at once with NumPy, using the same achievement list as the game.
+#
+# Casper draws every number independently, so whatever a guessing strategy does, each guess is right
+# with a fixed chance (the strategy's hit rate) and the outcomes are independent. That means the
+# counters don't have to be stepped guess by guess: a player's guesses are runs of correct guesses,
+# each ended by a wrong one, with geometrically distributed lengths. From there:
+#   - the n-th correct (or wrong) guess comes after a negative binomial number of the other kind
+#   - a streak of k needs a geometric number of runs shorter than k first, then a run of k, and the
+#     longer streaks carry on from the run that reached the shorter one
+#   - achievements that count other achievements unlock with the n-th of the ones they count
+# so even "The Impossible" (around 10^10 guesses at a 10% hit rate) costs the same as the rest.
+# The counters are sampled per player but separately from each other, so the achievements that count
+# other achievements ignore how the counters correlate; their times are dominated by the slowest one.
+
+NUMBERS = 10  # Casper picks 1-10, see CasperGame.generate_new_casper_number
+EXACT_RUNS = 32  # Up to this many failed runs are added up one by one, more are summed with the normal approximation
+CHUNK_PLAYERS = 65536  # Players per block when adding up runs one by one, keeps memory flat
+
+
+# Strategies: (Casper's number weights, player count, rng) -> each player's chance of a correct guess
+def random_guess(weights, players, rng):
+    return np.full(players, 1.0 / NUMBERS)
+
+
+def favorite_number(weights, players, rng):
+    # Always guess the number Casper picks most
+    return np.full(players, weights.max())
+
+
+def lucky_number(weights, players, rng):
+    # Every player picks a number of their own and sticks to it
+    return weights[rng.integers(0, NUMBERS, players)]
+
+
+def matching(weights, players, rng):
+    # Guess each number as often as Casper picks it
+    return np.full(players, float((weights ** 2).sum()))
+
+
+STRATEGIES = {
+    "random": random_guess,
+    "favorite": favorite_number,
+    "lucky_number": lucky_number,
+    "matching": matching,
+}
+
+
+def nth_event(n, chance, rng):
+    # Guesses until the n-th time something with this chance per guess happens (inf if it can't)
+    times = np.full(len(chance), np.inf)
+    possible = chance > 0
+    times[possible] = n + rng.negative_binomial(n, chance[possible])
+    return times
+
+
+def failed_runs_length(p, k, runs, rng):
+    # Guesses taken by the given number of runs that broke before reaching k (each run plus its wrong guess)
+    total = runs.astype(float)
+    reach = p ** k
+
+    # Few runs: draw every run's length. A run cut short of k has P(length <= j) = (1 - p^(j+1)) / (1 - p^k).
+    few = np.flatnonzero((runs > 0) & (runs <= EXACT_RUNS))
+    for start in range(0, len(few), CHUNK_PLAYERS):
+        players = few[start:start + CHUNK_PLAYERS]
+        player_p = p[players, None]
+        uniform = rng.random((len(players), EXACT_RUNS))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            lengths = np.ceil(np.log1p(-uniform * (1 - reach[players, None])) / np.log(player_p)) - 1
+        lengths = np.clip(np.nan_to_num(lengths), 0, k - 1)
+        used = np.arange(EXACT_RUNS) < runs[players, None]
+        total[players] += (lengths * used).sum(axis=1)
+
+    # Many runs: their lengths add up to a normal with the truncated geometric's mean and variance
+    many = runs > EXACT_RUNS
+    if many.any():
+        lengths = np.arange(k)
+        weights = p[many, None] ** lengths * (1 - p[many, None]) / (1 - reach[many, None])
+        mean = (weights * lengths).sum(axis=1)
+        variance = (weights * lengths ** 2).sum(axis=1) - mean ** 2
+        count = runs[many].astype(float)
+        total[many] += np.maximum(0.0, np.round(rng.normal(count * mean, np.sqrt(count * np.maximum(variance, 0.0)))))
+    return total
+
+
+def first_streak(p, k, rng):
+    # Guesses until the first streak of k, starting right after a wrong guess
+    reach = p ** k
+    possible = reach > 1e-300
+    runs = np.zeros(len(p), dtype=np.int64)
+    runs[possible] = rng.geometric(reach[possible]) - 1  # Runs that break before k, then the one that makes it
+    times = failed_runs_length(p, k, runs, rng) + k
+    return np.where(possible, times, np.inf)
+
+
+def streak_times(p, thresholds, rng):
+    # threshold -> guesses until the first streak that long, all from the same run of guesses
+    times = {}
+    reached, previous = None, None
+    for k in sorted(set(thresholds)):
+        if reached is None:
+            times[k] = first_streak(p, k, rng)
+        else:
+            # The run that reached the shorter streak keeps going, one more correct guess at a time
+            with np.errstate(divide="ignore"):
+                extra = rng.geometric(np.clip(1 - p, 1e-300, 1.0)) - 1
+            carries_on = (extra >= k - previous) | (p >= 1)
+            restart = reached + extra + 1 + first_streak(p, k, rng)
+            times[k] = np.where(carries_on, reached + (k - previous), restart)
+        reached, previous = times[k], k
+    return times
+
+
+def analyze(players, strategy="random", weights=None, tap_rate=0.1, seed=0, achievements=engine.ACHIEVEMENTS):
+    # achievement name -> guesses each player needed to unlock it (inf if they never would)
+    rng = np.random.default_rng(seed)
+    weights = np.ones(NUMBERS) if weights is None else np.asarray(weights, dtype=float)
+    weights = weights / weights.sum()
+    p = STRATEGIES[strategy](weights, players, rng)
+
+    streaks = streak_times(p, [achievement["threshold"] for achievement in achievements
+                               if achievement["counter"] == "correct_consecutive_guesses"], rng)
+    counters = {
+        "total_correct_guesses": lambda threshold: nth_event(threshold, p, rng),
+        "incorrect_guesses": lambda threshold: nth_event(threshold, 1 - p, rng),
+        "caspers_sprite_taps": lambda threshold: nth_event(threshold, np.full(players, tap_rate), rng),
+        "correct_consecutive_guesses": lambda threshold: streaks[threshold],
+    }
+    unlocks = {}
+    for achievement in achievements:
+        if achievement["counter"] in counters:
+            unlocks[achievement["name"]] = counters[achievement["counter"]](achievement["threshold"])
+
+    # Then the ones that count other achievements, which can count each other, until nothing changes
+    counted = {
+        "backgrounds_collected": lambda other: engine.REWARDS.get(other["reward"], {}).get("slot") == "background",
+        "achievements_unlocked": lambda other: True,
+    }
+    derived = [achievement for achievement in achievements if achievement["counter"] in counted]
+    for achievement in derived:
+        unlocks[achievement["name"]] = np.full(players, np.inf)
+    for _ in range(len(derived) + 1):
+        for achievement in derived:
+            others = [unlocks[other["name"]] for other in achievements
+                      if other is not achievement and counted[achievement["counter"]](other)]
+            if len(others) < achievement["threshold"]:
+                continue
+            unlocks[achievement["name"]] = np.sort(np.stack(others, axis=1), axis=1)[:, achievement["threshold"] - 1]
+    return p, unlocks
+
+
+def summarize(times, budget):
+    summary = {name: float(np.quantile(times, quantile, method="inverted_cdf"))  # No interpolating, times can be inf
+               for name, quantile in [("p10", 0.1), ("p50", 0.5), ("p90", 0.9), ("p99", 0.99)]}
+    summary["mean"] = float(times.mean())
+    summary["within_budget"] = float((times <= budget).mean())
+    return summary
+
+
+def guesses(value):
+    if value == float("inf"):
+        return "never"
+    if value >= 1e7:
+        return f"{value:.2e}"
+    return f"{value:,.0f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate how many guesses Casper's achievements take")
+    parser.add_argument("--players", type=int, default=1_000_000)
+    parser.add_argument("--strategy", choices=list(STRATEGIES), default="random")
+    parser.add_argument("--weights", help="how often Casper picks 1-10, comma separated (default: evenly, like the game)")
+    parser.add_argument("--tap-rate", type=float, default=0.1, help="taps on Casper per guess")
+    parser.add_argument("--budget", type=int, default=1000, help="also show the share of players done within this many guesses")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    weights = [float(weight) for weight in args.weights.split(",")] if args.weights else None
+    if weights is not None and len(weights) != NUMBERS:
+        parser.error(f"--weights needs {NUMBERS} numbers")
+
+    started = time.perf_counter()
+    p, unlocks = analyze(args.players, args.strategy, weights, args.tap_rate, args.seed)
+    seconds = time.perf_counter() - started
+
+    print(f"{args.players:,} players, strategy {args.strategy} (hit rate {p.mean():.1%}), "
+          f"{args.tap_rate} taps per guess, {seconds:.2f}s")
+    print(f"{'Achievement':<26}{'Counter':<30}{'At':>4}{'mean':>12}{'p10':>12}{'p50':>12}{'p90':>12}{'p99':>12}{f'<= {args.budget}':>10}")
+    for achievement in engine.ACHIEVEMENTS:
+        summary = summarize(unlocks[achievement["name"]], args.budget)
+        print(f"{achievement['name']:<26}{achievement['counter']:<30}{achievement['threshold']:>4}"
+              + "".join(f"{guesses(summary[name]):>12}" for name in ["mean", "p10", "p50", "p90", "p99"])
+              + f"{summary['within_budget']:>10.1%}")
+
+
+if __name__ == "__main__":
+    main()
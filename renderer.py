@@ -0,0 +1,196 @@
+import pygame
+
+import assets
+
+# Retained-mode bookkeeping for the main loop. Every frame each screen declares its widgets
+# (name, rect and whatever state changes how it looks); only widgets that moved or changed
+# are redrawn and pushed to the display, and a frame where nothing changed is not presented at all.
+#
+# Two backends put the frame on screen:
+#   surface  - everything is blitted onto the display surface and flipped (or updated by dirty rects)
+#   texture  - an SDL renderer (pygame._sdl2.video). The big pictures (backgrounds, Casper, the speech
+#              bubble) are uploaded once at full size as textures and scaled while drawing, as layers
+#              under the screen surface. The screen surface itself has alpha, and only its dirty
+#              rects get uploaded, into one texture drawn over the layers. Works with SDL's software
+#              renderer as well (software=True, or SDL_RENDER_DRIVER=software).
+
+_screen_name = None  # Screen the widgets below belong to
+_widgets = {}  # widget name -> (rect, state) as last drawn
+_declared = set()  # Widgets declared this frame
+_dirty = []  # Rects that have to be redrawn and presented this frame
+_full_redraw = True
+_drawing = False  # begin_draw said yes and present hasn't run yet
+
+backend = "surface"
+_window = None  # Texture backend: the window, its renderer and the texture the screen surface goes into
+_renderer = None
+_screen_texture = None
+MAX_TEXTURE_SIDE = 1024  # Bigger images are scaled down to this before they become textures
+
+_textures = {}  # (image file, alpha) -> texture of the image at full size, or MAX_TEXTURE_SIDE at most
+_layers = []  # (texture or color, rect, opacity) to draw under the screen surface, declared while drawing
+
+
+def open_window(size, title, vsync=False, texture=False, software=False):
+    # Returns the surface the screens draw on. The texture backend falls back to the surface one if
+    # pygame or the video driver can't make an SDL renderer.
+    global backend, _window, _renderer
+    if texture:
+        try:
+            from pygame._sdl2 import video
+            # A hidden window from the display module, only so convert() has a display format to go by;
+            # a window can't have both a display surface and a renderer
+            pygame.display.set_mode((1, 1), pygame.HIDDEN)
+            _window = video.Window(title, size, resizable=True)
+            _renderer = video.Renderer(_window, accelerated=0 if software else -1, vsync=vsync)
+            backend = "texture"
+            return set_mode(size)
+        except (ImportError, pygame.error) as error:
+            print(f"No texture renderer ({error}), drawing with surfaces")
+            _window = _renderer = None
+    backend = "surface"
+    surface = set_mode(size, vsync)
+    pygame.display.set_caption(title)
+    return surface
+
+
+def resident_bytes():
+    # Textures are 4 bytes a pixel whatever the surface was
+    return sum(texture.width * texture.height * 4 for texture in list(_textures.values()) + [_screen_texture] if texture is not None)
+
+
+def set_mode(size, vsync=False):
+    # A new surface to draw on at this window size (after a resize)
+    global _screen_texture
+    invalidate()
+    if backend == "surface":
+        return pygame.display.set_mode(size, pygame.RESIZABLE, vsync=vsync)
+    from pygame._sdl2 import video
+    if tuple(_window.size) != tuple(size):
+        _window.size = size
+    _screen_texture = video.Texture(_renderer, size, streaming=True)
+    _screen_texture.blend_mode = pygame.BLENDMODE_BLEND
+    return pygame.Surface(size, pygame.SRCALPHA)
+
+
+def textures():
+    # Whether the big pictures go in layers (see layer) instead of being blitted onto the screen surface
+    return backend == "texture"
+
+
+def layer(rect, image=None, color=None, alpha=True, opacity=1.0):
+    # Texture backend, while drawing: the image file (or a color) under the screen surface, scaled to rect.
+    # Layers are drawn in the order they are declared, and the screen surface has to be clear over them.
+    if image is not None:
+        key = (image, alpha)
+        if key not in _textures:
+            from pygame._sdl2 import video
+            source = assets.load_image(image, alpha)
+            if max(source.get_size()) > MAX_TEXTURE_SIDE:
+                # Some rewards are 4096 pixels square, never drawn anywhere near that big
+                scale = MAX_TEXTURE_SIDE / max(source.get_size())
+                source = assets.get_scaled(image, (round(source.get_width() * scale), round(source.get_height() * scale)), alpha)
+            _textures[key] = video.Texture.from_surface(_renderer, source)
+        _layers.append((_textures[key], pygame.Rect(rect), opacity))
+    else:
+        _layers.append((color, pygame.Rect(rect), opacity))
+
+
+def invalidate():
+    # Redraw and present the whole window on the next frame (resize, new display surface...)
+    global _full_redraw
+    _full_redraw = True
+
+
+def begin_frame(screen_name):
+    global _screen_name
+    if screen_name != _screen_name:
+        _screen_name = screen_name
+        _widgets.clear()
+        invalidate()
+    _declared.clear()
+
+
+def widget(name, rect, state=None):
+    rect = pygame.Rect(rect)
+    _declared.add(name)
+    previous = _widgets.get(name)
+    if previous is not None and previous[0] == rect and previous[1] == state:
+        return
+    if previous is not None:
+        _dirty.append(previous[0])  # Repaint where it used to be as well
+    _dirty.append(rect)
+    _widgets[name] = (rect, state)
+
+
+def begin_draw(surface):
+    # Returns False when nothing needs drawing; otherwise clips drawing to the dirty area
+    global _drawing
+    for name in [name for name in _widgets if name not in _declared]:
+        _dirty.append(_widgets.pop(name)[0])  # Widget went away, repaint what was under it
+
+    if _full_redraw:
+        surface.set_clip(None)
+        _drawing = True
+    elif _dirty:
+        surface.set_clip(_dirty[0].unionall(_dirty[1:]))
+        _drawing = True
+    else:
+        _drawing = False
+    if _drawing:
+        _layers.clear()  # The screen declares them again as it draws
+    return _drawing
+
+
+def drawing():
+    # Whether this frame is being drawn, for things layered on top of the screen
+    return _drawing
+
+
+def present(surface):
+    global _full_redraw, _drawing
+    surface.set_clip(None)
+    if _full_redraw:
+        _show(surface, None)
+    elif _dirty:
+        _show(surface, _dirty)
+    _full_redraw = False
+    _drawing = False
+    _dirty.clear()
+
+
+def show(surface):
+    # All of surface on screen right away, outside the frame bookkeeping (e.g. a loading message)
+    _show(surface, None)
+
+
+def _show(surface, rects):
+    # rects: the parts of surface that changed, None for all of it
+    if backend == "surface":
+        if rects is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(rects)
+        return
+
+    if rects is None:
+        _screen_texture.update(surface)
+    else:
+        bounds = surface.get_rect()
+        for rect in rects:
+            rect = rect.clip(bounds)
+            if rect:
+                _screen_texture.update(surface.subsurface(rect), rect)
+    # The renderer redraws the whole frame; that's cheap for it, the upload above was the expensive part
+    _renderer.draw_color = (255, 255, 255, 255)
+    _renderer.clear()
+    for picture, rect, opacity in _layers:
+        if isinstance(picture, tuple):
+            _renderer.draw_color = picture[:3] + (round(255 * opacity),)
+            _renderer.draw_blend_mode = pygame.BLENDMODE_BLEND
+            _renderer.fill_rect(rect)
+        else:
+            picture.alpha = round(255 * opacity)  # The same texture can be in several layers
+            picture.draw(dstrect=rect)
+    _screen_texture.draw()
+    _renderer.present()
@@ -0,0 +1,196 @@
+import json
+import struct
+import time
+import zlib
+
+import pygame
+
+import profiler
+
+# Recording a session and playing it back. The game's only randomness is Casper's number, which comes
+# from the game's rng, so a session is fully described by the rng seed, the player data it started
+# from and the input the main loop consumed. The recorder writes those to a file as the game runs and
+# the replayer feeds the same events back to the same pumps, which makes a played session a repeatable
+# performance workload (or a way to reproduce a progression bug).
+#
+# The file is MAGIC, the zlib-compressed JSON header (seed, player data) with its length in front,
+# then one record per event: frame number, seconds since the first frame, event kind and a small
+# kind-specific payload. A session that ended in a crash may leave a torn last record; it is ignored.
+#
+# Replays run either in real time (an event comes back once as much time has passed as when it was
+# recorded) or as fast as possible (an event comes back on the frame it was recorded on). A resize only
+# gets laid out once the window has settled for a while, so the recording also marks the frame that
+# happened on, and a replay lays it out on that frame instead of going by its own clock; otherwise a
+# click right after a resize could hit the old layout in one and the new one in the other.
+
+MAGIC = b"CASPREC1"
+HEADER_LENGTH = struct.Struct("<I")
+RECORD = struct.Struct("<IfB")  # frame, seconds, kind
+RESIZE_APPLIED = pygame.event.custom_type()  # Fed back where the recorded session laid out a resize
+
+# kind -> (event type, payload); the payload is packed and unpacked by encode_event and decode_event
+KINDS = {
+    0: (pygame.QUIT, None),
+    1: (pygame.MOUSEBUTTONDOWN, struct.Struct("<hhB")),  # x, y, button
+    2: (pygame.MOUSEMOTION, struct.Struct("<hhhhB")),  # x, y, relative x, relative y, buttons held as bits
+    3: (pygame.KEYDOWN, struct.Struct("<iHB")),  # key, modifiers, length of the UTF-8 text after it
+    4: (pygame.VIDEORESIZE, struct.Struct("<HH")),  # width, height
+    5: (pygame.WINDOWSIZECHANGED, struct.Struct("<HH")),  # width, height (texture backend)
+    6: (pygame.WINDOWCLOSE, None),
+    7: (RESIZE_APPLIED, None),
+}
+KIND_OF_TYPE = {event_type: kind for kind, (event_type, payload) in KINDS.items()}
+PASSED_THROUGH = {pygame.QUIT, pygame.WINDOWCLOSE, pygame.VIDEOEXPOSE}  # Real events a replay still takes, so it can be closed
+
+_file = None  # Recording into this
+_records = None  # Replaying these, (frame, seconds, event), in order
+_next_record = 0
+_realtime = False
+_frame = 0
+_started = None  # perf_counter at the first frame
+_last_capture = 0.0  # Seconds at the last frame recorded
+
+
+def recording():
+    return _file is not None
+
+
+def replaying():
+    return _records is not None
+
+
+def start_recording(path, seed, player_data):
+    global _file, _frame, _started
+    header = zlib.compress(json.dumps({"seed": seed, "player_data": player_data}).encode())
+    _file = open(path, "wb")
+    _file.write(MAGIC + HEADER_LENGTH.pack(len(header)) + header)
+    _frame, _started = 0, None
+
+
+def encode_event(event):
+    # (kind, payload bytes) of an event, or None for events that aren't recorded
+    kind = KIND_OF_TYPE.get(event.type)
+    if kind is None:
+        return None
+    if event.type == pygame.MOUSEBUTTONDOWN:
+        payload = KINDS[kind][1].pack(event.pos[0], event.pos[1], event.button)
+    elif event.type == pygame.MOUSEMOTION:
+        if not any(event.buttons):
+            return None  # Plain pointer movement, nothing reads it
+        buttons = sum(1 << number for number, held in enumerate(event.buttons) if held)
+        payload = KINDS[kind][1].pack(event.pos[0], event.pos[1], event.rel[0], event.rel[1], buttons)
+    elif event.type == pygame.KEYDOWN:
+        text = event.unicode.encode()[:255]
+        payload = KINDS[kind][1].pack(event.key, event.mod, len(text)) + text
+    elif event.type == pygame.VIDEORESIZE:
+        payload = KINDS[kind][1].pack(event.w, event.h)
+    elif event.type == pygame.WINDOWSIZECHANGED:
+        payload = KINDS[kind][1].pack(event.x, event.y)
+    else:
+        payload = b""
+    return kind, payload
+
+
+def decode_event(kind, data, offset):
+    # (event, offset after it) from the payload at offset; raises struct.error if the data runs out
+    event_type, payload = KINDS[kind]
+    if payload is None:
+        return pygame.event.Event(event_type), offset
+    fields = payload.unpack_from(data, offset)
+    offset += payload.size
+    if event_type == pygame.MOUSEBUTTONDOWN:
+        return pygame.event.Event(event_type, pos=fields[:2], button=fields[2]), offset
+    if event_type == pygame.MOUSEMOTION:
+        buttons = tuple(int(bool(fields[4] & 1 << number)) for number in range(3))
+        return pygame.event.Event(event_type, pos=fields[:2], rel=fields[2:4], buttons=buttons), offset
+    if event_type == pygame.KEYDOWN:
+        if offset + fields[2] > len(data):
+            raise struct.error("text cut off")
+        text = data[offset:offset + fields[2]].decode(errors="replace")
+        return pygame.event.Event(event_type, key=fields[0], mod=fields[1], unicode=text, scancode=0), offset + fields[2]
+    if event_type == pygame.VIDEORESIZE:
+        return pygame.event.Event(event_type, size=fields, w=fields[0], h=fields[1]), offset
+    return pygame.event.Event(event_type, x=fields[0], y=fields[1]), offset
+
+
+def capture(pending):
+    # Once per frame with what the pump got
+    global _frame, _started, _last_capture
+    now = time.perf_counter()
+    if _started is None:
+        _started = now
+    _last_capture = now - _started
+    for event in pending:
+        encoded = encode_event(event)
+        if encoded is not None:
+            _file.write(RECORD.pack(_frame, _last_capture, encoded[0]) + encoded[1])
+    _frame += 1
+
+
+def resize_applied():
+    # The loop just laid out a resize, after this frame's events
+    if _file is not None:
+        _file.write(RECORD.pack(_frame - 1, _last_capture, KIND_OF_TYPE[RESIZE_APPLIED]))
+
+
+def start_replay(path, realtime=False):
+    # Reads a recording and returns its header (seed, player_data); the events come back from feed()
+    global _records, _next_record, _realtime, _frame, _started
+    with open(path, "rb") as file:
+        data = file.read()
+    if not data.startswith(MAGIC):
+        raise ValueError(f"{path} isn't a Casper recording")
+    offset = len(MAGIC)
+    (length,) = HEADER_LENGTH.unpack_from(data, offset)
+    offset += HEADER_LENGTH.size
+    header = json.loads(zlib.decompress(data[offset:offset + length]))
+    offset += length
+    records = []
+    try:
+        while offset < len(data):
+            frame, seconds, kind = RECORD.unpack_from(data, offset)
+            event, offset = decode_event(kind, data, offset + RECORD.size)
+            records.append((frame, seconds, event))
+    except (struct.error, KeyError):
+        pass  # Torn last record
+    _records, _next_record, _realtime = records, 0, realtime
+    _frame, _started = 0, None
+    return header
+
+
+def feed(pending):
+    # Once per frame instead of the real events: the recorded ones that are due now
+    global _next_record, _frame, _started
+    now = time.perf_counter()
+    if _started is None:
+        _started = now
+    events = [event for event in pending if event.type in PASSED_THROUGH]
+    while _next_record < len(_records):
+        frame, seconds, event = _records[_next_record]
+        if (now - _started < seconds) if _realtime else (_frame < frame):
+            break
+        events.append(event)
+        _next_record += 1
+    _frame += 1
+    return events
+
+
+def finished():
+    # Every recorded event has been fed
+    return replaying() and _next_record >= len(_records)
+
+
+def print_report():
+    # Frame times of the replay, per screen and overall
+    seconds = time.perf_counter() - _started if _started is not None else 0.0
+    print(f"Replayed {len(_records)} events in {_frame} frames, {seconds:.2f}s ({_frame / max(seconds, 1e-9):.0f} frames/s)")
+    print(f"{'screen':<14}{'frames':>8}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  ms")
+    for screen_name, summary in profiler.trace_summary().items():
+        print(f"{screen_name:<14}{summary['frames']:>8}" + "".join(f"{summary[name] * 1000:>9.2f}" for name in ["mean", "p50", "p95", "p99", "max"]))
+
+
+def close():
+    global _file
+    if _file is not None:
+        _file.close()
+        _file = None
@@ -0,0 +1,193 @@
+import pygame
+
+import assets
+import engine
+import fonts
+import layout
+
+# Drawing the gameplay and achievements screens, without any of the game's state: casper.py passes in
+# what to show, and benchmark.py times these same functions. Positions come from the layout (see
+# make_layout), as a dict of name -> rect for the window size.
+
+BLACK = (0, 0, 0)
+WHITE = (255, 255, 255)
+GRAY = (200, 200, 200)
+DARK_GRAY = (150, 150, 150)
+TEXT_COLOR = (0, 0, 0)
+BACKGROUND_COLOR = (255, 255, 255)
+
+CASPER_SPRITE_SIZE = (600, 600)  # Resizing sprites
+SPEECH_BUBBLE_SIZE = (450, 225)  # Resize to make it bigger
+REWARD_SPRITE_SIZE = (60, 60)
+PADLOCK_SIZE = (30, 30)
+BUTTON_SIZE = (250, 60)  # Menu buttons
+BUTTON_SPACING = 20
+SUBMIT_BUTTON_SIZE = (200, 50)
+ACHIEVEMENT_ROWS_TOP = 100
+ACHIEVEMENT_ROW_HEIGHT = 80
+
+
+def title_font():
+    return fonts.get_font(60)
+
+
+def button_font():
+    return fonts.get_font(40)
+
+
+def small_font():
+    return fonts.get_font(30)  # Smaller font for submit button
+
+
+def make_layout():
+    # Where everything goes, for any window size (see layout.py). The row_ entries are the columns of an
+    # achievements list row, with the row's top at y = 0.
+    title_size = fonts.render(title_font(), "Casper The CPU", BLACK).get_size()
+    return layout.Layout([
+        {"name": "title", "size": title_size, "point": "center", "at": (0.5, 0.15)},
+        {"name": "start_button", "size": BUTTON_SIZE, "point": "midtop", "at": ("title", "midbottom"), "offset": (0, 50), "shrink": True},
+        {"name": "achievements_button", "size": BUTTON_SIZE, "point": "midtop", "at": ("start_button", "midbottom"), "offset": (0, BUTTON_SPACING), "shrink": True},
+        {"name": "statistics_button", "size": BUTTON_SIZE, "point": "midtop", "at": ("achievements_button", "midbottom"), "offset": (0, BUTTON_SPACING), "shrink": True},
+        {"name": "settings_button", "size": BUTTON_SIZE, "point": "midtop", "at": ("statistics_button", "midbottom"), "offset": (0, BUTTON_SPACING), "shrink": True},
+        {"name": "exit_button", "size": BUTTON_SIZE, "point": "midtop", "at": ("settings_button", "midbottom"), "offset": (0, BUTTON_SPACING), "shrink": True},
+        {"name": "score", "size": (200, 50), "point": "topleft", "at": (0.0, 0.0)},
+        {"name": "high_score", "size": (200, 50), "point": "topleft", "at": ("score", "bottomleft")},
+        {"name": "feedback", "size": (1.0, 30), "point": "bottomleft", "at": (0.0, 1.0)},
+        {"name": "casper_sprite", "size": CASPER_SPRITE_SIZE, "point": "center", "at": (0.25, 0.5), "shrink": True},
+        {"name": "speech_bubble", "size": SPEECH_BUBBLE_SIZE, "point": "center", "at": ("casper_sprite", "topright"), "offset": (100, 50), "shrink": True},
+        {"name": "input_box", "size": (200, 50), "point": "topleft", "at": (1.0, 0.5), "offset": (-280, -30)},
+        {"name": "submit_button", "size": SUBMIT_BUTTON_SIZE, "point": "topleft", "at": (1.0, 0.5), "offset": (-280, 30)},
+        {"name": "main_menu_button", "size": (200, 50), "point": "topleft", "at": (1.0, 0.0), "offset": (-220, 50)},
+        {"name": "reset_button", "size": (300, 60), "point": "center", "at": (0.5, 0.5)},
+        {"name": "confirmation", "size": (400, 200), "point": "center", "at": (0.5, 0.5)},
+        {"name": "confirm_button", "size": (100, 50), "point": "topleft", "at": ("confirmation", "bottomleft"), "offset": (40, -70)},
+        {"name": "cancel_button", "size": (100, 50), "point": "topleft", "at": ("confirmation", "bottomright"), "offset": (-140, -70)},
+        {"name": "guess_chart", "size": (0.28, 0.3), "point": "midtop", "at": (1 / 6, 0.2)},
+        {"name": "casper_chart", "size": (0.28, 0.3), "point": "midtop", "at": (0.5, 0.2)},
+        {"name": "streak_chart", "size": (0.28, 0.3), "point": "midtop", "at": (5 / 6, 0.2)},
+        {"name": "stats_text", "size": (0.9, 0.3), "point": "midtop", "at": (0.5, 0.6)},
+        {"name": "row_padlock", "size": PADLOCK_SIZE, "point": "topleft", "at": (0.0, 0.0), "offset": (20, 15)},
+        {"name": "row_box", "size": (-250, 60), "point": "topleft", "at": (0.0, 0.0), "offset": (60, 0)},
+        {"name": "row_equip", "size": (100, 60), "point": "topleft", "at": (1.0, 0.0), "offset": (-180, 0)},
+        {"name": "row_reward", "size": REWARD_SPRITE_SIZE, "point": "topleft", "at": (1.0, 0.0), "offset": (-70, 0)},
+    ])
+
+
+def bake_background(reward, size, image=None):
+    # The background as one surface for a single blit a frame: a byte a pixel for a color, the scaled
+    # image (already window sized) for an image, and a scrolling one twice as tall (see draw_background)
+    width, height = size
+    if reward is None or reward["kind"] != "image":
+        # One color, so one palette entry and a byte a pixel
+        surface = pygame.Surface(size, 0, 8)
+        surface.set_palette_at(0, reward["color"] if reward is not None else WHITE)  # Default to white background
+        surface.fill(0)
+        return surface
+    if "scroll" not in reward:
+        return image
+    # Two copies one above the other; each frame of the fall is a window sized slice of it
+    strip = pygame.Surface((width, 2 * height), 0, image)  # Same format, 8 bits if it came palettized from the asset pack
+    if image.get_bitsize() == 8:
+        strip.set_palette(image.get_palette())
+    strip.blit(image, (0, 0))
+    strip.blit(image, (0, height))
+    return strip
+
+
+def draw_background(screen, background, scroll=0):
+    # The baked background over the entire screen; scroll is how far a scrolling one has fallen
+    width, height = screen.get_size()
+    top = (height - scroll) % height if background.get_height() >= 2 * height else 0
+    screen.blit(background, (0, 0), pygame.Rect(0, top, width, height))
+
+
+def draw_button(screen, rect, label, font):
+    pygame.draw.rect(screen, GRAY, rect)
+    text = fonts.render(font, label, TEXT_COLOR)
+    screen.blit(text, text.get_rect(center=rect.center))
+
+
+def draw_gameplay_art(screen, rects, sprite, speech_bubble):
+    # What goes over the background: the text areas cleared, then Casper (sprite is the surface to
+    # show, a crossfade frame while he changes face) and the speech bubble
+    for name in ["feedback", "score", "high_score"]:
+        screen.fill(BACKGROUND_COLOR, rects[name])
+    screen.blit(sprite, rects["casper_sprite"])
+    screen.blit(speech_bubble, rects["speech_bubble"])
+
+
+def draw_gameplay_ui(screen, rects, score, high_score, guess_input, input_active, feedback_text, cursor=None):
+    # The input box, texts and buttons; cursor is the blinking cursor's rect while it shows
+    input_box = rects["input_box"]
+    pygame.draw.rect(screen, DARK_GRAY if input_active else GRAY, input_box)
+    screen.blit(fonts.render(button_font(), guess_input, TEXT_COLOR), (input_box.x + 10, input_box.y + 10))
+
+    # The text inside the speech bubble, a bit above its middle
+    speech_bubble = rects["speech_bubble"]
+    bubble_text = fonts.render(fonts.get_font(28), "Guess the number I'm thinking of from 1-10!", BLACK)
+    screen.blit(bubble_text, bubble_text.get_rect(center=(speech_bubble.centerx, speech_bubble.centery - 40)))
+
+    if cursor is not None:
+        pygame.draw.rect(screen, TEXT_COLOR, cursor)
+
+    feedback_surface = fonts.render(button_font(), feedback_text, BLACK)
+    screen.blit(feedback_surface, feedback_surface.get_rect(center=rects["feedback"].center))
+    screen.blit(fonts.render(button_font(), "Score: " + str(score), BLACK), (10, 10))
+    screen.blit(fonts.render(button_font(), "High Score: " + str(high_score), BLACK), (10, 50))
+
+    draw_button(screen, rects["submit_button"], "Submit", small_font())
+    draw_button(screen, rects["main_menu_button"], "Main Menu", small_font())
+
+
+def draw_equip_button(atlas, rect, equipped):
+    atlas.fill(WHITE, rect.inflate(20, 0))  # "Unequip" spills into the gaps around the button
+    draw_button(atlas, rect, "Unequip" if equipped else "Equip", button_font())
+
+
+def build_achievements_atlas(achievements, size, rects, equipped):
+    # Every row of the achievements list on one surface, tall enough to scroll through. Returns the
+    # surface and the equip buttons on it as (rect, achievement name, reward); equipped is the set of
+    # equipped rewards.
+    width, height = size
+    rows_height = ACHIEVEMENT_ROWS_TOP + len(achievements) * ACHIEVEMENT_ROW_HEIGHT + 20
+    atlas = pygame.Surface((width, max(rows_height, height))).convert()
+    atlas.fill(WHITE)
+
+    buttons = []
+    row_y = ACHIEVEMENT_ROWS_TOP
+    for achievement in achievements:
+        # Padlock sprite (made smaller and moved to the left)
+        padlock_sprite = assets.get_scaled("sprites/locked_padlock.png" if not achievement["unlocked"] else "sprites/unlocked_padlock.png", PADLOCK_SIZE)
+        atlas.blit(padlock_sprite, rects["row_padlock"].move(0, row_y))
+
+        # Achievement box (made longer to fit all text)
+        achievement_box = rects["row_box"].move(0, row_y)
+        pygame.draw.rect(atlas, DARK_GRAY if not achievement["unlocked"] else GRAY, achievement_box)
+        atlas.blit(fonts.render(button_font(), achievement["name"], TEXT_COLOR), (achievement_box.x + 10, achievement_box.y + 5))
+        atlas.blit(fonts.render(small_font(), achievement["description"], TEXT_COLOR), (achievement_box.x + 10, achievement_box.y + 30))
+
+        # Equip/Unequip button
+        equip_button_rect = rects["row_equip"].move(0, row_y)
+        draw_equip_button(atlas, equip_button_rect, achievement["reward"] in equipped)
+        buttons.append((equip_button_rect, achievement["name"], achievement["reward"]))
+
+        # Reward sprite (color rectangle or thumbnail, on the right)
+        reward = engine.REWARDS[achievement["reward"]]
+        reward_rect = rects["row_reward"].move(0, row_y)
+        if reward["kind"] == "color":
+            pygame.draw.rect(atlas, reward["color"], reward_rect)
+        else:
+            reward_asset = reward["asset"] if achievement["unlocked"] else reward.get("locked_asset", reward["asset"])
+            atlas.blit(assets.get_scaled(reward_asset, REWARD_SPRITE_SIZE), reward_rect)
+
+        row_y += ACHIEVEMENT_ROW_HEIGHT  # Move to the next row for each achievement
+    return atlas, buttons
+
+
+def draw_achievements(screen, rects, atlas, scroll_offset):
+    # The visible part of the list, the title and the Main Menu button
+    width, height = screen.get_size()
+    screen.blit(atlas, (0, 0), pygame.Rect(0, -scroll_offset, width, height))
+    achievements_title = fonts.render(title_font(), "Achievements", BLACK)
+    screen.blit(achievements_title, (width // 2 - achievements_title.get_width() // 2, 10))
+    draw_button(screen, rects["main_menu_button"], "Main Menu", small_font())
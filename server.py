@@ -0,0 +1,253 @@
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import engine
+import profiles
+
+# Game server: many guessing sessions at once, one CasperGame per connection, so each has its own
+# Casper number, score, streak and achievements under the same rules as the window. Players are
+# profiles in the shared profile database.
+#
+# The protocol is one JSON object per line each way. The client sends {"op": ...} and gets back
+# {"ok": true, ...} or {"ok": false, "error": ...}:
+#   hello {"profile"}        -> player_data, score; has to come first
+#   guess {"number"}         -> correct, casper_number, score, high_score, unlocked
+#   tap                      -> unlocked
+#   equip {"reward"}         -> equipped (true/false, or null for an unknown reward)
+#   new_game / reset / unlock_all / state (-> player_data, score) / bye
+#
+# Saves are batched: a session only marks its profile dirty, and every SAVE_INTERVAL all dirty
+# profiles are written in one transaction on the database thread.
+
+HOST = "127.0.0.1"
+PORT = 7777
+SAVE_INTERVAL = 1.0  # Seconds between batched saves
+
+
+class GameServer:
+    def __init__(self, db_path=profiles.DB_PATH, save_interval=SAVE_INTERVAL):
+        self.db_path = db_path
+        self.save_interval = save_interval
+        self.sessions = {}  # profile -> its game, while someone is playing it
+        self.dirty = {}  # profile -> player_data changed since the last batch
+        self.store = None
+        # sqlite connections belong to the thread that opened them, so the store lives on one thread of its own
+        self._db = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="profile-db")
+        self._server = None
+        self._saver = None
+
+    async def start(self, host=HOST, port=PORT):
+        loop = asyncio.get_running_loop()
+        self.store = await loop.run_in_executor(self._db, profiles.ProfileStore, self.db_path)
+        self._server = await asyncio.start_server(self.handle_client, host, port, backlog=4096)
+        self._saver = asyncio.create_task(self._save_periodically())
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+        self._saver.cancel()
+        await self.save_batch()
+        await asyncio.get_running_loop().run_in_executor(self._db, self.store.close)
+        self._db.shutdown()
+
+    async def save_batch(self):
+        if not self.dirty:
+            return
+        # Copy on the event loop, the sessions keep changing their player data while the batch is written.
+        # Through JSON because that is several times faster than deepcopy on this data.
+        batch = {profile: json.loads(json.dumps(player_data)) for profile, player_data in self.dirty.items()}
+        self.dirty.clear()
+        await asyncio.get_running_loop().run_in_executor(self._db, self.store.save_many, batch)
+
+    async def _save_periodically(self):
+        while True:
+            await asyncio.sleep(self.save_interval)
+            await self.save_batch()
+
+    async def handle_client(self, reader, writer):
+        profile = None
+        try:
+            async for line in reader:
+                request = {}
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("requests are JSON objects")
+                    if profile is None:
+                        if request.get("op") != "hello":
+                            raise ValueError("say hello first")
+                        profile = await self.open_session(request["profile"])
+                        game = self.sessions[profile]
+                        reply = {"player_data": game.player_data, "score": game.score}
+                    else:
+                        reply = self.handle_request(game, request)
+                    reply["ok"] = True
+                except (ValueError, KeyError, TypeError, OverflowError) as error:
+                    reply = {"ok": False, "error": str(error)}
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+                if request.get("op") == "bye":
+                    break
+        except ConnectionError:
+            pass  # The player went away, the session just ends
+        except (ValueError, asyncio.LimitOverrunError):
+            # A line longer than the stream's limit: no telling where the next request starts, so hang up
+            try:
+                writer.write(json.dumps({"ok": False, "error": "request too long"}).encode() + b"\n")
+                await writer.drain()
+            except ConnectionError:
+                pass
+        finally:
+            if profile is not None:
+                del self.sessions[profile]
+            writer.close()
+
+    async def open_session(self, profile):
+        if not isinstance(profile, str) or not profile:
+            raise ValueError("profile must be a name")
+        if profile in self.sessions:
+            raise ValueError(f"{profile} is already playing")
+        self.sessions[profile] = None  # Taken while it loads
+        try:
+            if profile in self.dirty:
+                player_data = self.dirty[profile]  # Not saved yet, and newer than the database
+            else:
+                player_data = await asyncio.get_running_loop().run_in_executor(self._db, self.store.load, profile)
+        except BaseException:
+            del self.sessions[profile]
+            raise
+        save = lambda data: self.dirty.__setitem__(profile, data)
+        self.sessions[profile] = engine.CasperGame(player_data, save=save)
+        return profile
+
+    def handle_request(self, game, request):
+        op = request["op"]
+        if op == "guess":
+            # Like CasperGame.play, but keeping what the guess unlocked for the reply
+            guess, casper_number = request["number"], game.casper_number
+            if not isinstance(guess, int) or isinstance(guess, bool):
+                raise ValueError("number must be a whole number")  # Not 5.9, true or 1e999
+            correct = guess == casper_number
+            unlocked = game.update_score(correct, guess, casper_number)
+            game.casper_number = game.generate_new_casper_number()
+            return {"correct": correct, "casper_number": casper_number, "score": game.score, "high_score": game.high_score,
+                    "unlocked": [achievement["name"] for achievement in unlocked]}
+        if op == "tap":
+            return {"unlocked": [achievement["name"] for achievement in game.tap()]}
+        if op == "equip":
+            return {"equipped": game.toggle_equipped(request["reward"])}
+        if op == "new_game":
+            game.new_game()
+            return {}
+        if op == "reset":
+            game.reset()
+            return {}
+        if op == "unlock_all":
+            game.unlock_all()
+            return {}
+        if op == "state":
+            game.save()
+            return {"player_data": game.player_data, "score": game.score}
+        if op == "bye":
+            game.save()
+            return {}
+        raise ValueError(f"unknown op {op!r}")
+
+
+async def serve(host, port, db_path):
+    server = GameServer(db_path)
+    address = await server.start(host, port)
+    print(f"Casper server on {address[0]}:{address[1]}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+async def simulated_client(host, port, profile, guesses, rng, latencies):
+    # One terminal playing: hello, a new game, then guesses with the odd tap
+    reader, writer = await asyncio.open_connection(host, port)
+
+    async def request(message):
+        started = time.perf_counter()
+        writer.write(json.dumps(message).encode() + b"\n")
+        reply = json.loads(await reader.readline())
+        latencies.append(time.perf_counter() - started)
+        if not reply["ok"]:
+            raise RuntimeError(reply["error"])
+        return reply
+
+    await request({"op": "hello", "profile": profile})
+    await request({"op": "new_game"})
+    for _ in range(guesses):
+        await request({"op": "guess", "number": rng.randint(1, 10)})
+        if rng.random() < 0.1:
+            await request({"op": "tap"})
+    await request({"op": "bye"})
+    writer.close()
+    await writer.wait_closed()
+
+
+async def load_test(clients, guesses, db_path, seed=0):
+    # Server and clients in one process on loopback; reports the request rate and latencies
+    server = GameServer(db_path)
+    host, port = await server.start(HOST, 0)
+    rng = random.Random(seed)
+    latencies = []
+    started = time.perf_counter()
+    await asyncio.gather(*(simulated_client(host, port, f"Load test {number}", guesses, random.Random(rng.random()), latencies)
+                           for number in range(clients)))
+    seconds = time.perf_counter() - started
+    await server.stop()
+
+    latencies.sort()
+    print(f"{clients} clients, {len(latencies)} requests in {seconds:.2f}s ({len(latencies) / seconds:.0f} requests/s)")
+    print(f"latency p50 {statistics.median(latencies) * 1000:.2f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms, max {latencies[-1] * 1000:.2f} ms")
+
+
+def raise_open_file_limit(needed):
+    # Every loopback client is two sockets
+    try:
+        import resource
+    except ImportError:  # Not on Windows
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != resource.RLIM_INFINITY and soft < needed:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(needed, hard) if hard != resource.RLIM_INFINITY else needed, hard))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve Casper guessing sessions over TCP")
+    parser.add_argument("--host", default=HOST, help="address to listen on (0.0.0.0 to serve other terminals)")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--db", help=f"profile database (default {profiles.DB_PATH}, or a throwaway one for --load-test)")
+    parser.add_argument("--load-test", type=int, metavar="CLIENTS", help="run this many simulated clients against an in-process server instead")
+    parser.add_argument("--guesses", type=int, default=100, help="guesses per simulated client")
+    args = parser.parse_args()
+
+    if args.load_test:
+        raise_open_file_limit(2 * args.load_test + 100)
+        if args.db:
+            asyncio.run(load_test(args.load_test, args.guesses, args.db))
+        else:
+            # Keep the simulated players out of the real profiles (and off the leaderboard)
+            with tempfile.TemporaryDirectory() as directory:
+                asyncio.run(load_test(args.load_test, args.guesses, os.path.join(directory, "load_test.db")))
+    else:
+        try:
+            asyncio.run(serve(args.host, args.port, args.db or profiles.DB_PATH))
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
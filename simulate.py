@@ -0,0 +1,74 @@
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+import engine
+import persistence
+
+# Batch runner: plays lots of synthetic players through the headless engine (no pygame, no window)
+# to measure the scoring/achievement/persistence path and to replay long runs quickly.
+
+
+def make_saver(save_mode, directory, player):
+    if save_mode == "none":
+        return None
+    if save_mode == "json":
+        return json.dumps  # Pay for serializing, but don't touch the disk
+    path = os.path.join(directory, f"player_{player}.json")
+    return lambda player_data: persistence.write_atomic(path, player_data)
+
+
+def run_batch(players, guesses, seed=0, save_mode="none", tap_rate=0.0, directory=None):
+    seeds = random.Random(seed)
+    unlocked = {achievement["name"]: 0 for achievement in engine.ACHIEVEMENTS}
+    best_high_score = 0
+
+    start = time.perf_counter()
+    for player in range(players):
+        game = engine.CasperGame(rng=random.Random(seeds.random()), save=make_saver(save_mode, directory, player))
+        guesser = random.Random(seeds.random())
+        for _ in range(guesses):
+            game.play(guesser.randint(1, 10))
+            if tap_rate and guesser.random() < tap_rate:
+                game.tap()
+
+        for achievement in game.achievements:
+            if achievement["unlocked"]:
+                unlocked[achievement["name"]] += 1
+        best_high_score = max(best_high_score, game.high_score)
+    seconds = time.perf_counter() - start
+
+    return {
+        "players": players,
+        "guesses": players * guesses,
+        "seconds": seconds,
+        "guesses_per_second": players * guesses / seconds if seconds else 0.0,
+        "best_high_score": best_high_score,
+        "players_with_achievement": unlocked,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play synthetic Casper players without a window")
+    parser.add_argument("--players", type=int, default=100)
+    parser.add_argument("--guesses", type=int, default=10000, help="guesses per player")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", choices=["none", "json", "file"], default="none",
+                        help="what to do with player data on every save: nothing, serialize it, or write it to disk")
+    parser.add_argument("--tap-rate", type=float, default=0.0, help="chance of tapping Casper after each guess")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = run_batch(args.players, args.guesses, args.seed, args.save, args.tap_rate, directory)
+
+    print(f"{results['guesses']} guesses by {results['players']} players in {results['seconds']:.2f}s "
+          f"({results['guesses_per_second']:.0f} guesses/s), best high score {results['best_high_score']}")
+    for name, count in results["players_with_achievement"].items():
+        print(f"  {name}: {count}/{results['players']}")
+
+
+if __name__ == "__main__":
+    main()
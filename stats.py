@@ -0,0 +1,91 @@
+import time
+
+# Running statistics for the Statistics screen. Every guess updates them in O(1) and none of them
+# grow: fixed-size count lists plus a ring of one-minute buckets for the time windows. The screen
+# reads them as they are, it never goes back over the guess history.
+
+NUMBERS = range(1, 11)  # What Casper picks from; guesses outside it are counted as "other" (index 0)
+MAX_STREAK = 20  # Streaks this long or longer share the last bucket
+MINUTES = 60  # One-minute buckets kept for the time windows
+ACCURACY_WINDOWS = [1, 10, 60]  # Minutes
+
+
+def number_slot(number):
+    return number if number in NUMBERS else 0
+
+
+class GuessStats:
+    def __init__(self, state=None):
+        # state: what state() returned, e.g. from the save
+        state = state or {}
+        self.guess_counts = state.get("guess_counts", [0] * (len(NUMBERS) + 1))  # guessed number -> times
+        self.casper_counts = state.get("casper_counts", [0] * (len(NUMBERS) + 1))  # Casper's number -> times
+        self.streak_counts = state.get("streak_counts", [0] * (MAX_STREAK + 1))  # streak length -> finished streaks
+        self.current_streak = state.get("current_streak", 0)
+        self.total = state.get("total", 0)
+        self.correct = state.get("correct", 0)
+        self.minute_stamps = state.get("minute_stamps", [-1] * MINUTES)  # Which minute each bucket holds
+        self.minute_guesses = state.get("minute_guesses", [0] * MINUTES)
+        self.minute_correct = state.get("minute_correct", [0] * MINUTES)
+
+    def record(self, correct, guess=None, casper_number=None, now=None):
+        self.total += 1
+        if guess is not None:
+            self.guess_counts[number_slot(guess)] += 1
+        if casper_number is not None:
+            self.casper_counts[number_slot(casper_number)] += 1
+
+        if correct:
+            self.correct += 1
+            self.current_streak += 1
+        elif self.current_streak:
+            self.streak_counts[min(self.current_streak, MAX_STREAK)] += 1
+            self.current_streak = 0
+
+        minute = int((time.time() if now is None else now) // 60)
+        slot = minute % MINUTES
+        if self.minute_stamps[slot] != minute:
+            # The bucket still holds a minute from an hour or more ago
+            self.minute_stamps[slot] = minute
+            self.minute_guesses[slot] = 0
+            self.minute_correct[slot] = 0
+        self.minute_guesses[slot] += 1
+        self.minute_correct[slot] += int(bool(correct))
+
+    def streak_histogram(self):
+        # Finished streaks plus the one still going
+        counts = list(self.streak_counts)
+        if self.current_streak:
+            counts[min(self.current_streak, MAX_STREAK)] += 1
+        return counts[1:]
+
+    def window(self, minutes, now=None):
+        # (guesses, correct) over the last minutes, this one included
+        minute = int((time.time() if now is None else now) // 60)
+        guesses = correct = 0
+        for stamp, slot_guesses, slot_correct in zip(self.minute_stamps, self.minute_guesses, self.minute_correct):
+            if minute - minutes < stamp <= minute:
+                guesses += slot_guesses
+                correct += slot_correct
+        return guesses, correct
+
+    def accuracy(self, minutes=None, now=None):
+        # Fraction of correct guesses over the last minutes (all time if None), or None without guesses
+        guesses, correct = (self.total, self.correct) if minutes is None else self.window(minutes, now)
+        return correct / guesses if guesses else None
+
+    def guesses_per_minute(self, minutes=10, now=None):
+        return self.window(minutes, now)[0] / minutes
+
+    def state(self):
+        return {
+            "guess_counts": self.guess_counts,
+            "casper_counts": self.casper_counts,
+            "streak_counts": self.streak_counts,
+            "current_streak": self.current_streak,
+            "total": self.total,
+            "correct": self.correct,
+            "minute_stamps": self.minute_stamps,
+            "minute_guesses": self.minute_guesses,
+            "minute_correct": self.minute_correct,
+        }